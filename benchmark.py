@@ -0,0 +1,334 @@
+"""Reproducible benchmarks for the diff engine and the Tk front end.
+
+    python benchmark.py --quick --output results.json
+    python benchmark.py --baseline baseline.json
+
+Inputs come from a seeded synthetic corpus (sizes, edit densities, long
+lines and every language of the Syntax dropdown), so two runs on the same
+machine time the same work. The Tk benchmarks drive a real DiffCheckerApp;
+without a display they start a local Xvfb server, and they are skipped
+(and reported as such) when none is available. Results are written as
+JSON; with --baseline the best times are compared against a stored run
+and the exit status is 1 if anything got slower than the tolerance allows.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+from diff_algorithms import ALGORITHMS, DEFAULT_ALGORITHM
+from diff_engine import compute_diff
+from merge_engine import merge_regions
+
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+QUICK_SIZES = (1_000, 10_000)
+DENSITIES = (0.001, 0.01, 0.1) # Fraction of lines edited
+GUI_MAX_LINES = 100_000 # Larger corpora only run the engine benchmarks
+MAX_EDITS = 5_000 # Size/density pairs with more edited lines are skipped (Myers is O(N*D))
+HIGHLIGHT_LINES = 10_000
+LONG_LINE_CHARS = 2000
+NAVIGATION_STEPS = 200
+MERGE_STEPS = 50
+SCROLL_STEPS = 200
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.25 # Allowed slowdown against the baseline (25%)
+MIN_REGRESSION_SECONDS = 0.005 # Smaller slowdowns are timer noise, whatever the ratio
+DISPLAY_SIZE = "1600x1000x24"
+
+# Line templates per language of the Syntax dropdown; {n} is a running number
+LANGUAGE_SNIPPETS = {
+    "Plain Text": ["Line {n} of the release notes.", "Fixed issue #{n} in the parser.", "", "- item {n}"],
+    "Python": ["def func_{n}(value):", "    return value * {n}", "items_{n} = [i for i in range({n})]", "# note {n}", ""],
+    "JavaScript": ["function f{n}(x) {{", "  return x + {n};", "}}", "const v{n} = [1, 2, {n}];", "// note {n}"],
+    "HTML": ["<div class=\"row-{n}\">", "  <p>Paragraph {n}</p>", "</div>", "<!-- block {n} -->"],
+    "CSS": [".item-{n} {{", "  margin: {n}px;", "  color: #{n:06x};", "}}"],
+    "JSON": ["{{", "  \"id\": {n},", "  \"name\": \"item {n}\",", "  \"tags\": [\"a\", \"b\"]", "}},"],
+    "XML": ["<item id=\"{n}\">", "  <name>item {n}</name>", "</item>", "<!-- {n} -->"],
+    "SQL": ["SELECT id, name FROM t{n} WHERE id = {n};", "INSERT INTO log VALUES ({n}, 'x');", "-- query {n}"],
+    "C": ["int f{n}(int x) {{", "    return x + {n};", "}}", "/* block {n} */", "#define C{n} {n}"],
+    "C++": ["std::vector<int> v{n}{{1, {n}}};", "auto f{n} = [](int x) {{ return x * {n}; }};", "// note {n}"],
+    "Java": ["public int get{n}() {{", "    return this.value + {n};", "}}", "// note {n}"],
+    "PHP": ["<?php $v{n} = {n}; ?>", "function f{n}($x) {{ return $x + {n}; }}", "// note {n}"],
+    "Ruby": ["def m{n}(x)", "  x + {n}", "end", "# note {n}"],
+}
+
+
+# --- Corpus ---
+def _line(rng, snippets, n, long_lines):
+    line = rng.choice(snippets).format(n=n)
+    if long_lines and line:
+        line = (line + " ") * (LONG_LINE_CHARS // (len(line) + 1) + 1)
+    return line
+
+
+def make_corpus(lines, density, language="Plain Text", long_lines=False, seed=0):
+    """A seeded (left, right) pair of line lists; about density * lines are edited on the right.
+
+    The left side only depends on lines, language and long_lines, so corpora
+    that differ in seed are independent edits of the same text.
+    """
+    snippets = LANGUAGE_SNIPPETS[language]
+    rng = random.Random(f"{lines}/{language}/{long_lines}")
+    left = [_line(rng, snippets, n, long_lines) for n in range(lines)]
+    rng = random.Random(f"{lines}/{language}/{long_lines}/{density}/{seed}")
+    right = []
+    for n, line in enumerate(left):
+        roll = rng.random()
+        if roll >= density:
+            right.append(line)
+        elif roll < density / 3: # Deleted
+            continue
+        elif roll < 2 * density / 3: # Changed
+            right.append(_line(rng, snippets, lines + n, long_lines))
+        else: # Inserted before
+            right.append(_line(rng, snippets, lines + n, long_lines))
+            right.append(line)
+    return left, right
+
+
+# --- Timing ---
+class Recorder:
+    """Collects timings as JSON-ready records."""
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+        self.skipped = []
+
+    def measure(self, name, params, func, setup=None):
+        """Times func() `repeat` times; setup(), if given, runs untimed before each run."""
+        runs = []
+        for _ in range(self.repeat):
+            if setup: setup()
+            start = time.perf_counter()
+            func()
+            runs.append(time.perf_counter() - start)
+        record = {"id": _result_id(name, params), "name": name, "params": params,
+                  "runs": runs, "best": min(runs), "median": statistics.median(runs)}
+        self.results.append(record)
+        print(f"{record['id']}: best {record['best']:.4f}s, median {record['median']:.4f}s", flush=True)
+        return record
+
+    def skip(self, name, reason):
+        self.skipped.append({"name": name, "reason": reason})
+        print(f"{name}: skipped ({reason})", flush=True)
+
+
+def _result_id(name, params):
+    return name + "[" + ",".join(f"{key}={params[key]}" for key in sorted(params)) + "]"
+
+
+# --- Engine Benchmarks ---
+def _too_many_edits(recorder, name, lines, density, max_edits):
+    if lines * density <= max_edits: return False
+    recorder.skip(f"{name}[density={density},lines={lines}]", f"more than {max_edits} edited lines")
+    return True
+
+
+def bench_engine(recorder, sizes, densities, algorithms, max_edits=MAX_EDITS):
+    for lines in sizes:
+        for density in densities:
+            if _too_many_edits(recorder, "engine", lines, density, max_edits): continue
+            left, right = make_corpus(lines, density)
+            for algorithm in algorithms:
+                recorder.measure("compute_diff", {"lines": lines, "density": density, "algorithm": algorithm},
+                                 lambda: compute_diff(left, right, algorithm))
+            other = make_corpus(lines, density, seed=1)[1]
+            recorder.measure("merge_regions", {"lines": lines, "density": density},
+                             lambda: merge_regions(left, right, other))
+        if lines <= GUI_MAX_LINES: # Long lines: a tenth of the lines, LONG_LINE_CHARS each
+            left, right = make_corpus(lines // 10, densities[-1], long_lines=True)
+            recorder.measure("compute_diff", {"lines": lines // 10, "density": densities[-1], "long_lines": True},
+                             lambda: compute_diff(left, right))
+
+
+# --- Tk Benchmarks ---
+def start_virtual_display():
+    """Starts Xvfb on a free display when there is none; returns the process, or None."""
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"): return None
+    xvfb = shutil.which("Xvfb")
+    if not xvfb: return None
+    for number in range(99, 199):
+        if os.path.exists(f"/tmp/.X{number}-lock"): continue
+        process = subprocess.Popen([xvfb, f":{number}", "-screen", "0", DISPLAY_SIZE, "-nolisten", "tcp"],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for _ in range(50):
+            if os.path.exists(f"/tmp/.X11-unix/X{number}"):
+                os.environ["DISPLAY"] = f":{number}"
+                return process
+            if process.poll() is not None: break
+            time.sleep(0.1)
+        process.terminate()
+    return None
+
+
+class GuiBench:
+    """A DiffCheckerApp with helpers to load a corpus and wait for comparisons."""
+
+    def __init__(self):
+        import tkinter as tk
+        from difference_checker_app import DiffCheckerApp, PYGMENTS_AVAILABLE
+        self.tk = tk
+        self.pygments = PYGMENTS_AVAILABLE
+        self.root = tk.Tk()
+        self.app = DiffCheckerApp(self.root)
+        self.root.update()
+
+    def pump(self, done, timeout=3600):
+        """Runs the event loop until done() is true."""
+        deadline = time.perf_counter() + timeout
+        while not done():
+            if time.perf_counter() > deadline: raise TimeoutError("benchmark step did not finish")
+            self.root.update()
+            time.sleep(0.001)
+        self.root.update_idletasks()
+
+    def load(self, left, right, language="Plain Text"):
+        app = self.app
+        app._stop_compare()
+        app.language_dropdown.set(language)
+        app._load_side(1, left, compare=False)
+        app._load_side(2, right, compare=False)
+        self.root.update_idletasks()
+
+    def compare(self):
+        """compare_text from an empty cache, until the result is fully applied."""
+        finished = []
+        self.app.diff_cache.clear()
+        self.app.compare_text(on_done=lambda: finished.append(True))
+        self.pump(lambda: finished)
+
+    def close(self):
+        self.root.destroy()
+
+
+def bench_gui(recorder, sizes, densities, max_edits=MAX_EDITS):
+    gui = GuiBench()
+    app = gui.app
+    try:
+        for lines in (size for size in sizes if size <= GUI_MAX_LINES):
+            for density in densities:
+                if _too_many_edits(recorder, "gui", lines, density, max_edits): continue
+                params = {"lines": lines, "density": density}
+                left, right = make_corpus(lines, density)
+                gui.load(left, right)
+                recorder.measure("compare_text", params, gui.compare)
+
+                def navigate():
+                    for _ in range(NAVIGATION_STEPS): app.find_next_diff_from_cursor()
+                recorder.measure("find_next_diff_from_cursor", dict(params, steps=NAVIGATION_STEPS), navigate)
+
+                def scroll():
+                    event = SimpleNamespace(widget=app.text1, num=5, delta=-120) # One wheel notch down
+                    for _ in range(SCROLL_STEPS):
+                        app._scroll_both(event)
+                        gui.root.update()
+                recorder.measure("synchronized_scroll", dict(params, steps=SCROLL_STEPS), scroll,
+                                 setup=lambda: (app.text1.yview_moveto(0), gui.root.update()))
+
+                def fresh_compare():
+                    gui.load(left, right)
+                    gui.compare()
+                    app._select_and_scroll_to_diff(0)
+                def merge():
+                    for _ in range(MERGE_STEPS):
+                        if not app.selected_diff_details: break
+                        app.merge_to_right()
+                recorder.measure("merge_to_right", dict(params, steps=MERGE_STEPS), merge, setup=fresh_compare)
+
+        if not gui.pygments:
+            recorder.skip("apply_syntax_highlighting", "Pygments is not installed")
+            return
+        for language in LANGUAGE_SNIPPETS:
+            for long_lines in (False, True):
+                lines = HIGHLIGHT_LINES // 10 if long_lines else HIGHLIGHT_LINES
+                gui.load(*make_corpus(lines, DENSITIES[1], language, long_lines), language=language)
+                recorder.measure("apply_syntax_highlighting",
+                                 {"lines": lines, "language": language, "long_lines": long_lines},
+                                 app.apply_syntax_highlighting, setup=app.token_cache.clear)
+    finally:
+        gui.close()
+
+
+# --- Results ---
+def metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "commit": commit,
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "sizes": args.sizes, "densities": args.densities, "algorithms": args.algorithms,
+            "max_edits": args.max_edits, "repeat": args.repeat}
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Prints each result against its baseline entry; returns the ids that regressed."""
+    previous = {record["id"]: record for record in baseline.get("results", [])}
+    regressions = []
+    for record in results:
+        old = previous.get(record["id"])
+        if not old: continue
+        ratio = record["best"] / old["best"] if old["best"] else 1.0
+        flag = ""
+        if ratio > 1 + tolerance and record["best"] - old["best"] > MIN_REGRESSION_SECONDS:
+            regressions.append(record["id"])
+            flag = "  REGRESSION"
+        print(f"{record['id']}: {old['best']:.4f}s -> {record['best']:.4f}s ({ratio:.2f}x){flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks for the text difference checker.")
+    parser.add_argument("--quick", action="store_true", help=f"only sizes {', '.join(map(str, QUICK_SIZES))}")
+    parser.add_argument("--sizes", type=int, nargs="+", help="corpus sizes in lines (default: 1k to 1M)")
+    parser.add_argument("--densities", type=float, nargs="+", default=list(DENSITIES), help="fractions of lines edited")
+    parser.add_argument("--algorithms", nargs="+", choices=list(ALGORITHMS), default=[DEFAULT_ALGORITHM])
+    parser.add_argument("--max-edits", type=int, default=MAX_EDITS,
+                        help=f"skip corpora with more edited lines than this (default: {MAX_EDITS})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="runs per benchmark (the best one counts)")
+    parser.add_argument("--no-gui", action="store_true", help="skip the Tk benchmarks")
+    parser.add_argument("--output", metavar="JSON", help="write the results to this file")
+    parser.add_argument("--baseline", metavar="JSON", help="compare against results written by an earlier run")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed slowdown against the baseline (default: {DEFAULT_TOLERANCE})")
+    args = parser.parse_args(argv)
+    args.sizes = args.sizes or list(QUICK_SIZES if args.quick else SIZES)
+
+    recorder = Recorder(args.repeat)
+    bench_engine(recorder, args.sizes, args.densities, args.algorithms, args.max_edits)
+    if args.no_gui:
+        recorder.skip("gui", "--no-gui")
+    else:
+        display = start_virtual_display()
+        try:
+            if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+                bench_gui(recorder, args.sizes, args.densities, args.max_edits)
+            else:
+                recorder.skip("gui", "no display and no Xvfb found")
+        finally:
+            if display: display.terminate()
+
+    report = {"meta": metadata(args), "results": recorder.results, "skipped": recorder.skipped}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_to_baseline(recorder.results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} benchmarks regressed by more than {args.tolerance:.0%}.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Comparison keys: lines normalized once per option set so the diff can ignore whitespace, case or masked text.
+
+The diff runs on keys while the panes keep showing the original lines; an
+opcode's indices are the same for both. Keys are memoized per distinct line
+and per option set (KeyCache), so switching an option back and forth, or
+re-diffing a few edited lines, only normalizes lines it has not seen.
+"""
+import re
+import sys
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import astuple, dataclass
+
+from line_source import MappedLines
+
+WHITESPACE_MODES = ("exact", "trailing", "changes", "all")
+MASK_PRESETS = { # Menu label -> regex whose matches compare equal
+    "Timestamps": r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?|\d{2}:\d{2}:\d{2}(?:[.,]\d+)?",
+    "UUIDs": r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b",
+}
+MASK_TEXT = "\0" # What every mask match is replaced by
+MEMO_MAX_LINES = 1_000_000 # A memo is emptied once it holds this many lines
+MAX_OPTION_SETS = 4 # Memos kept for the most recently used option sets
+_SPACE_RUN = re.compile(r"\s+")
+
+
+@dataclass(frozen=True)
+class KeyOptions:
+    """What the comparison ignores. The default compares lines exactly."""
+    whitespace: str = "exact" # One of WHITESPACE_MODES, like diff's (none), --ignore-trailing-space, -b and -w
+    ignore_case: bool = False
+    masks: tuple = () # Regex patterns
+
+    @property
+    def identity(self):
+        return self == KeyOptions()
+
+    def as_tuple(self):
+        """For diff_cache's options; empty for exact comparisons so their entries stay valid."""
+        return () if self.identity else astuple(self)
+
+    def normalizer(self):
+        """Function turning a line into its key."""
+        steps = [lambda line, sub=re.compile(pattern).sub: sub(MASK_TEXT, line) for pattern in self.masks]
+        if self.whitespace == "trailing": steps.append(str.rstrip)
+        elif self.whitespace == "changes": steps.append(lambda line: _SPACE_RUN.sub(" ", line.rstrip()))
+        elif self.whitespace == "all": steps.append(lambda line: "".join(line.split()))
+        if self.ignore_case: steps.append(str.casefold)
+
+        def normalize(line):
+            for step in steps:
+                line = step(line)
+            return sys.intern(line)
+        return normalize
+
+
+class KeyMemo(dict):
+    """Line -> interned key for one option set; a missing line is normalized on first lookup."""
+
+    def __init__(self, options):
+        super().__init__()
+        self.normalize = options.normalizer()
+
+    def __missing__(self, line):
+        if len(self) >= MEMO_MAX_LINES: self.clear()
+        key = self[line] = self.normalize(line)
+        return key
+
+
+class KeyedLines(Sequence):
+    """Keys of a line sequence, looked up one line at a time.
+
+    Used for memory-mapped files and for the small windows that live diffs
+    and merges re-diff; edits to the underlying list show through.
+    """
+
+    def __init__(self, lines, memo):
+        self.lines = lines
+        self.memo = memo
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice): return [self.memo[line] for line in self.lines[index]]
+        return self.memo[self.lines[index]]
+
+
+class KeyCache:
+    """KeyMemos of the most recently used option sets.
+
+    Thread-safe enough for one diff worker and the main loop: memo
+    lookups and inserts are single dict operations.
+    """
+
+    def __init__(self, max_option_sets=MAX_OPTION_SETS):
+        self.max_option_sets = max_option_sets
+        self._memos = OrderedDict() # KeyOptions -> KeyMemo
+
+    def memo(self, options):
+        memo = self._memos.get(options)
+        if memo is None:
+            memo = self._memos[options] = KeyMemo(options)
+            while len(self._memos) > self.max_option_sets: self._memos.popitem(last=False)
+        else:
+            self._memos.move_to_end(options)
+        return memo
+
+    def keys(self, lines, options):
+        """The sequence to diff in place of `lines`: the lines themselves, a list of keys or, for a file, a lazy view."""
+        if options.identity: return lines
+        memo = self.memo(options)
+        if isinstance(lines, MappedLines): return KeyedLines(lines, memo) # Never decoded as a whole
+        return list(map(memo.__getitem__, lines))
+
+    def view(self, lines, options):
+        """Like keys(), but always lazy; for re-diffing a few lines of a long document."""
+        return lines if options.identity else KeyedLines(lines, self.memo(options))
@@ -0,0 +1,117 @@
+"""Phase timers and counters for one comparison, plus opt-in cProfile/tracemalloc capture."""
+import cProfile
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+PROFILE_TOP_FUNCTIONS = 40
+PROFILE_TOP_ALLOCATIONS = 25
+
+
+class CompareStats:
+    """Seconds per phase (in first-seen order) and named counters of one comparison."""
+
+    def __init__(self, mode, algorithm):
+        self.mode = mode # "panes", "virtual" or "live" (a Live Diff update)
+        self.algorithm = algorithm
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.total = None # Wall time, set by finish()
+        self.phases = {}
+        self.counters = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self):
+        self.total = time.perf_counter() - self._start
+
+    def status_text(self):
+        """One line for the stats panel."""
+        phases = "  ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases.items())
+        counters = "  ".join(f"{name}={value}" for name, value in self.counters.items())
+        total = f"total {self.total * 1000:.0f}ms" if self.total is not None else "running"
+        return f"{total} | {phases} | {counters}"
+
+    def as_record(self):
+        return {"time": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)),
+                "mode": self.mode, "algorithm": self.algorithm, "total": self.total,
+                "phases": self.phases, "counters": self.counters}
+
+    def append_jsonl(self, path):
+        """Appends this comparison as one JSON line."""
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.as_record()) + "\n")
+
+
+class TclCallCounter:
+    """Stands in for a widget's tkapp and counts the Tcl commands it issues.
+
+    Every call is forwarded unchanged; while `stats` is set, each one adds
+    to its "tcl_calls" counter and "tag add" calls also to "tag_ranges".
+    """
+
+    def __init__(self, tkapp):
+        self._tkapp = tkapp
+        self.stats = None
+
+    def call(self, *args):
+        stats = self.stats
+        if stats is not None:
+            stats.count("tcl_calls")
+            words = args[0] if len(args) == 1 and isinstance(args[0], tuple) else args # tag_add passes one tuple
+            if len(words) > 4 and words[1:3] == ("tag", "add"):
+                stats.count("tag_ranges", (len(words) - 3) // 2) # Index pairs, a lone index is one char
+        return self._tkapp.call(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._tkapp, name)
+
+
+class ProfileCapture:
+    """cProfile and tracemalloc around one comparison; both slow it down noticeably.
+
+    stop() writes `path` (pstats data, e.g. for snakeviz) and `path`.txt
+    with the top functions by cumulative time and the top allocations.
+    Profiles of other threads (the diff worker) can be merged in.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.profile = cProfile.Profile()
+        self._own_tracing = False
+
+    def start(self):
+        self._own_tracing = not tracemalloc.is_tracing()
+        if self._own_tracing: tracemalloc.start()
+        self.profile.enable()
+        return self
+
+    def stop(self, other_profiles=()):
+        self.profile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._own_tracing: tracemalloc.stop()
+        with open(self.path + ".txt", "w", encoding="utf-8") as f:
+            stats = pstats.Stats(self.profile, stream=f)
+            for profile in other_profiles:
+                if profile is not None: stats.add(profile)
+            stats.dump_stats(self.path)
+            f.write(f"Traced memory: {current / 1e6:.1f} MB at the end, {peak / 1e6:.1f} MB peak\n\n")
+            stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+            f.write("Top allocations:\n")
+            for stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
@@ -0,0 +1,308 @@
+"""Line diff algorithms that all return difflib-style opcodes.
+
+Every backend takes two sequences of hashable items and returns a list of
+(tag, i1, i2, j1, j2) tuples exactly like SequenceMatcher.get_opcodes().
+Myers, patience and histogram work region by region with an explicit
+stack, so they need no recursion and only linear extra memory.
+
+Backends accept an optional progress(phase, fraction) callback that is
+called at regular checkpoints; fraction may be None when the position is
+unknown. The callback may raise to abandon the diff.
+"""
+import difflib
+from bisect import bisect_left
+
+HISTOGRAM_MAX_CHAIN = 64 # Lines occurring more often than this are never used as anchors
+PROGRESS_EVERY = 256 # Regions (or Myers d-steps) between progress checkpoints
+MYERS_MAX_COST = 64 # Myers d-steps per region before settling for a good split instead of the best one
+
+
+# --- Shared Helpers ---
+def _trim_region(a, b, alo, ahi, blo, bhi, blocks):
+    """Records the common prefix/suffix of a region and returns the middle."""
+    start = alo
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        alo += 1; blo += 1
+    if alo > start: blocks.append((start, blo - (alo - start), alo - start))
+    end = ahi
+    while ahi > alo and bhi > blo and a[ahi - 1] == b[bhi - 1]:
+        ahi -= 1; bhi -= 1
+    if ahi < end: blocks.append((ahi, bhi, end - ahi))
+    return alo, ahi, blo, bhi
+
+
+def blocks_to_opcodes(blocks, n, m):
+    """Turns matching (i, j, size) blocks into opcodes, like SequenceMatcher."""
+    blocks.sort()
+    opcodes = []
+    i = j = 0
+    pending = None # Adjacent blocks are merged before emitting 'equal'
+    for ai, bj, size in blocks + [(n, m, 0)]:
+        if pending and ai == pending[0] + pending[2] and bj == pending[1] + pending[2] and size:
+            pending = (pending[0], pending[1], pending[2] + size)
+            continue
+        if pending:
+            pi, pj, psize = pending
+            opcodes.append(('equal', pi, pi + psize, pj, pj + psize))
+            i, j = pi + psize, pj + psize
+            pending = None
+        tag = ''
+        if i < ai and j < bj: tag = 'replace'
+        elif i < ai: tag = 'delete'
+        elif j < bj: tag = 'insert'
+        if tag: opcodes.append((tag, i, ai, j, bj))
+        i, j = ai, bj
+        if size: pending = (ai, bj, size)
+    return opcodes
+
+
+# --- Myers O(ND) with the linear-space middle-snake refinement ---
+def _middle_split(a, b, alo, ahi, blo, bhi, progress=None):
+    """Finds the split point of a shortest edit script through its middle snake.
+
+    Returns (x, y) in absolute coordinates, or None if the region has no
+    common element at all. Like GNU diff's heuristic, a search that takes
+    more than MYERS_MAX_COST d-steps stops and splits at the furthest point
+    a path has reached, so the script may be a little longer than the
+    shortest but the cost stays bounded.
+    """
+    n, m = ahi - alo, bhi - blo
+    max_d = (n + m + 1) // 2
+    offset = max_d + 1
+    size = 2 * max_d + 3
+    v1 = [-1] * size
+    v2 = [-1] * size
+    v1[offset + 1] = 0
+    v2[offset + 1] = 0
+    delta = n - m
+    front = delta % 2 != 0 # Odd delta: overlap is detected by the forward pass
+    k1start = k1end = k2start = k2end = 0
+    for d in range(max_d + 1):
+        if progress and d and not d % PROGRESS_EVERY: progress("diff", None)
+        # Forward path
+        for k1 in range(-d + k1start, d + 1 - k1end, 2):
+            k1_offset = offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[alo + x1] == b[blo + y1]:
+                x1 += 1; y1 += 1
+            v1[k1_offset] = x1
+            if x1 > n: k1end += 2 # Ran off the right of the grid
+            elif y1 > m: k1start += 2 # Ran off the bottom of the grid
+            elif front:
+                k2_offset = offset + delta - k1
+                if 0 <= k2_offset < size and v2[k2_offset] != -1:
+                    if x1 >= n - v2[k2_offset]: return alo + x1, blo + y1
+        # Reverse path
+        for k2 in range(-d + k2start, d + 1 - k2end, 2):
+            k2_offset = offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[ahi - 1 - x2] == b[bhi - 1 - y2]:
+                x2 += 1; y2 += 1
+            v2[k2_offset] = x2
+            if x2 > n: k2end += 2
+            elif y2 > m: k2start += 2
+            elif not front:
+                k1_offset = offset + delta - k2
+                if 0 <= k1_offset < size and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    y1 = offset + x1 - k1_offset
+                    if x1 >= n - x2: return alo + x1, blo + y1
+        if d >= MYERS_MAX_COST: return _furthest_split(v1, v2, offset, d, n, m, alo, ahi, blo, bhi)
+    return None
+
+
+def _furthest_split(v1, v2, offset, d, n, m, alo, ahi, blo, bhi):
+    """The furthest point a forward or reverse path reached after d steps, in absolute coordinates."""
+    best, split = 0, None
+    for k in range(-d, d + 1, 2):
+        x1, x2 = v1[offset + k], v2[offset + k]
+        y1, y2 = x1 - k, x2 - k
+        if 0 <= x1 <= n and 0 <= y1 <= m and best < x1 + y1 < n + m:
+            best, split = x1 + y1, (alo + x1, blo + y1)
+        if 0 <= x2 <= n and 0 <= y2 <= m and best < x2 + y2 < n + m:
+            best, split = x2 + y2, (ahi - x2, bhi - y2)
+    return split
+
+
+def _report(progress, steps, alo, n):
+    """Regions are processed left to right, so alo / n tracks the progress."""
+    if progress and not steps % PROGRESS_EVERY: progress("diff", alo / n if n else 1.0)
+
+
+def _myers_blocks(a, b, alo, ahi, blo, bhi, blocks, progress=None):
+    # Lines missing from the other side never match. Regions made mostly of them
+    # (rewritten blocks) are Myers' worst case, so they are settled in O(n) first:
+    # with nothing in common there is one 'replace', otherwise only the lines
+    # both sides share are diffed and the matches mapped back
+    common = set(a[alo:ahi]).intersection(b[blo:bhi])
+    if not common: return
+    kept1 = [i for i in range(alo, ahi) if a[i] in common]
+    kept2 = [j for j in range(blo, bhi) if b[j] in common]
+    if 2 * (len(kept1) + len(kept2)) >= ahi - alo + bhi - blo:
+        _myers_regions(a, b, alo, ahi, blo, bhi, blocks, progress)
+        return
+    matches = []
+    _myers_regions([a[i] for i in kept1], [b[j] for j in kept2], 0, len(kept1), 0, len(kept2), matches, progress)
+    blocks.extend((kept1[i + t], kept2[j + t], 1) for i, j, size in matches for t in range(size))
+
+
+def _myers_regions(a, b, alo, ahi, blo, bhi, blocks, progress=None):
+    stack = [(alo, ahi, blo, bhi)]
+    steps = 0
+    while stack:
+        alo, ahi, blo, bhi = _trim_region(a, b, *stack.pop(), blocks)
+        steps += 1
+        _report(progress, steps, alo, len(a))
+        if alo == ahi or blo == bhi: continue
+        split = _middle_split(a, b, alo, ahi, blo, bhi, progress)
+        if split is None: continue # Nothing in common: one 'replace'
+        x, y = split
+        stack.append((x, ahi, y, bhi))
+        stack.append((alo, x, blo, y))
+
+
+def myers_opcodes(a, b, progress=None):
+    """Minimal edit script (Myers 1986) in linear space; near-minimal where regions differ a lot."""
+    blocks = []
+    _myers_blocks(a, b, 0, len(a), 0, len(b), blocks, progress)
+    return blocks_to_opcodes(blocks, len(a), len(b))
+
+
+# --- Patience ---
+def _unique_common_lcs(a, b, alo, ahi, blo, bhi):
+    """Longest increasing run of lines that occur exactly once on each side."""
+    counts = {}
+    for i in range(alo, ahi):
+        entry = counts.get(a[i])
+        counts[a[i]] = [i, -1] if entry is None else [-1, -1]
+    for j in range(blo, bhi):
+        entry = counts.get(b[j])
+        if entry is None or entry[0] < 0: continue
+        entry[1] = j if entry[1] == -1 else -2 # -2: not unique in b
+    pairs = sorted((i, j) for i, j in counts.values() if i >= 0 and j >= 0)
+    if not pairs: return []
+    # Patience sorting on the b positions gives the longest increasing subsequence
+    tails, tail_idx, back = [], [], [-1] * len(pairs)
+    for n, (i, j) in enumerate(pairs):
+        pos = bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j); tail_idx.append(n)
+        else:
+            tails[pos] = j; tail_idx[pos] = n
+        back[n] = tail_idx[pos - 1] if pos else -1
+    result = []
+    n = tail_idx[-1]
+    while n != -1:
+        result.append(pairs[n])
+        n = back[n]
+    result.reverse()
+    return result
+
+
+def _patience_blocks(a, b, alo, ahi, blo, bhi, blocks, progress=None):
+    stack = [(alo, ahi, blo, bhi)]
+    steps = 0
+    while stack:
+        alo, ahi, blo, bhi = _trim_region(a, b, *stack.pop(), blocks)
+        steps += 1
+        _report(progress, steps, alo, len(a))
+        if alo == ahi or blo == bhi: continue
+        anchors = _unique_common_lcs(a, b, alo, ahi, blo, bhi)
+        if not anchors:
+            _myers_blocks(a, b, alo, ahi, blo, bhi, blocks, progress)
+            continue
+        prev_i, prev_j = alo, blo
+        for i, j in anchors:
+            stack.append((prev_i, i, prev_j, j))
+            blocks.append((i, j, 1))
+            prev_i, prev_j = i + 1, j + 1
+        stack.append((prev_i, ahi, prev_j, bhi))
+
+
+def patience_opcodes(a, b, progress=None):
+    """Patience diff: anchors on unique lines, Myers for the gaps."""
+    blocks = []
+    _patience_blocks(a, b, 0, len(a), 0, len(b), blocks, progress)
+    return blocks_to_opcodes(blocks, len(a), len(b))
+
+
+# --- Histogram ---
+def _rarest_common_block(a, b, alo, ahi, blo, bhi):
+    """Longest common block seeded by the lowest-occurrence line (git's histogram idea)."""
+    occurrences = {}
+    for i in range(alo, ahi):
+        occurrences.setdefault(a[i], []).append(i)
+    best = None # (count, -size, i, j)
+    j = blo
+    while j < bhi:
+        positions = occurrences.get(b[j])
+        next_j = j + 1
+        if positions and len(positions) <= HISTOGRAM_MAX_CHAIN and (best is None or len(positions) <= best[0]):
+            for i in positions:
+                si, sj = i, j
+                while si > alo and sj > blo and a[si - 1] == b[sj - 1]:
+                    si -= 1; sj -= 1
+                ei, ej = i + 1, j + 1
+                while ei < ahi and ej < bhi and a[ei] == b[ej]:
+                    ei += 1; ej += 1
+                candidate = (len(positions), -(ei - si), si, sj)
+                if best is None or candidate < best: best = candidate
+                if ej > next_j: next_j = ej
+        j = next_j
+    if best is None: return None
+    count, neg_size, i, j = best
+    return i, j, -neg_size
+
+
+def _histogram_blocks(a, b, alo, ahi, blo, bhi, blocks, progress=None):
+    stack = [(alo, ahi, blo, bhi)]
+    steps = 0
+    while stack:
+        alo, ahi, blo, bhi = _trim_region(a, b, *stack.pop(), blocks)
+        steps += 1
+        _report(progress, steps, alo, len(a))
+        if alo == ahi or blo == bhi: continue
+        block = _rarest_common_block(a, b, alo, ahi, blo, bhi)
+        if block is None:
+            _myers_blocks(a, b, alo, ahi, blo, bhi, blocks, progress)
+            continue
+        i, j, size = block
+        blocks.append(block)
+        stack.append((i + size, ahi, j + size, bhi))
+        stack.append((alo, i, blo, j))
+
+
+def histogram_opcodes(a, b, progress=None):
+    """Histogram diff: anchors on the rarest common lines, Myers as fallback."""
+    blocks = []
+    _histogram_blocks(a, b, 0, len(a), 0, len(b), blocks, progress)
+    return blocks_to_opcodes(blocks, len(a), len(b))
+
+
+# --- difflib ---
+def sequence_matcher_opcodes(a, b, progress=None):
+    """The original backend: difflib.SequenceMatcher without autojunk (no checkpoints)."""
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).get_opcodes()
+
+
+# --- Registry ---
+ALGORITHMS = {
+    "Myers": myers_opcodes,
+    "Histogram": histogram_opcodes,
+    "Patience": patience_opcodes,
+    "SequenceMatcher": sequence_matcher_opcodes,
+}
+DEFAULT_ALGORITHM = "Myers"
+
+
+def get_opcodes(a, b, algorithm=DEFAULT_ALGORITHM, progress=None):
+    """Runs the named backend; raises KeyError for unknown names."""
+    return ALGORITHMS[algorithm](a, b, progress)
@@ -0,0 +1,194 @@
+"""Content-addressed cache of diff results: an in-memory LRU plus an optional on-disk store.
+
+Entries are keyed by a hash of (left content, right content, algorithm,
+options) and hold only the opcodes; hunks, alignment and stats are rebuilt
+with build_result, which is linear in the number of opcodes. Results handed
+out are fresh objects, so merges that patch them never touch the cache.
+"""
+import hashlib
+import os
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+
+from diff_engine import build_result, compute_diff
+from line_source import MappedLines
+
+MEMORY_BUDGET_BYTES = 64 * 1024 * 1024
+DISK_BUDGET_BYTES = 512 * 1024 * 1024
+OPCODE_BYTES = 120 # Rough in-memory size of one opcode tuple
+HASH_CHUNK_LINES = 65536
+_TAG_CODES = {'equal': 0, 'replace': 1, 'delete': 2, 'insert': 3}
+_TAG_NAMES = {code: tag for tag, code in _TAG_CODES.items()}
+
+
+def user_cache_dir(app_name="text-difference-checker"):
+    """Per-user cache directory for the platform (not created here)."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, app_name)
+
+
+def content_digest(lines):
+    """Digest of a line sequence; memory-mapped files hash their raw bytes."""
+    hasher = hashlib.blake2b(digest_size=20)
+    if isinstance(lines, MappedLines):
+        hasher.update(b"file:")
+        hasher.update(lines.raw)
+        return hasher.digest()
+    hasher.update(b"lines:")
+    for lo in range(0, len(lines), HASH_CHUNK_LINES):
+        chunk = lines[lo:lo + HASH_CHUNK_LINES]
+        hasher.update("".join(line + "\n" for line in chunk).encode("utf-8", "surrogatepass"))
+    return hasher.digest()
+
+
+def pack_opcodes(opcodes, len1, len2):
+    """Opcodes as a flat array('q'): len1, len2, then tag, i1, i2, j1, j2 per opcode."""
+    data = array('q', [len1, len2])
+    for tag, i1, i2, j1, j2 in opcodes:
+        data.extend((_TAG_CODES[tag], i1, i2, j1, j2))
+    return data
+
+
+def unpack_opcodes(raw):
+    """Inverse of pack_opcodes for its bytes; returns (opcodes, len1, len2) or None if malformed."""
+    data = array('q')
+    try:
+        data.frombytes(raw)
+    except ValueError:
+        return None
+    if len(data) < 2 or (len(data) - 2) % 5: return None
+    try:
+        opcodes = tuple((_TAG_NAMES[data[k]], data[k + 1], data[k + 2], data[k + 3], data[k + 4])
+                        for k in range(2, len(data), 5))
+    except KeyError:
+        return None
+    return opcodes, data[0], data[1]
+
+
+def cache_key(lines1, lines2, algorithm, options=()):
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(content_digest(lines1))
+    hasher.update(content_digest(lines2))
+    hasher.update(repr((algorithm, tuple(options))).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class DiffCache:
+    """Thread-safe LRU of opcodes with an optional directory of binary entries.
+
+    disk_dir=None keeps the cache in memory only. On disk, each entry is a
+    flat array of 64-bit ints (len1, len2, then tag, i1, i2, j1, j2 per
+    opcode); the least recently used files are removed once the directory
+    grows past disk_budget.
+    """
+
+    def __init__(self, memory_budget=MEMORY_BUDGET_BYTES, disk_dir=None, disk_budget=DISK_BUDGET_BYTES):
+        self.memory_budget = memory_budget
+        self.disk_dir = disk_dir
+        self.disk_budget = disk_budget
+        self._entries = OrderedDict() # key -> (opcodes, len1, len2)
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        if disk_dir: os.makedirs(disk_dir, exist_ok=True)
+
+    # --- Lookup ---
+    def compute(self, lines1, lines2, algorithm, options=(), progress=None, keys=None):
+        """compute_diff with caching; returns a new DiffResult either way.
+
+        keys, if given, is called on a miss for the (keys1, keys2) sequences
+        to diff in place of the lines (see compare_keys); the entry is still
+        keyed by the original lines plus `options`.
+        """
+        if progress: progress("hash", None)
+        key = cache_key(lines1, lines2, algorithm, options)
+        entry = self.get(key)
+        if entry is not None:
+            opcodes, len1, len2 = entry
+            return build_result(list(opcodes), len1, len2)
+        result = compute_diff(*(keys() if keys else (lines1, lines2)), algorithm, progress)
+        self.put(key, result.opcodes, len(lines1), len(lines2))
+        return result
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self._read_disk(key)
+        if entry is not None: self._remember(key, entry)
+        return entry
+
+    def put(self, key, opcodes, len1, len2):
+        entry = (tuple(opcodes), len1, len2)
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._memory_used = 0
+
+    # --- Memory LRU ---
+    def _remember(self, key, entry):
+        size = len(entry[0]) * OPCODE_BYTES
+        if size > self.memory_budget: return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None: self._memory_used -= len(old[0]) * OPCODE_BYTES
+            self._entries[key] = entry
+            self._memory_used += size
+            while self._memory_used > self.memory_budget:
+                _, evicted = self._entries.popitem(last=False)
+                self._memory_used -= len(evicted[0]) * OPCODE_BYTES
+
+    # --- Disk Store ---
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key + ".ops")
+
+    def _read_disk(self, key):
+        if not self.disk_dir: return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path) # mtime doubles as the LRU clock
+        except OSError:
+            return None
+        return unpack_opcodes(data)
+
+    def _write_disk(self, key, entry):
+        if not self.disk_dir: return
+        data = pack_opcodes(*entry)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                data.tofile(f)
+            os.replace(tmp_path, path) # Readers never see a half-written entry
+        except OSError:
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        try:
+            entries = []
+            for entry in os.scandir(self.disk_dir):
+                if entry.name.endswith(".ops"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.disk_budget: break
+            try: os.remove(path)
+            except OSError: continue
+            total -= size
@@ -0,0 +1,436 @@
+"""Tk-free diff engine shared by the GUI and the batch command line mode."""
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+
+from compare_keys import KeyCache, KeyOptions
+from diff_algorithms import DEFAULT_ALGORITHM, get_opcodes
+from hunk_table import HunkTable
+from line_source import MappedLines
+
+PLACEHOLDER_TEXT = ">>> Missing Line(s) <<<"
+INTERN_CHUNK = 65536 # Lines interned between progress checkpoints
+ANCHOR_LINES = 10 # Unchanged lines on each side of an edit that rediff_edits diffs again
+
+
+class DiffCancelled(Exception):
+    """Raised by a progress callback to abandon a comparison."""
+
+
+@dataclass
+class DiffStats:
+    """Line and hunk counters for one comparison."""
+    lines1: int = 0
+    lines2: int = 0
+    hunks: int = 0
+    equal: int = 0 # Lines common to both sides
+    deleted: int = 0 # Left lines of 'delete' hunks
+    inserted: int = 0 # Right lines of 'insert' hunks
+    changed1: int = 0 # Left lines of 'replace' hunks
+    changed2: int = 0 # Right lines of 'replace' hunks
+
+    def summary(self):
+        if not self.hunks: return "No differences found."
+        return (f"{self.hunks} differences found "
+                f"(+{self.inserted} -{self.deleted} ~{self.changed1}/{self.changed2} lines).")
+
+
+class Alignment:
+    """Maps aligned rows to line numbers of each side.
+
+    Every opcode occupies max(len1, len2) rows in both panes; the shorter side
+    is padded with placeholder rows after its own lines. Rows and line numbers
+    are 0-based here, widgets add 1.
+    """
+
+    def __init__(self, opcodes):
+        self.opcodes = opcodes
+        self.row_starts = array('q')
+        self.i_starts = array('q')
+        self.j_starts = array('q')
+        row = 0
+        for tag, i1, i2, j1, j2 in opcodes:
+            self.row_starts.append(row)
+            self.i_starts.append(i1)
+            self.j_starts.append(j1)
+            row += max(i2 - i1, j2 - j1)
+        self.total_rows = row
+
+    def spliced(self, opcodes, lo, hi, count, di, dj, drow):
+        """Alignment of `opcodes`, where `count` new opcodes replaced this one's [lo:hi].
+
+        Only the new opcodes are walked; the starts after them move by
+        di/dj/drow a whole array slice at a time.
+        """
+        window = Alignment(opcodes[lo:lo + count]) # Rows counted from the window's start
+        row = self.row_starts[lo] if lo < len(self.opcodes) else self.total_rows
+        new = Alignment([])
+        new.opcodes = opcodes
+        new.row_starts = self.row_starts[:lo] + _shifted(window.row_starts, row) + _shifted(self.row_starts[hi:], drow)
+        new.i_starts = self.i_starts[:lo] + window.i_starts + _shifted(self.i_starts[hi:], di)
+        new.j_starts = self.j_starts[:lo] + window.j_starts + _shifted(self.j_starts[hi:], dj)
+        new.total_rows = self.total_rows + drow
+        return new
+
+    def op_index_for_row(self, row):
+        """Index of the opcode that contains the given row (clamped)."""
+        if not self.opcodes: return -1
+        return max(0, min(bisect_right(self.row_starts, row) - 1, len(self.opcodes) - 1))
+
+    def left_for_row(self, row):
+        """Left line shown on a row, or None for a placeholder row."""
+        k = self.op_index_for_row(row)
+        if k < 0: return None
+        tag, i1, i2, j1, j2 = self.opcodes[k]
+        offset = row - self.row_starts[k]
+        return i1 + offset if 0 <= offset < i2 - i1 else None
+
+    def right_for_row(self, row):
+        """Right line shown on a row, or None for a placeholder row."""
+        k = self.op_index_for_row(row)
+        if k < 0: return None
+        tag, i1, i2, j1, j2 = self.opcodes[k]
+        offset = row - self.row_starts[k]
+        return j1 + offset if 0 <= offset < j2 - j1 else None
+
+    def row_for_left(self, i):
+        """Row that shows left line i (lines past the end map to total_rows)."""
+        return self._row_for_line(self.i_starts, 1, 2, i)
+
+    def row_for_right(self, j):
+        """Row that shows right line j (lines past the end map to total_rows)."""
+        return self._row_for_line(self.j_starts, 3, 4, j)
+
+    def _row_for_line(self, starts, lo_field, hi_field, line):
+        if not self.opcodes or line >= self.opcodes[-1][hi_field]: return self.total_rows
+        k = max(bisect_right(starts, line) - 1, 0)
+        return self.row_starts[k] + line - self.opcodes[k][lo_field]
+
+    def segments(self, start, end):
+        """Yields (k, row_lo, row_hi) for each opcode k overlapping rows [start, end)."""
+        k = self.op_index_for_row(start)
+        if k < 0: return
+        while k < len(self.opcodes) and self.row_starts[k] < end:
+            tag, i1, i2, j1, j2 = self.opcodes[k]
+            row_lo = max(start, self.row_starts[k])
+            row_hi = min(end, self.row_starts[k] + max(i2 - i1, j2 - j1))
+            if row_lo < row_hi: yield k, row_lo, row_hi
+            k += 1
+
+    def placeholder_runs(self):
+        """Yields (side, row, count) for each run of placeholder rows; side is 1 or 2."""
+        for k, (tag, i1, i2, j1, j2) in enumerate(self.opcodes):
+            len1, len2 = i2 - i1, j2 - j1
+            if len1 < len2: yield 1, self.row_starts[k] + len1, len2 - len1
+            elif len2 < len1: yield 2, self.row_starts[k] + len2, len1 - len2
+
+
+def _shifted(column, delta):
+    """An array('q') slice with delta added to every value; the slice itself for 0 (typing within a line)."""
+    return array('q', map(delta.__add__, column)) if delta else column
+
+
+@dataclass
+class DiffResult:
+    """Everything the GUI needs to display a comparison."""
+    opcodes: list
+    hunks: HunkTable # One hunk per non-equal opcode (the app's self.diffs)
+    alignment: Alignment
+    stats: DiffStats
+
+    @property
+    def identical(self):
+        return not self.hunks
+
+    # --- Hunk Index ---
+    @property
+    def hunk_rows(self):
+        """Start row of every hunk, ascending."""
+        return self.hunks.rows
+
+    def hunk_after(self, row, inclusive=False):
+        """Index of the first hunk starting after (or at) row, or len(hunks)."""
+        return (bisect_left if inclusive else bisect_right)(self.hunk_rows, row)
+
+    def hunk_before(self, row):
+        """Index of the last hunk starting before row, or -1."""
+        return bisect_left(self.hunk_rows, row) - 1
+
+    def next_hunk(self, row, current=-1, reset=False):
+        """Index of the hunk Next selects, wrapping around; -1 without hunks.
+
+        With a selected hunk `current`, that is simply the one after it;
+        otherwise (or with reset) the first hunk after row, or at it with reset.
+        """
+        count = len(self.hunks)
+        if not count: return -1
+        if current != -1 and not reset: return (current + 1) % count
+        index = self.hunk_after(row, inclusive=reset)
+        return index if index < count else 0
+
+    def prev_hunk(self, row, current=-1):
+        """Mirror of next_hunk: the hunk before `current`, or the last one starting before row."""
+        count = len(self.hunks)
+        if not count: return -1
+        if current != -1: return (current - 1) % count
+        index = self.hunk_before(row)
+        return index if index >= 0 else count - 1
+
+    def hunk_nearest(self, row):
+        """Index of the hunk whose start is closest to row, or -1 without hunks."""
+        rows = self.hunk_rows
+        if not rows: return -1
+        k = bisect_left(rows, row)
+        if k == len(rows): return k - 1
+        if k and row - rows[k - 1] <= rows[k] - row: return k - 1
+        return k
+
+
+# --- Preprocessing ---
+def common_affixes(lines1, lines2):
+    """Lengths of the common prefix and the (non-overlapping) common suffix."""
+    n1, n2 = len(lines1), len(lines2)
+    limit = min(n1, n2)
+    prefix = 0
+    while prefix < limit and lines1[prefix] == lines2[prefix]:
+        prefix += 1
+    suffix = 0
+    limit -= prefix
+    while suffix < limit and lines1[n1 - 1 - suffix] == lines2[n2 - 1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+
+def intern_lines(lines1, lines2, lo1=0, hi1=None, lo2=0, hi2=None, progress=None):
+    """Maps each distinct line to a small int so the diff core compares ints.
+
+    Returns two array('i') buffers covering lines1[lo1:hi1] and lines2[lo2:hi2].
+    Lines are fetched one by one, so lazy sequences (MappedLines) are never
+    copied as a whole.
+    """
+    ids = {}
+    def ids_of(lines, lo, hi):
+        if hi is None: hi = len(lines)
+        out = array('i')
+        for chunk_lo in range(lo, hi, INTERN_CHUNK):
+            if progress: progress("intern", (chunk_lo - lo) / (hi - lo))
+            chunk = range(chunk_lo, min(hi, chunk_lo + INTERN_CHUNK))
+            out.extend([ids.setdefault(line, len(ids)) for line in map(lines.__getitem__, chunk)])
+        return out
+    return ids_of(lines1, lo1, hi1), ids_of(lines2, lo2, hi2)
+
+
+def diff_opcodes(lines1, lines2, algorithm=DEFAULT_ALGORITHM, progress=None):
+    """Opcodes for two line sequences after trimming and interning.
+
+    Only the differing middle is handed to the algorithm, as int arrays;
+    the common head and tail become single 'equal' opcodes. progress is an
+    optional callback(phase, fraction) that may raise DiffCancelled.
+    """
+    n1, n2 = len(lines1), len(lines2)
+    if progress: progress("trim", None)
+    prefix, suffix = common_affixes(lines1, lines2)
+    a, b = intern_lines(lines1, lines2, prefix, n1 - suffix, prefix, n2 - suffix, progress)
+    opcodes = [('equal', 0, prefix, 0, prefix)] if prefix else []
+    if a or b:
+        if progress: progress("diff", None)
+        opcodes.extend((tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix)
+                       for tag, i1, i2, j1, j2 in get_opcodes(a, b, algorithm, progress))
+    if suffix: opcodes.append(('equal', n1 - suffix, n1, n2 - suffix, n2))
+    return opcodes
+
+
+# --- Building Results ---
+def build_result(opcodes, len1, len2):
+    """Derives hunks, alignment and stats from a list of opcodes."""
+    alignment = Alignment(opcodes)
+    stats = DiffStats(lines1=len1, lines2=len2)
+    hunks = HunkTable.from_opcodes(opcodes, alignment.row_starts)
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal': stats.equal += i2 - i1
+        elif tag == 'delete': stats.deleted += i2 - i1
+        elif tag == 'insert': stats.inserted += j2 - j1
+        else:
+            stats.changed1 += i2 - i1
+            stats.changed2 += j2 - j1
+    stats.hunks = len(hunks)
+    return DiffResult(opcodes, hunks, alignment, stats)
+
+
+def _count_opcodes(stats, opcodes, sign):
+    """Adds (sign=1) or removes (sign=-1) the line counts of opcodes to stats."""
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal': stats.equal += sign * (i2 - i1)
+        elif tag == 'delete': stats.deleted += sign * (i2 - i1)
+        elif tag == 'insert': stats.inserted += sign * (j2 - j1)
+        else:
+            stats.changed1 += sign * (i2 - i1)
+            stats.changed2 += sign * (j2 - j1)
+
+
+def splice_opcodes(result, lo, hi, new_opcodes, len1, len2):
+    """Replaces result.opcodes[lo:hi] by new_opcodes and shifts what follows.
+
+    new_opcodes must start where opcodes[lo] started and may cover a different
+    number of lines; len1/len2 are the new total line counts. Hunks after the
+    window are shifted in place, a column at a time. Returns a new DiffResult.
+    """
+    old = result.opcodes
+    old_window = old[lo:hi]
+    di = (new_opcodes[-1][2] if new_opcodes else old[lo][1]) - (old[hi - 1][2] if hi > lo else old[lo][1])
+    dj = (new_opcodes[-1][4] if new_opcodes else old[lo][3]) - (old[hi - 1][4] if hi > lo else old[lo][3])
+    old_rows = sum(max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in old_window)
+    new_rows = sum(max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in new_opcodes)
+    drow = new_rows - old_rows
+
+    opcodes = old[:lo]
+    opcodes.extend(new_opcodes)
+    if di or dj: opcodes.extend((tag, i1 + di, i2 + di, j1 + dj, j2 + dj) for tag, i1, i2, j1, j2 in old[hi:])
+    else: opcodes.extend(old[hi:])
+    alignment = result.alignment.spliced(opcodes, lo, hi, len(new_opcodes), di, dj, drow)
+
+    # Hunks before the window are untouched, hunks after it only move
+    hunks = result.hunks
+    row_starts, total_rows = result.alignment.row_starts, result.alignment.total_rows
+    first_hunk = hunks.first_at_or_after('rows', row_starts[lo] if lo < len(old) else total_rows)
+    old_hunk_count = hunks.first_at_or_after('rows', row_starts[hi] if hi < len(old) else total_rows) - first_hunk
+    hunks.shift(first_hunk + old_hunk_count, di, dj, drow)
+    hunks.splice(first_hunk, first_hunk + old_hunk_count, HunkTable.from_opcodes(new_opcodes, alignment.row_starts, lo))
+
+    stats = result.stats
+    stats.lines1, stats.lines2 = len1, len2
+    _count_opcodes(stats, old_window, -1)
+    _count_opcodes(stats, new_opcodes, 1)
+    stats.hunks = len(hunks)
+    return DiffResult(opcodes, hunks, alignment, stats)
+
+
+def rediff_window(result, lines1, lines2, lo, hi, algorithm=DEFAULT_ALGORITHM):
+    """Re-diffs opcodes[lo:hi] after the lines they cover were edited.
+
+    lines1/lines2 are the edited documents. The window grows to the
+    neighbouring 'equal' opcodes, which act as anchors, and everything after
+    it is shifted by the change in length. Returns (result, lo, hi) where
+    lo:hi is the range of the new opcodes that replaced the window.
+    """
+    if lo > 0 and result.opcodes[lo - 1][0] == 'equal': lo -= 1
+    if hi < len(result.opcodes) and result.opcodes[hi][0] == 'equal': hi += 1
+    old = result.opcodes
+    i_lo, j_lo = old[lo][1], old[lo][3]
+    # The window ends where the first opcode after it starts, in edited coordinates
+    tail1 = result.stats.lines1 - old[hi - 1][2]
+    tail2 = result.stats.lines2 - old[hi - 1][4]
+    i_hi, j_hi = len(lines1) - tail1, len(lines2) - tail2
+    window = diff_opcodes(lines1[i_lo:i_hi], lines2[j_lo:j_hi], algorithm)
+    window = [(tag, i1 + i_lo, i2 + i_lo, j1 + j_lo, j2 + j_lo) for tag, i1, i2, j1, j2 in window]
+    new_result = splice_opcodes(result, lo, hi, window, len(lines1), len(lines2))
+    return new_result, lo, lo + len(window)
+
+
+def rediff_edits(result, lines1, lines2, edit1=None, edit2=None, algorithm=DEFAULT_ALGORITHM, anchor_lines=ANCHOR_LINES):
+    """Re-diffs the neighbourhood of edited line ranges.
+
+    edit1/edit2 are the (lo, hi) ranges of old left/right lines that were
+    replaced, None for a side that was not edited; lines1/lines2 are the
+    edited documents. The window starts and ends inside the unchanged
+    'equal' opcodes around the edits, at most anchor_lines lines away from
+    them, so its cost depends on the edit and not on the document size.
+    Returns (result, lo, hi) like rediff_window.
+    """
+    old = result.opcodes
+    alignment = result.alignment
+    starts, ends = [], [] # Aligned cut points (op index, left line, right line) before/after each edit
+    for edit, op_starts, side in ((edit1, alignment.i_starts, 0), (edit2, alignment.j_starts, 1)):
+        if edit is None: continue
+        lo, hi = edit
+        k = max(0, bisect_right(op_starts, lo) - 1)
+        if old[k][0] != 'equal' and k > 0 and old[k - 1][0] == 'equal':
+            k -= 1
+            lo = old[k][2 + 2 * side] # The edit starts right after this anchor
+        tag, i1, i2, j1, j2 = old[k]
+        offset = max(0, lo - (i1, j1)[side] - anchor_lines) if tag == 'equal' else 0
+        starts.append((k, i1 + offset, j1 + offset))
+
+        k = max(0, bisect_right(op_starts, max(lo, hi - 1)) - 1)
+        if old[k][0] != 'equal' and k + 1 < len(old) and old[k + 1][0] == 'equal':
+            k += 1
+            hi = old[k][1 + 2 * side] # The edit ends right before this anchor
+        tag, i1, i2, j1, j2 = old[k]
+        if tag == 'equal':
+            offset = min(i2 - i1, hi - (i1, j1)[side] + anchor_lines)
+            ends.append((k, i1 + offset, j1 + offset))
+        else:
+            ends.append((k, i2, j2))
+    lo, a1, a2 = min(starts)
+    hi, b1, b2 = max(ends)
+    # A cut at the very edge of an anchor would put new changes right next to
+    # the old change beyond it; that change is diffed again with the window
+    if a1 == old[lo][1] and a2 == old[lo][3] and lo > 0 and old[lo - 1][0] != 'equal':
+        lo -= 1
+        a1, a2 = old[lo][1], old[lo][3]
+    if b1 == old[hi][2] and b2 == old[hi][4] and hi + 1 < len(old) and old[hi + 1][0] != 'equal':
+        hi += 1
+        b1, b2 = old[hi][2], old[hi][4]
+
+    d1, d2 = len(lines1) - result.stats.lines1, len(lines2) - result.stats.lines2
+    tag, i1, i2, j1, j2 = old[lo]
+    window = [('equal', i1, a1, j1, a2)] if a1 > i1 else []
+    window.extend((tag, i1 + a1, i2 + a1, j1 + a2, j2 + a2)
+                  for tag, i1, i2, j1, j2 in diff_opcodes(lines1[a1:b1 + d1], lines2[a2:b2 + d2], algorithm))
+    tag, i1, i2, j1, j2 = old[hi]
+    if b1 < i2: window.append(('equal', b1 + d1, i2 + d1, b2 + d2, j2 + d2))
+    window = _coalesce(window)
+    new_result = splice_opcodes(result, lo, hi + 1, window, len(lines1), len(lines2))
+    return new_result, lo, lo + len(window)
+
+
+def _coalesce(opcodes):
+    """Merges neighbouring opcodes of the same kind.
+
+    Runs of 'equal' opcodes (e.g. a kept anchor part and the window's common
+    head) become one 'equal', runs of changes become one change, so no two
+    neighbouring opcodes are both changes: one edit is one hunk.
+    """
+    out = []
+    for op in opcodes:
+        if out and (op[0] == 'equal') == (out[-1][0] == 'equal'):
+            _, i1, _, j1, _ = out[-1]
+            i2, j2 = op[2], op[4]
+            tag = op[0] if op[0] == 'equal' else 'replace' if i2 > i1 and j2 > j1 else 'delete' if i2 > i1 else 'insert'
+            out[-1] = (tag, i1, i2, j1, j2)
+        else:
+            out.append(op)
+    return out
+
+
+def compute_diff(lines1, lines2, algorithm=DEFAULT_ALGORITHM, progress=None):
+    """Compares two sequences of lines and returns a DiffResult.
+
+    `algorithm` is a key of diff_algorithms.ALGORITHMS; see diff_opcodes
+    for `progress`.
+    """
+    opcodes = diff_opcodes(lines1, lines2, algorithm, progress)
+    if progress: progress("build", None)
+    return build_result(opcodes, len(lines1), len(lines2))
+
+
+# --- File Helpers (used by the batch mode) ---
+def diff_files(path1, path2, algorithm=DEFAULT_ALGORITHM, cache=None, key_options=None, key_cache=None):
+    """Compares two files on disk through memory maps.
+
+    cache is an optional diff_cache.DiffCache to look the pair up in first;
+    key_options/key_cache are as for DiffWorker.
+    """
+    options = key_options if key_options is not None else KeyOptions()
+    key_cache = key_cache if key_cache is not None else KeyCache()
+    lines1 = MappedLines(path1)
+    try:
+        lines2 = MappedLines(path2)
+        try:
+            def keys(): return key_cache.keys(lines1, options), key_cache.keys(lines2, options)
+            if cache is not None: return cache.compute(lines1, lines2, algorithm, options.as_tuple(), keys=keys)
+            return compute_diff(*keys(), algorithm)
+        finally:
+            lines2.close()
+    finally:
+        lines1.close()
@@ -0,0 +1,97 @@
+"""Runs a comparison on a background thread so the Tk main loop stays responsive."""
+import cProfile
+import threading
+import time
+
+from compare_keys import KeyCache, KeyOptions
+from diff_engine import DiffCancelled, build_result, compute_diff
+
+
+class DiffWorker:
+    """One background compute_diff call.
+
+    The Tk side polls `state` from after() callbacks; the thread never
+    touches a widget. cancel() makes the next progress checkpoint raise
+    DiffCancelled, so an abandoned worker stops soon after. Precomputed
+    opcodes (from a folder comparison) skip the diff when they cover
+    exactly the given lines. `timings` holds the seconds spent in each
+    progress phase once the worker has finished. Non-default key_options
+    (compare_keys.KeyOptions) diff normalized keys from key_cache instead
+    of the lines themselves.
+    """
+
+    def __init__(self, lines1, lines2, algorithm, cache=None, opcodes=None, profile=False,
+                 key_options=None, key_cache=None):
+        self.lines1 = lines1
+        self.lines2 = lines2
+        self.algorithm = algorithm
+        self.cache = cache # Optional diff_cache.DiffCache
+        self.opcodes = opcodes
+        self.key_options = key_options if key_options is not None else KeyOptions()
+        self.key_cache = key_cache if key_cache is not None else KeyCache()
+        self.state = "running" # running, done, cancelled or error
+        self.phase = None # Latest progress report
+        self.fraction = None
+        self.result = None
+        self.error = None
+        self.timings = {} # Phase -> seconds
+        self.profile = cProfile.Profile() if profile else None # Profiles the worker thread only
+        self._phase_start = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _progress(self, phase, fraction):
+        if self._cancel.is_set(): raise DiffCancelled()
+        if phase != self.phase: self._close_phase()
+        self.phase, self.fraction = phase, fraction
+
+    def _close_phase(self):
+        now = time.perf_counter()
+        if self.phase is not None:
+            self.timings[self.phase] = self.timings.get(self.phase, 0.0) + now - self._phase_start
+        self._phase_start = now
+
+    def _opcodes_fit(self):
+        if self.opcodes is None: return False
+        if not self.opcodes: return not self.lines1 and not self.lines2
+        tag, i1, i2, j1, j2 = self.opcodes[-1]
+        return i2 == len(self.lines1) and j2 == len(self.lines2)
+
+    def _keys(self):
+        if self.key_options.identity: return self.lines1, self.lines2
+        self._progress("keys", None)
+        return (self.key_cache.keys(self.lines1, self.key_options),
+                self.key_cache.keys(self.lines2, self.key_options))
+
+    def _run(self):
+        if self.profile: self.profile.enable()
+        try:
+            state = self._compute()
+        finally:
+            if self.profile: self.profile.disable()
+        self._close_phase()
+        self.state = state # Last, so the main loop sees complete timings
+
+    def _compute(self):
+        try:
+            if self._opcodes_fit():
+                self._progress("build", None)
+                self.result = build_result(self.opcodes, len(self.lines1), len(self.lines2))
+            elif self.cache is not None:
+                self.result = self.cache.compute(self.lines1, self.lines2, self.algorithm, self.key_options.as_tuple(),
+                                                 self._progress, self._keys)
+            else:
+                self.result = compute_diff(*self._keys(), self.algorithm, self._progress)
+            return "done"
+        except DiffCancelled:
+            return "cancelled"
+        except Exception as e: # Reported on the main loop
+            self.error = e
+            return "error"
@@ -1,7 +1,34 @@
 import tkinter as tk
-from tkinter import scrolledtext, ttk # Import ttk for Combobox
-import difflib
+from tkinter import filedialog, messagebox, scrolledtext, simpledialog, ttk # Import ttk for Combobox
+from tkinter import font as tkfont
+import argparse
+import os
+import re
 import sys
+import time
+from bisect import bisect_right
+from itertools import accumulate
+
+from compare_keys import MASK_PRESETS, WHITESPACE_MODES, KeyCache, KeyOptions
+from compare_stats import CompareStats, ProfileCapture, TclCallCounter
+from diff_algorithms import ALGORITHMS, DEFAULT_ALGORITHM
+from diff_cache import DiffCache, user_cache_dir
+from diff_engine import diff_files, rediff_edits, rediff_window
+from diff_worker import DiffWorker
+from edit_tracker import EditTracker
+from folder_compare import FolderComparison
+from folder_view import FolderView
+from intraline import line_pair_spans
+from line_source import MappedLines
+from merge_engine import conflict_count, merge_regions, merged_lines
+from merge_view import MergeView
+from overview_ruler import OverviewRuler
+from patch_io import PatchError, apply_patch, context_diff, unified_diff
+from piece_table import PieceTable
+from render_plan import PLAN_OPCODES, RenderPlan
+from scroll_sync import ScrollSync
+from token_cache import TokenCache
+from virtual_view import VirtualViewport
 
 # --- Pygments Imports (for Syntax Highlighting) ---
 try:
@@ -28,7 +55,27 @@ SELECT_BG_COLOR = "#555555" # Lighter grey selection
 DEL_BG_COLOR = "#6e3b3b"
 ADD_BG_COLOR = "#3b6e3b"
 CHANGE_BG_COLOR = "#3b3b6e"
+WORD_CHANGE_BG_COLOR = "#4f4f94" # Changed words inside a changed line
+CHAR_CHANGE_BG_COLOR = "#6d6dc4" # Changed characters inside those words
 MISSING_FG_COLOR = "#ff6347" # Tomato red
+FOLD_FG_COLOR = "#8a8a8a"
+
+# --- Large Input Limits ---
+LARGE_FILE_BYTES = 8 * 1024 * 1024 # Bigger files open straight into the virtual view
+VIRTUAL_EXIT_WARN_ROWS = 500_000 # Ask before writing more lines than this back into the panes
+FOLD_CONTEXT_LINES = 3 # Identical lines left visible above and below a fold
+FOLD_MIN_LINES = FOLD_CONTEXT_LINES + 1 # Fewer hidden lines than this are not worth a fold row
+
+# --- Background Compare ---
+WORKER_POLL_MS = 50 # How often the main loop checks on the diff worker
+RENDER_SLICE_SECONDS = 0.015 # Main-loop time spent applying a result before yielding to events
+PROGRESS_PHASES = {"hash": "checking cache", "keys": "normalizing lines", "trim": "trimming", "intern": "indexing lines", "diff": "matching", "build": "building hunks"}
+INTRALINE_SELECT_MAX_ROWS = 1000 # Rows of a selected block that get word/char differences up front
+LIVE_DIFF_DELAY_MS = 150 # Typing pause after which Live Diff updates the comparison
+LIVE_DIFF_MAX_LINES = 5000 # Larger edits (pastes, loaded files) are compared again in full on the worker
+EXPORT_CHECK_LINES = 256 # Diff lines written between checks of the export's time slice
+DIFF_FILE_TYPES = [("Diff files", "*.diff *.patch"), ("All files", "*.*")]
+WHITESPACE_LABELS = ("Exact Whitespace", "Trailing Whitespace", "Whitespace Changes", "All Whitespace") # Per WHITESPACE_MODES
 
 # --- Syntax Highlighting Style ---
 # Choose a Pygments style compatible with dark background
@@ -36,16 +83,38 @@ SYNTAX_STYLE_NAME = 'monokai'
 
 
 class DiffCheckerApp:
-    def __init__(self, master):
+    def __init__(self, master, diff_cache=None):
         self.master = master
+        self.diff_cache = diff_cache or DiffCache() # Repeat comparisons skip the diff
+        self.key_cache = KeyCache() # Normalized lines for the Ignore options
         master.title("Text Difference Checker")
         master.geometry("1250x750") # Wider for new buttons
         master.config(bg=BG_COLOR)
 
         self.diffs = []
+        self.diff_result = None # diff_engine.DiffResult of the last comparison
+        # Each pane's real lines; the EditTrackers keep them in sync with edits to editable panes
+        self.lines1 = PieceTable()
+        self.lines2 = PieceTable()
         self.current_diff_index = -1 # Index in self.diffs of the currently selected diff
+        self._selection_cursor = None # Left pane's cursor index when that diff was selected
         self.selected_diff_details = None
         self.identical_visible = True # State for identical line visibility
+        self.virtual_mode = False # Widgets show a window of the model instead of the real text
+        self._worker = None # DiffWorker of the running comparison
+        self._cancelled_workers = [] # Cancelled DiffWorkers whose threads may not have stopped yet
+        self._compare_generation = 0 # Bumped by every new or cancelled comparison
+        self._panes_locked = False # A comparison holds the panes read-only until it is applied
+        self._intraline_rows = set() # Aligned rows whose word/char differences are painted
+        self._intraline_pending = False
+        self.compare_stats = None # compare_stats.CompareStats of the running comparison
+        self.last_compare_stats = None
+        self.stats_log = None # Optional JSON lines file every finished comparison is appended to
+        self._profile_path = None # Set by profile_next_compare
+        self._profile = None # ProfileCapture of the comparison being profiled
+        self._live_after = None # Pending after() id of the Live Diff update
+        self._export_file = None # File a diff export is being written to
+        self.pane_paths = [None, None] # Files last opened into the left and right panes
 
         # --- Configure Tags ---
         self.tag_add = "addition"
@@ -54,8 +123,16 @@ class DiffCheckerApp:
         self.tag_selected = "selected_diff"
         self.tag_missing = "missing_line"
         self.tag_identical = "identical_line" # New tag for identical lines
+        self.tag_word_change = "word_change" # Intra-line differences of 'replace' rows
+        self.tag_char_change = "char_change"
+        self.tag_folded = "folded_lines" # Lines hidden behind a fold row
+        self._folds = {} # Left label path -> (left label, right label) of each collapsed fold
+        self._filler_tags = set() # Configured filler tag names, see _filler_tag
+        self._linespace = None
         # Syntax tags will be configured dynamically
         self.syntax_tags = {} # Map Pygments Token -> Tkinter Tag Name
+        self._token_tag_cache = {} # Token type -> resolved tag name (or None), see _syntax_tag_for
+        self.token_cache = TokenCache() # Lexed spans per (lexer, content), see _highlight_widget
 
         # --- Main PanedWindow ---
         self.paned_window = tk.PanedWindow(
@@ -88,10 +165,21 @@ class DiffCheckerApp:
             selectforeground=FG_COLOR, bd=0, highlightthickness=0
         )
         self.text2_scroll.config(command=self.text2.yview)
+        # Overview ruler on the far right, see overview_ruler.py
+        self.ruler = OverviewRuler(self, self.right_frame, bg=BG_COLOR, colours={
+            'delete': DEL_BG_COLOR, 'insert': ADD_BG_COLOR, 'replace': CHANGE_BG_COLOR})
+        self.ruler.canvas.pack(side=tk.RIGHT, fill=tk.Y)
         self.text2_scroll.pack(side=tk.RIGHT, fill=tk.Y)
         self.text2.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self._apply_base_tag_configs(self.text2) # Apply diff/missing/identical tags
         self.paned_window.add(self.right_frame, stretch="always")
+        # Count the Tcl commands both panes issue, see compare_stats.TclCallCounter
+        self._tcl_counters = (TclCallCounter(self.text1.tk), TclCallCounter(self.text2.tk))
+        self.text1.tk, self.text2.tk = self._tcl_counters
+        # Edited line ranges for Live Diff and the pane documents, see edit_tracker.py
+        self._edit_trackers = (EditTracker(self.text1, self.lines1), EditTracker(self.text2, self.lines2))
+        for widget in (self.text1, self.text2):
+            widget.bind("<<Modified>>", self._on_text_modified, add="+")
 
         # --- Configure Syntax Highlighting (if available) ---
         if PYGMENTS_AVAILABLE:
@@ -114,9 +202,27 @@ class DiffCheckerApp:
         )
         self.next_diff_button.pack(side=tk.LEFT, padx=5)
 
+        self.prev_diff_button = tk.Button(
+            self.control_frame, text="Find Prev Diff", command=self.find_prev_diff_from_cursor, state=tk.DISABLED,
+            bg=BUTTON_BG_COLOR, fg=BUTTON_FG_COLOR, activebackground=BUTTON_ACTIVE_BG, activeforeground=BUTTON_FG_COLOR, relief=tk.FLAT, bd=1
+        )
+        self.prev_diff_button.pack(side=tk.LEFT, padx=5)
+
+        self.goto_diff_button = tk.Button(
+            self.control_frame, text="Go to Diff...", command=self.jump_to_diff, state=tk.DISABLED,
+            bg=BUTTON_BG_COLOR, fg=BUTTON_FG_COLOR, activebackground=BUTTON_ACTIVE_BG, activeforeground=BUTTON_FG_COLOR, relief=tk.FLAT, bd=1
+        )
+        self.goto_diff_button.pack(side=tk.LEFT, padx=5)
+
         self.diff_status_label = tk.Label(self.control_frame, text="", bg=BG_COLOR, fg=FG_COLOR)
         self.diff_status_label.pack(side=tk.LEFT, padx=10)
 
+        # Only packed while a comparison is running
+        self.cancel_button = tk.Button(
+            self.control_frame, text="Cancel", command=self.cancel_compare,
+            bg=BUTTON_BG_COLOR, fg=BUTTON_FG_COLOR, activebackground=BUTTON_ACTIVE_BG, activeforeground=BUTTON_FG_COLOR, relief=tk.FLAT, bd=1
+        )
+
         # --- Hide/Show Identical Buttons ---
         self.hide_identical_button = tk.Button(
             self.control_frame, text="Hide Identical", command=self.hide_identical_lines, state=tk.DISABLED,
@@ -130,6 +236,14 @@ class DiffCheckerApp:
         )
         self.show_identical_button.pack(side=tk.LEFT, padx=5)
 
+        # --- Fold Identical Toggle ---
+        self.fold_var = tk.BooleanVar(value=False)
+        self.fold_check = tk.Checkbutton(
+            self.control_frame, text="Fold Identical", variable=self.fold_var, command=self.toggle_folding,
+            bg=BG_COLOR, fg=FG_COLOR, selectcolor=TEXT_BG_COLOR, activebackground=BG_COLOR, activeforeground=FG_COLOR
+        )
+        self.fold_check.pack(side=tk.LEFT, padx=5)
+
 
         # --- Syntax Highlighting Dropdown ---
         tk.Label(self.control_frame, text="Syntax:", bg=BG_COLOR, fg=FG_COLOR).pack(side=tk.LEFT, padx=(20, 2))
@@ -144,6 +258,61 @@ class DiffCheckerApp:
             self.language_dropdown.bind("<<ComboboxSelected>>", self.on_language_change)
         self.language_dropdown.pack(side=tk.LEFT, padx=5)
 
+        # --- Diff Algorithm Dropdown ---
+        tk.Label(self.control_frame, text="Algorithm:", bg=BG_COLOR, fg=FG_COLOR).pack(side=tk.LEFT, padx=(10, 2))
+        self.algorithm_var = tk.StringVar(value=DEFAULT_ALGORITHM)
+        self.algorithm_dropdown = ttk.Combobox(
+            self.control_frame, textvariable=self.algorithm_var, values=list(ALGORITHMS),
+            state="readonly", width=15
+        )
+        self.algorithm_dropdown.bind("<<ComboboxSelected>>", self.on_algorithm_change)
+        self.algorithm_dropdown.pack(side=tk.LEFT, padx=5)
+
+        # --- Ignore Options Menu ---
+        self.whitespace_var = tk.StringVar(value="exact")
+        self.ignore_case_var = tk.BooleanVar(value=False)
+        self.mask_vars = {} # Regex -> BooleanVar of its menu entry
+        self.ignore_button = tk.Menubutton(
+            self.control_frame, text="Ignore", relief=tk.FLAT, bd=1,
+            bg=BUTTON_BG_COLOR, fg=BUTTON_FG_COLOR, activebackground=BUTTON_ACTIVE_BG, activeforeground=BUTTON_FG_COLOR
+        )
+        self.ignore_menu = tk.Menu(self.ignore_button, tearoff=False)
+        for mode, label in zip(WHITESPACE_MODES, WHITESPACE_LABELS):
+            self.ignore_menu.add_radiobutton(label=label, value=mode, variable=self.whitespace_var, command=self.on_key_options_change)
+        self.ignore_menu.add_separator()
+        self.ignore_menu.add_checkbutton(label="Case", variable=self.ignore_case_var, command=self.on_key_options_change)
+        self.ignore_menu.add_separator()
+        self.ignore_menu.add_command(label="Custom Mask...", command=self.add_custom_mask)
+        for label, pattern in MASK_PRESETS.items(): self._add_mask(pattern, label)
+        self.ignore_button.config(menu=self.ignore_menu)
+        self.ignore_button.pack(side=tk.LEFT, padx=5)
+
+        # --- Virtual View Toggle ---
+        self.virtual_var = tk.BooleanVar(value=False)
+        self.virtual_check = tk.Checkbutton(
+            self.control_frame, text="Virtual View", variable=self.virtual_var, command=self.toggle_virtual_view,
+            bg=BG_COLOR, fg=FG_COLOR, selectcolor=TEXT_BG_COLOR, activebackground=BG_COLOR, activeforeground=FG_COLOR
+        )
+        self.virtual_check.pack(side=tk.LEFT, padx=(10, 5))
+
+        # --- Live Diff Toggle ---
+        self.live_var = tk.BooleanVar(value=False)
+        self.live_check = tk.Checkbutton(
+            self.control_frame, text="Live Diff", variable=self.live_var, command=self.toggle_live_diff,
+            bg=BG_COLOR, fg=FG_COLOR, selectcolor=TEXT_BG_COLOR, activebackground=BG_COLOR, activeforeground=FG_COLOR
+        )
+        self.live_check.pack(side=tk.LEFT, padx=5)
+
+        # --- Compare Stats Toggle ---
+        self.stats_var = tk.BooleanVar(value=False)
+        self.stats_check = tk.Checkbutton(
+            self.control_frame, text="Stats", variable=self.stats_var, command=self.toggle_stats,
+            bg=BG_COLOR, fg=FG_COLOR, selectcolor=TEXT_BG_COLOR, activebackground=BG_COLOR, activeforeground=FG_COLOR
+        )
+        self.stats_check.pack(side=tk.LEFT, padx=5)
+        # Only packed while "Stats" is ticked
+        self.stats_label = tk.Label(master, text="", anchor=tk.W, bg=BG_COLOR, fg=FG_COLOR, font=("Courier New", 9))
+
 
                 # --- Merge/Copy Buttons Frame (Bottom) ---
                 # --- Merge/Copy Buttons Frame (Bottom) ---
@@ -157,6 +326,14 @@ class DiffCheckerApp:
 
         # --- Place Buttons into the central frame, packed left-to-right ---
 
+        # Open Left Button
+        self.open_left_button = tk.Button(
+            self.center_button_frame, # Parent is the center frame
+            text="Open Left...", command=lambda: self.open_file(1),
+            bg=BUTTON_BG_COLOR, fg=BUTTON_FG_COLOR, activebackground=BUTTON_ACTIVE_BG, activeforeground=BUTTON_FG_COLOR, relief=tk.FLAT, bd=1
+        )
+        self.open_left_button.pack(side=tk.LEFT, padx=5, pady=2)
+
         # Copy Left Button
         self.copy_left_button = tk.Button(
             self.center_button_frame, # Parent is the center frame
@@ -189,8 +366,64 @@ class DiffCheckerApp:
         )
         self.copy_right_button.pack(side=tk.LEFT, padx=5, pady=2)
 
+        # Open Right Button
+        self.open_right_button = tk.Button(
+            self.center_button_frame, # Parent is the center frame
+            text="Open Right...", command=lambda: self.open_file(2),
+            bg=BUTTON_BG_COLOR, fg=BUTTON_FG_COLOR, activebackground=BUTTON_ACTIVE_BG, activeforeground=BUTTON_FG_COLOR, relief=tk.FLAT, bd=1
+        )
+        self.open_right_button.pack(side=tk.LEFT, padx=5, pady=2)
+
+        # Export Diff Menu
+        self.export_button = tk.Menubutton(
+            self.center_button_frame, # Parent is the center frame
+            text="Export Diff", relief=tk.FLAT, bd=1,
+            bg=BUTTON_BG_COLOR, fg=BUTTON_FG_COLOR, activebackground=BUTTON_ACTIVE_BG, activeforeground=BUTTON_FG_COLOR
+        )
+        export_menu = tk.Menu(self.export_button, tearoff=False)
+        export_menu.add_command(label="Unified Diff...", command=lambda: self.export_diff("unified"))
+        export_menu.add_command(label="Context Diff...", command=lambda: self.export_diff("context"))
+        self.export_button.config(menu=export_menu)
+        self.export_button.pack(side=tk.LEFT, padx=(20, 5), pady=2)
+
+        # Apply Patch Menu
+        self.patch_button = tk.Menubutton(
+            self.center_button_frame, # Parent is the center frame
+            text="Apply Patch", relief=tk.FLAT, bd=1,
+            bg=BUTTON_BG_COLOR, fg=BUTTON_FG_COLOR, activebackground=BUTTON_ACTIVE_BG, activeforeground=BUTTON_FG_COLOR
+        )
+        patch_menu = tk.Menu(self.patch_button, tearoff=False)
+        patch_menu.add_command(label="To Left Pane...", command=lambda: self.apply_patch_file(1))
+        patch_menu.add_command(label="To Right Pane...", command=lambda: self.apply_patch_file(2))
+        self.patch_button.config(menu=patch_menu)
+        self.patch_button.pack(side=tk.LEFT, padx=5, pady=2)
+
+        # Compare Folders Button
+        self.compare_folders_button = tk.Button(
+            self.center_button_frame, # Parent is the center frame
+            text="Compare Folders...", command=self.compare_folders,
+            bg=BUTTON_BG_COLOR, fg=BUTTON_FG_COLOR, activebackground=BUTTON_ACTIVE_BG, activeforeground=BUTTON_FG_COLOR, relief=tk.FLAT, bd=1
+        )
+        self.compare_folders_button.pack(side=tk.LEFT, padx=(20, 5), pady=2)
+
+        # Three-Way Merge Button
+        self.three_way_button = tk.Button(
+            self.center_button_frame, # Parent is the center frame
+            text="Three-Way Merge...", command=self.three_way_merge,
+            bg=BUTTON_BG_COLOR, fg=BUTTON_FG_COLOR, activebackground=BUTTON_ACTIVE_BG, activeforeground=BUTTON_FG_COLOR, relief=tk.FLAT, bd=1
+        )
+        self.three_way_button.pack(side=tk.LEFT, padx=5, pady=2)
+
         # --- Synchronized Scrolling ---
+        self.scroll_sync = ScrollSync(self)
         self._bind_scroll()
+        self.viewport = VirtualViewport(self)
+
+        # --- Navigation Keys ---
+        master.bind("<F3>", lambda event: self.find_next_diff_from_cursor())
+        master.bind("<Shift-F3>", lambda event: self.find_prev_diff_from_cursor())
+        master.bind("<Control-g>", lambda event: self.jump_to_diff())
+        master.bind("<Control-P>", lambda event: self.profile_next_compare()) # Ctrl+Shift+P
 
     # --- Tag Configuration ---
     def _apply_base_tag_configs(self, text_widget):
@@ -198,10 +431,13 @@ class DiffCheckerApp:
         text_widget.tag_config(self.tag_del, background=DEL_BG_COLOR)
         text_widget.tag_config(self.tag_add, background=ADD_BG_COLOR)
         text_widget.tag_config(self.tag_change, background=CHANGE_BG_COLOR)
+        text_widget.tag_config(self.tag_word_change, background=WORD_CHANGE_BG_COLOR)
+        text_widget.tag_config(self.tag_char_change, background=CHAR_CHANGE_BG_COLOR)
         text_widget.tag_config(self.tag_selected, background=SELECT_BG_COLOR, borderwidth=1, relief=tk.SOLID)
         text_widget.tag_config(self.tag_missing, foreground=MISSING_FG_COLOR, font=("Courier New", 10, "italic"))
         # Configure identical tag - initially not elided
         text_widget.tag_config(self.tag_identical, elide=False) # Add config for identical tag
+        text_widget.tag_config(self.tag_folded, elide=True)
 
     def _configure_syntax_tags(self, style_name):
         """Configures Tkinter tags based on a Pygments style."""
@@ -213,6 +449,8 @@ class DiffCheckerApp:
             style = get_style_by_name('default') # Fallback
 
         self.syntax_tags = {}
+        self._token_tag_cache = {}
+        self.token_cache.clear() # Cached spans refer to the old tags
         try:
             base_style_info = style.style_for_token(Token)
             default_fg_hex = base_style_info.get('color')
@@ -242,18 +480,66 @@ class DiffCheckerApp:
 
     # --- Syntax Highlighting Application ---
     def on_language_change(self, event=None):
-        """Called when the language dropdown changes."""
+        """Called when the language dropdown changes; the diff itself is unaffected."""
         self.apply_syntax_highlighting()
+
+    def on_algorithm_change(self, event=None):
+        """Called when the diff algorithm dropdown changes."""
         self.compare_text()
 
-    def apply_syntax_highlighting(self):
-        """Applies syntax highlighting based on selected language."""
-        if not PYGMENTS_AVAILABLE: return
+    # --- Ignore Options ---
+    @property
+    def key_options(self):
+        """compare_keys.KeyOptions of the Ignore menu."""
+        masks = tuple(pattern for pattern, var in self.mask_vars.items() if var.get())
+        return KeyOptions(self.whitespace_var.get(), self.ignore_case_var.get(), masks)
+
+    def set_key_options(self, options):
+        """Sets the Ignore menu (without comparing); masks it does not list yet are added."""
+        self.whitespace_var.set(options.whitespace)
+        self.ignore_case_var.set(options.ignore_case)
+        for pattern in options.masks:
+            if pattern not in self.mask_vars: self._add_mask(pattern)
+        for pattern, var in self.mask_vars.items(): var.set(pattern in options.masks)
+
+    def on_key_options_change(self):
+        """Called when an Ignore menu entry changes."""
+        self.compare_text()
+
+    def _add_mask(self, pattern, label=None):
+        var = self.mask_vars[pattern] = tk.BooleanVar(value=False)
+        self.ignore_menu.add_checkbutton(label=f"Mask {label or pattern}", variable=var, command=self.on_key_options_change)
+        return var
+
+    def add_custom_mask(self):
+        """Asks for a regex whose matches compare equal, and turns it on."""
+        pattern = simpledialog.askstring("Custom Mask", "Text matching this regular expression is ignored:", parent=self.master)
+        if not pattern: return
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            messagebox.showerror("Custom Mask", f"Not a valid regular expression:\n{e}", parent=self.master)
+            return
+        var = self.mask_vars.get(pattern) or self._add_mask(pattern)
+        var.set(True)
+        self.on_key_options_change()
+
+    def _get_lexer(self):
+        """Returns the Pygments lexer for the selected language."""
         lang = self.language_var.get()
         lexer = TextLexer() # Default
         if lang and lang != "Plain Text":
             try: lexer = get_lexer_by_name(lang.lower(), stripall=True)
             except Exception: print(f"Lexer for '{lang}' not found.")
+        return lexer
+
+    def apply_syntax_highlighting(self):
+        """Applies syntax highlighting based on selected language."""
+        if not PYGMENTS_AVAILABLE: return
+        if self.virtual_mode:
+            if self.diff_result: self.viewport.render() # Highlights the rendered slice only
+            return
+        lexer = self._get_lexer()
         self._clear_syntax_tags(self.text1)
         self._clear_syntax_tags(self.text2)
         text1_content = self.text1.get("1.0", "end-1c")
@@ -267,50 +553,67 @@ class DiffCheckerApp:
         for tag_name in self.syntax_tags.values():
             text_widget.tag_remove(tag_name, "1.0", tk.END)
 
-    def _highlight_widget(self, text_widget, lexer, content):
-        """Applies Pygments highlighting to a single text widget."""
+    def _syntax_tag_for(self, token_type):
+        """Returns the configured tag for a token type, falling back to its parents (memoized)."""
+        try: return self._token_tag_cache[token_type]
+        except KeyError: pass
+        current_type = token_type
+        tag_to_apply = None
+        while current_type != Token and current_type is not None:
+            if current_type in self.syntax_tags:
+                tag_to_apply = self.syntax_tags[current_type]
+                break
+            if not hasattr(current_type, 'parent'): break
+            current_type = current_type.parent
+        self._token_tag_cache[token_type] = tag_to_apply
+        return tag_to_apply
+
+    def _highlight_widget(self, text_widget, lexer, content, start="1.0"):
+        """Applies Pygments highlighting to content shown from `start` in a text widget.
+
+        Spans come from the token cache, so a text is only lexed again when
+        it or the lexer changed. Offsets are turned into line.column indices
+        in Python and all ranges of a tag go to Tk in one multi-range
+        tag_add call.
+        """
         if not PYGMENTS_AVAILABLE: return
-        text_widget.mark_set("range_start", "1.0")
-        for index, token_type, token_text in lexer.get_tokens_unprocessed(content):
-            start_index = text_widget.index(f"1.0 + {index} chars")
-            end_index = text_widget.index(f"{start_index} + {len(token_text)} chars")
-            current_type = token_type
-            tag_to_apply = None
-            while current_type != Token and current_type is not None:
-                if current_type in self.syntax_tags:
-                    tag_to_apply = self.syntax_tags[current_type]
-                    break
-                if not hasattr(current_type, 'parent'): break
-                current_type = current_type.parent
-            if tag_to_apply:
-                text_widget.tag_add(tag_to_apply, start_index, end_index)
-
-    # --- Copy Methods (Filter Placeholders) ---
+        start_line, start_col = map(int, text_widget.index(start).split('.'))
+        line_starts = [0]
+        line_starts.extend(accumulate(len(line) + 1 for line in content.split("\n")))
+
+        def to_index(offset):
+            row = bisect_right(line_starts, offset) - 1
+            col = offset - line_starts[row]
+            return f"{start_line + row}.{col + start_col if row == 0 else col}"
+
+        spans = self.token_cache.spans(lexer, content, self._syntax_tag_for)
+        indices = {} # Tag id -> flat [start, end, ...] index list
+        for span_start, length, tag_id in zip(spans.starts, spans.lengths, spans.tag_ids):
+            tag_indices = indices.get(tag_id)
+            if tag_indices is None: tag_indices = indices[tag_id] = []
+            tag_indices.append(to_index(span_start))
+            tag_indices.append(to_index(span_start + length))
+        for tag_id, tag_indices in indices.items():
+            text_widget.tag_add(self.token_cache.tag_names[tag_id], *tag_indices)
+
+    # --- Copy Methods ---
     def copy_left_text(self):
-        """Copies the content of the left text area to the clipboard,
-           excluding placeholder lines."""
+        """Copies the content of the left text area to the clipboard."""
         try:
-            full_text = self.text1.get("1.0", "end-1c")
-            lines = full_text.splitlines()
-            filtered_lines = [line for line in lines if ">>> Missing Line(s) <<<" not in line]
-            text_to_copy = "\n".join(filtered_lines)
+            text_to_copy = self.lines1.text() # Read from the document, not the widget
             self.master.clipboard_clear()
             self.master.clipboard_append(text_to_copy)
         except tk.TclError: print("Error copying left text")
 
     def copy_right_text(self):
-        """Copies the content of the right text area to the clipboard,
-           excluding placeholder lines."""
+        """Copies the content of the right text area to the clipboard."""
         try:
-            full_text = self.text2.get("1.0", "end-1c")
-            lines = full_text.splitlines()
-            filtered_lines = [line for line in lines if ">>> Missing Line(s) <<<" not in line]
-            text_to_copy = "\n".join(filtered_lines)
+            text_to_copy = self.lines2.text()
             self.master.clipboard_clear()
             self.master.clipboard_append(text_to_copy)
         except tk.TclError: print("Error copying right text")
 
-    # --- Scrolling Logic (Unchanged) ---
+    # --- Scrolling Logic ---
     def _bind_scroll(self, *args):
         if sys.platform == "win32" or sys.platform == "darwin":
              self.text1.bind("<MouseWheel>", self._scroll_both)
@@ -320,10 +623,18 @@ class DiffCheckerApp:
             self.text1.bind("<Button-5>", self._scroll_both)
             self.text2.bind("<Button-4>", self._scroll_both)
             self.text2.bind("<Button-5>", self._scroll_both)
-        self.text1_scroll.config(command=self._scroll_text2_and_bar1)
-        self.text2_scroll.config(command=self._scroll_text1_and_bar2)
-        self.text1.config(yscrollcommand=self._scroll_bar1_and_text2)
-        self.text2.config(yscrollcommand=self._scroll_bar2_and_text1)
+        # Each pane scrolls natively; the other one follows through the alignment (see scroll_sync.py)
+        self.text1_scroll.config(command=self.text1.yview)
+        self.text2_scroll.config(command=self.text2.yview)
+        self.text1.config(yscrollcommand=lambda first, last: self.scroll_sync.on_yscroll(0, first, last))
+        self.text2.config(yscrollcommand=lambda first, last: self.scroll_sync.on_yscroll(1, first, last))
+
+    def _bind_virtual_scroll(self):
+        """Routes scrollbars and widget scrolling through the viewport."""
+        self.text1_scroll.config(command=self.viewport.on_scrollbar)
+        self.text2_scroll.config(command=self.viewport.on_scrollbar)
+        self.text1.config(yscrollcommand=lambda *args: self.viewport.on_widget_yscroll(self.text1, *args))
+        self.text2.config(yscrollcommand=lambda *args: self.viewport.on_widget_yscroll(self.text2, *args))
 
     def _scroll_both(self, event):
         delta = 0
@@ -334,34 +645,19 @@ class DiffCheckerApp:
             delta = -1 * int(event.delta / 120)
         elif sys.platform == "darwin":
              delta = -1 * event.delta
-        if delta:
-            view1_start, view1_end = self.text1.yview()
-            view2_start, view2_end = self.text2.yview()
-            can_scroll_up = delta < 0 and (view1_start > 0 or view2_start > 0)
-            can_scroll_down = delta > 0 and (view1_end < 1.0 or view2_end < 1.0)
-            if (delta < 0 and can_scroll_up) or (delta > 0 and can_scroll_down):
-                self.text1.yview_scroll(delta, "units")
-                self.text2.yview_scroll(delta, "units")
-                self._update_scrollbars()
+        if delta and self.virtual_mode:
+            self.viewport.scroll_rows(delta)
+        elif delta:
+            # Filler spacing makes the panes' lines differ in height, so only the pane
+            # under the pointer scrolls; its yscrollcommand moves the other one along
+            event.widget.yview_scroll(delta, "units")
+            self._update_scrollbars()
         return "break"
 
-    def _scroll_text1_and_bar2(self, *args):
-        if self.text2.yview() != self.text1.yview(): self.text2.yview_moveto(args[0])
-        self.text2_scroll.set(*args)
-
-    def _scroll_text2_and_bar1(self, *args):
-        if self.text1.yview() != self.text2.yview(): self.text1.yview_moveto(args[0])
-        self.text1_scroll.set(*args)
-
-    def _scroll_bar1_and_text2(self, *args):
-        self.text1_scroll.set(*args)
-        if self.text2.yview() != (float(args[0]), float(args[1])): self.text2.yview_moveto(args[0])
-
-    def _scroll_bar2_and_text1(self, *args):
-        self.text2_scroll.set(*args)
-        if self.text1.yview() != (float(args[0]), float(args[1])): self.text1.yview_moveto(args[0])
-
     def _update_scrollbars(self):
+        if self.virtual_mode:
+            self.viewport.update_scrollbars()
+            return
         try:
             view1 = self.text1.yview()
             view2 = self.text2.yview()
@@ -370,169 +666,722 @@ class DiffCheckerApp:
         except tk.TclError: pass
 
     # --- Diff and Merge Logic ---
-    def _remove_tagged_lines(self, text_widget, tag_name):
-        """Removes all lines that contain the given tag."""
-        try:
-            current_text = text_widget.get("1.0", tk.END)
-            lines = current_text.splitlines()
-            cleaned_lines = [line for line in lines if ">>> Missing Line(s) <<<" not in line]
-            new_text = "\n".join(cleaned_lines)
-            if new_text != current_text.rstrip('\n'):
-                 view = text_widget.yview()
-                 was_undo = text_widget.cget('undo')
-                 text_widget.config(undo=False)
-                 text_widget.delete("1.0", tk.END)
-                 text_widget.insert("1.0", new_text)
-                 text_widget.config(undo=was_undo)
-                 text_widget.yview_moveto(view[0])
-        except Exception as e: print(f"Error removing tagged lines: {e}")
-
-
-    def compare_text(self):
-        """Performs comparison, syntax highlighting, adds placeholders, and highlights diffs."""
-        # --- 1. Preparation ---
-        view1_start, view1_end = self.text1.yview()
-        view2_start, view2_end = self.text2.yview()
-        undo1_state = self.text1.cget('undo')
-        undo2_state = self.text2.cget('undo')
-        self.text1.config(undo=False)
-        self.text2.config(undo=False)
-
-        # --- 2. Apply Syntax Highlighting FIRST ---
-        self.apply_syntax_highlighting()
+    # --- Virtual View ---
+    def toggle_virtual_view(self):
+        """Switches between editable full-text panes and the virtualized view."""
+        if self.virtual_var.get() == self.virtual_mode: return
+        self._stop_compare()
+        if self.virtual_var.get():
+            self._enter_virtual_mode()
+        elif not self._leave_virtual_mode():
+            self.virtual_var.set(True)
+            return
+        self.compare_text()
 
-        # --- 3. Clear Diff Tags and Placeholders ---
-        # Include identical tag in clearing
-        diff_tags = [self.tag_add, self.tag_del, self.tag_change, self.tag_selected, self.tag_missing, self.tag_identical]
-        for tag in diff_tags:
-            self.text1.tag_remove(tag, "1.0", tk.END)
-            self.text2.tag_remove(tag, "1.0", tk.END)
-        self._remove_tagged_lines(self.text1, self.tag_missing)
-        self._remove_tagged_lines(self.text2, self.tag_missing)
+    def _enter_virtual_mode(self):
+        """The model takes over the real text; the widgets become a window onto it."""
+        self._clear_folds()
+        for tracker in self._edit_trackers: tracker.document = None # The documents already hold the text
+        self.virtual_mode = True
+        self._bind_virtual_scroll()
+
+    def _leave_virtual_mode(self):
+        """Writes the model back into editable panes. Returns False if the user cancels."""
+        if max(len(self.lines1), len(self.lines2)) > VIRTUAL_EXIT_WARN_ROWS:
+            if not messagebox.askyesno("Virtual View", "The texts are very large and may make the panes unresponsive.\n"
+                                       "Load them into the panes anyway?", parent=self.master):
+                return False
+        self.virtual_mode = False
+        for widget, lines, tracker in zip((self.text1, self.text2), (self.lines1, self.lines2), self._edit_trackers):
+            widget.config(state=tk.NORMAL)
+            widget.delete("1.0", tk.END)
+            widget.insert("1.0", lines.text())
+            tracker.document = lines
+        self._bind_scroll()
+        return True
+
+    # --- File Loading ---
+    def open_file(self, side, path=None, compare=True):
+        """Loads a file into the left (side 1) or right (side 2) pane.
+
+        Files are memory-mapped; large ones switch to the virtual view so
+        only the visible lines are ever decoded into the widgets.
+        """
+        if path is None:
+            path = filedialog.askopenfilename(parent=self.master, title=f"Open {'Left' if side == 1 else 'Right'} File")
+            if not path: return
+        try:
+            lines = MappedLines(path)
+        except OSError as e:
+            messagebox.showerror("Open File", f"Could not open {path}:\n{e}", parent=self.master)
+            return
+        self._load_side(side, lines, compare)
+
+    def open_file_pair(self, path1, path2, opcodes=None):
+        """Loads two files (None for an empty pane) and compares them.
+
+        opcodes precomputed for exactly these files, e.g. by a folder
+        comparison, are used instead of diffing them again (unless the
+        Ignore menu makes it compare differently).
+        """
+        if not self.key_options.identity: opcodes = None
+        sides = []
+        for path in (path1, path2):
+            try:
+                sides.append(MappedLines(path) if path else [])
+            except OSError as e:
+                for lines in sides:
+                    if isinstance(lines, MappedLines): lines.close()
+                messagebox.showerror("Open File", f"Could not open {path}:\n{e}", parent=self.master)
+                return
+        self._load_side(1, sides[0], compare=False)
+        self._load_side(2, sides[1], compare=False)
+        self.compare_text(opcodes=opcodes)
+
+    def _load_side(self, side, lines, compare):
+        """Shows a MappedLines file (or a plain list of lines) in one pane."""
+        self._stop_compare() # The running comparison is about to be out of date
+        if isinstance(lines, MappedLines): self.pane_paths[side - 1] = lines.path
+        if not self.virtual_mode and isinstance(lines, MappedLines) and lines.size > LARGE_FILE_BYTES:
+            self.virtual_var.set(True)
+            self._enter_virtual_mode()
+        document = self.lines1 if side == 1 else self.lines2
+        if self.virtual_mode:
+            self._close_when_unused(document.reset(lines))
+            if compare: self.compare_text() # The virtual panes only show compared rows
+        else:
+            widget = self.text1 if side == 1 else self.text2
+            if isinstance(lines, MappedLines):
+                mapped, lines = lines, list(lines)
+                mapped.close()
+            if lines and not lines[-1]: lines = lines[:-1] # The pane shows a final empty line as a trailing newline
+            with self._edit_trackers[side - 1].paused():
+                widget.delete("1.0", tk.END)
+                widget.insert("1.0", "\n".join(lines))
+            self._close_when_unused(document.reset(lines))
+
+    def compare_folders(self, root1=None, root2=None):
+        """Opens a summary window comparing two folder trees (asks for them if not given)."""
+        if root1 is None:
+            root1 = filedialog.askdirectory(parent=self.master, title="Left Folder", mustexist=True)
+            if not root1: return
+        if root2 is None:
+            root2 = filedialog.askdirectory(parent=self.master, title="Right Folder", mustexist=True)
+            if not root2: return
+        FolderView(self, root1, root2, status_options={
+            'changed': {'background': CHANGE_BG_COLOR}, 'left only': {'background': DEL_BG_COLOR},
+            'right only': {'background': ADD_BG_COLOR}, 'error': {'foreground': MISSING_FG_COLOR}})
+
+    def three_way_merge(self, base_path=None):
+        """Merges the left and right panes against a base file in a three-pane window."""
+        if base_path is None:
+            base_path = filedialog.askopenfilename(parent=self.master, title="Open Base File")
+            if not base_path: return
+        try:
+            base = MappedLines(base_path)
+        except OSError as e:
+            messagebox.showerror("Three-Way Merge", f"Could not open {base_path}:\n{e}", parent=self.master)
+            return
+        left, right = self.lines1.snapshot(), self.lines2.snapshot()
+        try:
+            MergeView(self, base, left, right, tag_options={ # The view closes base when it is closed
+                'left': {'background': CHANGE_BG_COLOR}, 'right': {'background': ADD_BG_COLOR},
+                'same': {'background': CHANGE_BG_COLOR}, 'conflict': {'background': DEL_BG_COLOR},
+                'selected': {'background': SELECT_BG_COLOR, 'borderwidth': 1, 'relief': tk.SOLID}})
+        except Exception:
+            base.close()
+            raise
+
+    # --- Diff Export and Patches ---
+    def export_diff(self, fmt="unified", path=None):
+        """Writes the comparison to a file as a "unified" or "context" diff.
+
+        The diff lines are generated from the opcodes (see patch_io) and
+        written a time slice at a time, so exporting huge files neither
+        blocks the window nor builds the diff in memory. The texts are
+        compared first if the last result does not match them.
+        """
+        if self._panes_locked or self._export_file is not None: return
+        if path is None:
+            path = filedialog.asksaveasfilename(parent=self.master, title=f"Export {fmt.title()} Diff",
+                                                defaultextension=".diff", filetypes=DIFF_FILE_TYPES)
+            if not path: return
+        if self._live_after is not None: # Catch up with the latest edits first
+            self._cancel_live_diff()
+            self._live_diff()
+        if (self.diff_result is None or self._worker is not None
+                or (not self.virtual_mode and (self.text1.edit_modified() or self.text2.edit_modified()))):
+            self.compare_text(on_done=lambda: self.export_diff(fmt, path))
+            return
+        try:
+            self._export_file = open(path, "w", encoding="utf-8", newline="")
+        except OSError as e:
+            messagebox.showerror("Export Diff", f"Could not write {path}:\n{e}", parent=self.master)
+            return
+        writer = unified_diff if fmt == "unified" else context_diff
+        lines = writer(self.lines1, self.lines2, self.diff_result.opcodes,
+                       self.pane_paths[0] or "left", self.pane_paths[1] or "right")
+        if not self.virtual_mode: # The panes must keep matching the model until the export is done
+            self._panes_locked = True
+            self.text1.config(state=tk.DISABLED)
+            self.text2.config(state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5, after=self.diff_status_label)
+        self._run_export_slices(self._compare_generation, lines, 0)
+
+    def _run_export_slices(self, generation, lines, count):
+        """Writes diff lines for up to RENDER_SLICE_SECONDS, then reschedules itself via after()."""
+        if generation != self._compare_generation: return # Cancelled, see _abort_export
+        f = self._export_file
+        deadline = time.perf_counter() + RENDER_SLICE_SECONDS
+        try:
+            for count, line in enumerate(lines, start=count + 1):
+                f.write(line)
+                if not count % EXPORT_CHECK_LINES and time.perf_counter() > deadline: break
+            else:
+                self._export_file = None
+                f.close()
+                self._end_compare()
+                self.diff_status_label.config(text=f"Exported {count} diff lines to {os.path.basename(f.name)}.")
+                return
+        except (OSError, ValueError) as e:
+            self._abort_export()
+            self._end_compare()
+            messagebox.showerror("Export Diff", f"Could not write {f.name}:\n{e}", parent=self.master)
+            return
+        self.diff_status_label.config(text=f"Exporting diff... {count} lines")
+        self.master.after(1, self._run_export_slices, generation, lines, count)
+
+    def _abort_export(self):
+        """Closes and deletes a half-written export, if any."""
+        f, self._export_file = self._export_file, None
+        if f is None: return
+        f.close()
+        try:
+            os.remove(f.name)
+        except OSError: pass
+
+    def apply_patch_file(self, side, path=None):
+        """Applies a unified diff to the left (side 1) or right (side 2) pane, then compares again.
+
+        The patch is streamed against the pane's lines; if it does not
+        apply, the pane is left as it was.
+        """
+        if self._panes_locked or self._export_file is not None: return
+        if path is None:
+            path = filedialog.askopenfilename(parent=self.master, title=f"Apply Patch to {'Left' if side == 1 else 'Right'} Pane",
+                                              filetypes=DIFF_FILE_TYPES)
+            if not path: return
+        widget = self.text1 if side == 1 else self.text2
+        lines = self.lines1 if side == 1 else self.lines2
+        try:
+            with open(path, encoding="utf-8", errors="replace") as patch:
+                patched = list(apply_patch(lines, patch))
+        except OSError as e:
+            messagebox.showerror("Apply Patch", f"Could not read {path}:\n{e}", parent=self.master)
+            return
+        except PatchError as e:
+            messagebox.showerror("Apply Patch", f"{os.path.basename(path)} does not apply:\n{e}", parent=self.master)
+            return
+        if not self.virtual_mode: widget.edit_separator() # Undo stops at the patch
+        self._load_side(side, patched, compare=False)
+        self.compare_text()
 
-        # Reset diff state
+    def _reset_diff_state(self):
+        """Clears the result, selection, counters and buttons before a comparison."""
+        self._clear_folds()
         self.diffs = []
+        self.diff_result = None
+        self._intraline_rows.clear()
         self.current_diff_index = -1
         self.selected_diff_details = None
         self.diff_status_label.config(text="")
-        self.next_diff_button.config(state=tk.DISABLED)
+        self._update_navigation_buttons()
+        self.ruler.redraw()
         self.merge_to_left_button.config(state=tk.DISABLED)
         self.merge_to_right_button.config(state=tk.DISABLED)
         # Reset hide/show button state initially
         self.hide_identical_button.config(state=tk.DISABLED)
         self.show_identical_button.config(state=tk.DISABLED)
 
-
-        # Get content AFTER clearing placeholders
-        text1_content = self.text1.get("1.0", "end-1c").splitlines()
-        text2_content = self.text2.get("1.0", "end-1c").splitlines()
-
-        # --- 4. Calculate Differences ---
-        matcher = difflib.SequenceMatcher(None, text1_content, text2_content, autojunk=False)
-        opcodes = matcher.get_opcodes()
-
-        # --- 5. Process Opcodes for Placeholders and Diff/Identical Highlighting ---
-        placeholders_to_add = []
-        identical_ranges1 = [] # Store (start, end) for identical lines in text1
-        identical_ranges2 = [] # Store (start, end) for identical lines in text2
-        diff_count = 0
-        has_identical = False # Flag to enable hide/show buttons
-        current_line1 = 1
-        current_line2 = 1
-
-        for tag, i1, i2, j1, j2 in opcodes:
-            len1 = i2 - i1
-            len2 = j2 - j1
-            diff_detail = {'tag': tag, 'i1': i1, 'i2': i2, 'j1': j1, 'j2': j2,
-                           'line1': current_line1, 'line2': current_line2}
-            if tag == 'equal':
-                # Store ranges for identical lines
-                start1 = f"{current_line1}.0"
-                end1 = f"{current_line1 + len1}.0"
-                start2 = f"{current_line2}.0"
-                end2 = f"{current_line2 + len2}.0"
-                identical_ranges1.append((start1, end1))
-                identical_ranges2.append((start2, end2)) # Store for text2
-                has_identical = True
-                current_line1 += len1
-                current_line2 += len2
-            elif tag == 'delete':
-                placeholder_text = ">>> Missing Line(s) <<<\n" * len1
-                placeholders_to_add.append((self.text2, current_line2, placeholder_text, self.tag_missing))
-                self.diffs.append(diff_detail)
-                diff_count += 1
-                current_line1 += len1
-            elif tag == 'insert':
-                placeholder_text = ">>> Missing Line(s) <<<\n" * len2
-                placeholders_to_add.append((self.text1, current_line1, placeholder_text, self.tag_missing))
-                self.diffs.append(diff_detail)
-                diff_count += 1
-                current_line2 += len2
-            elif tag == 'replace':
-                if len1 < len2:
-                    placeholder_text = ">>> Missing Line(s) <<<\n" * (len2 - len1)
-                    placeholders_to_add.append((self.text1, current_line1 + len1, placeholder_text, self.tag_missing))
-                elif len2 < len1:
-                    placeholder_text = ">>> Missing Line(s) <<<\n" * (len1 - len2)
-                    placeholders_to_add.append((self.text2, current_line2 + len2, placeholder_text, self.tag_missing))
-                self.diffs.append(diff_detail)
-                diff_count += 1
-                current_line1 += len1
-                current_line2 += len2
-
-        # --- 6. Insert Placeholders ---
-        placeholders_to_add.sort(key=lambda x: x[1], reverse=True)
-        for widget, line_index, text, tag_name in placeholders_to_add:
-            widget.insert(f"{line_index}.0", text, (tag_name,))
-
-        # --- 7. Apply Diff and Identical Highlighting ---
-        # Diffs first
-        for diff in self.diffs:
-            tag = diff['tag']
-            widget_line1, widget_line2 = diff['line1'], diff['line2']
-            len1, len2 = diff['i2'] - diff['i1'], diff['j2'] - diff['j1']
-            start1, end1 = f"{widget_line1}.0", f"{widget_line1 + len1}.0"
-            start2, end2 = f"{widget_line2}.0", f"{widget_line2 + len2}.0"
-            if tag == 'delete': self.text1.tag_add(self.tag_del, start1, end1)
-            elif tag == 'insert': self.text2.tag_add(self.tag_add, start2, end2)
-            elif tag == 'replace':
-                self.text1.tag_add(self.tag_change, start1, end1)
-                self.text2.tag_add(self.tag_change, start2, end2)
-        # Identical lines next
-        for start, end in identical_ranges1:
-            self.text1.tag_add(self.tag_identical, start, end)
-        for start, end in identical_ranges2:
-            self.text2.tag_add(self.tag_identical, start, end)
-
-        # --- 8. Configure Eliding based on state ---
-        self.text1.tag_config(self.tag_identical, elide=(not self.identical_visible))
-        self.text2.tag_config(self.tag_identical, elide=(not self.identical_visible))
-
-        # --- 9. Finalize ---
-        self.text1.config(undo=undo1_state)
-        self.text2.config(undo=undo2_state)
-        try:
-            self.text1.yview_moveto(view1_start)
-            self.text2.yview_moveto(view2_start)
-            self._update_scrollbars()
-        except tk.TclError: pass
-
-        # Update button states
-        if self.diffs: self.next_diff_button.config(state=tk.NORMAL)
-        if has_identical:
-            if self.identical_visible:
-                self.hide_identical_button.config(state=tk.NORMAL)
-                self.show_identical_button.config(state=tk.DISABLED)
-            else:
-                self.hide_identical_button.config(state=tk.DISABLED)
-                self.show_identical_button.config(state=tk.NORMAL)
-
-        # Update status label
+    def _finish_compare(self, has_identical):
+        """Updates buttons and the status label after a comparison."""
+        self._update_navigation_buttons()
+        self.ruler.redraw()
+        self._update_identical_buttons(has_identical)
         if self.diffs: self.diff_status_label.config(text=f"{len(self.diffs)} differences found.")
         else: self.diff_status_label.config(text="No differences found.")
 
+    def compare_text(self, on_done=None, opcodes=None):
+        """Starts a comparison; the diff runs on a worker thread.
+
+        Syntax highlighting happens right away, the result is applied in
+        time slices once the worker is done, and on_done() is called after
+        that. A running comparison is superseded. The text itself is never
+        modified: alignment gaps are filler spacing (see _add_fillers).
+        opcodes already computed for the texts skip the diff (see DiffWorker).
+        """
+        self._stop_compare()
+        self._cancel_live_diff() # This comparison covers the pending edits
+        generation = self._compare_generation
+        stats = self._begin_stats()
+        if self.virtual_mode:
+            self._reset_diff_state()
+            self._start_worker(generation, self.lines1.snapshot(), self.lines2.snapshot(),
+                               lambda worker: self._show_virtual_result(worker, on_done), opcodes)
+            return
+        # --- 1. Preparation ---
+        view1_start = self.text1.yview()[0]
+        view2_start = self.text2.yview()[0]
+
+        # --- 2. Apply Syntax Highlighting FIRST ---
+        with stats.phase("highlight"):
+            self.apply_syntax_highlighting()
+
+        # --- 3. Clear Diff Tags and Fillers ---
+        with stats.phase("clear_tags"):
+            # Include identical tag in clearing
+            diff_tags = [self.tag_add, self.tag_del, self.tag_change, self.tag_selected, self.tag_identical,
+                         self.tag_word_change, self.tag_char_change]
+            for tag in diff_tags:
+                self.text1.tag_remove(tag, "1.0", tk.END)
+                self.text2.tag_remove(tag, "1.0", tk.END)
+            if self._filler_tags:
+                self.text1.tag_delete(*self._filler_tags)
+                self.text2.tag_delete(*self._filler_tags)
+                self._filler_tags.clear()
+
+            # Reset diff state
+            self._reset_diff_state()
+
+        with stats.phase("read_text"):
+            text1_content = self.lines1.snapshot()
+            text2_content = self.lines2.snapshot()
+            for tracker in self._edit_trackers: tracker.take() # The result will match these texts
+
+        # --- 4. Calculate Differences (worker thread) ---
+        # The panes stay read-only until the result is applied, so it still matches them
+        self._panes_locked = True
+        self.text1.config(state=tk.DISABLED)
+        self.text2.config(state=tk.DISABLED)
+        self._start_worker(generation, text1_content, text2_content,
+                           lambda worker: self._apply_compare_result(generation, worker, view1_start, view2_start, on_done),
+                           opcodes)
+
+    # --- Background Compare ---
+    def _start_worker(self, generation, lines1, lines2, on_result, opcodes=None):
+        self._worker = DiffWorker(lines1, lines2, self.algorithm_var.get(), self.diff_cache, opcodes,
+                                  profile=self._profile is not None, key_options=self.key_options,
+                                  key_cache=self.key_cache).start()
+        self.diff_status_label.config(text="Comparing...")
+        self.cancel_button.pack(side=tk.LEFT, padx=5, after=self.diff_status_label)
+        self.master.after(WORKER_POLL_MS, self._poll_worker, generation, on_result)
+
+    def _poll_worker(self, generation, on_result):
+        """Reports the worker's progress and hands its result over once it is done."""
+        if generation != self._compare_generation: return # Superseded or cancelled
+        worker = self._worker
+        if worker.state == "running":
+            text = f"Comparing... {PROGRESS_PHASES.get(worker.phase, '')}"
+            if worker.fraction is not None: text += f" {worker.fraction:.0%}"
+            self.diff_status_label.config(text=text)
+            self.master.after(WORKER_POLL_MS, self._poll_worker, generation, on_result)
+            return
+        self._worker = None
+        if self.compare_stats:
+            for phase, seconds in worker.timings.items(): self.compare_stats.add_time(phase, seconds)
+            self.compare_stats.count("lines1", len(worker.lines1))
+            self.compare_stats.count("lines2", len(worker.lines2))
+        if worker.state == "error":
+            self._end_compare()
+            self.diff_status_label.config(text=f"Comparison failed: {worker.error}")
+            return
+        on_result(worker)
+
+    def _stop_compare(self):
+        """Abandons the running comparison or diff export, if any, and gives the panes back."""
+        self._compare_generation += 1
+        if self._worker:
+            self._worker.cancel()
+            self._cancelled_workers.append(self._worker)
+        self._worker = None
+        self._abort_export()
+        self._end_compare()
+        self.compare_stats = None
+        for counter in self._tcl_counters: counter.stats = None
+
+    def _close_when_unused(self, source):
+        """Closes a file the panes no longer show once no cancelled worker can still be reading it.
+
+        Cancelling only flags a DiffWorker; until its thread stops it may be
+        hashing the mapped bytes, and closing an mmap then raises BufferError.
+        """
+        if not hasattr(source, "close"): return
+        self._cancelled_workers = [worker for worker in self._cancelled_workers if worker.state == "running"]
+        if self._cancelled_workers:
+            self.master.after(WORKER_POLL_MS, self._close_when_unused, source)
+            return
+        source.close()
+
+    def _end_compare(self):
+        """Restores the panes and hides the Cancel button."""
+        if self._panes_locked:
+            self.text1.config(state=tk.NORMAL)
+            self.text2.config(state=tk.NORMAL)
+            self._panes_locked = False
+        self.cancel_button.pack_forget()
+
+    def cancel_compare(self):
+        """Cancel button: stops the worker, the slices still being applied or a diff export."""
+        if self._worker is None and not self._panes_locked and self._export_file is None: return
+        exporting = self._export_file is not None
+        self._stop_compare()
+        self.diff_status_label.config(text="Export cancelled." if exporting else "Comparison cancelled.")
+
+    # --- Compare Stats ---
+    def _begin_stats(self):
+        """Starts timing a comparison, and profiling it if one was requested."""
+        stats = self.compare_stats = CompareStats("virtual" if self.virtual_mode else "panes", self.algorithm_var.get())
+        for counter in self._tcl_counters: counter.stats = stats
+        if self._profile_path and self._profile is None:
+            self._profile = ProfileCapture(self._profile_path).start()
+            self._profile_path = None
+        return stats
+
+    def _complete_stats(self, worker):
+        """Shows and logs the finished comparison's stats; writes the profile if one was taken."""
+        stats, self.compare_stats = self.compare_stats, None
+        for counter in self._tcl_counters: counter.stats = None
+        stats.count("opcodes", len(self.diff_result.opcodes))
+        stats.count("hunks", len(self.diffs))
+        self._record_stats(stats)
+        if self._profile is not None:
+            capture, self._profile = self._profile, None
+            capture.stop([worker.profile])
+            self.diff_status_label.config(text=f"{self.diff_status_label.cget('text')} Profile saved to {capture.path}.")
+
+    def _record_stats(self, stats):
+        """Finishes stats, shows them if "Stats" is ticked and appends them to the stats log."""
+        stats.finish()
+        self.last_compare_stats = stats
+        if self.stats_var.get(): self.stats_label.config(text=stats.status_text())
+        if self.stats_log:
+            try:
+                stats.append_jsonl(self.stats_log)
+            except OSError as e:
+                print(f"Could not write compare stats to {self.stats_log}: {e}")
+
+    def toggle_stats(self):
+        """Shows or hides the stats line of the last comparison."""
+        if self.stats_var.get():
+            self.stats_label.config(text=self.last_compare_stats.status_text() if self.last_compare_stats else "")
+            self.stats_label.pack(fill=tk.X, padx=10, after=self.control_frame)
+        else:
+            self.stats_label.pack_forget()
+
+    def profile_next_compare(self, path=None):
+        """Captures cProfile and tracemalloc data for the next comparison (Ctrl+Shift+P)."""
+        if path is None:
+            path = filedialog.asksaveasfilename(parent=self.master, title="Save Profile of Next Comparison",
+                                                defaultextension=".prof", filetypes=[("Profile data", "*.prof")])
+            if not path: return
+        self._profile_path = path
+        self.diff_status_label.config(text="The next comparison will be profiled.")
+
+    # --- Live Diff ---
+    def toggle_live_diff(self):
+        """Live Diff checkbox: keeps the comparison up to date while typing."""
+        if not self.live_var.get():
+            self._cancel_live_diff()
+        elif not self._panes_locked and self._worker is None:
+            self.compare_text() # Start from a comparison of the current texts
+
+    def _on_text_modified(self, event):
+        """<<Modified>> handler: restarts the Live Diff delay after every edit."""
+        widget = event.widget
+        if not self.live_var.get() or self.virtual_mode or not widget.edit_modified(): return
+        widget.edit_modified(False) # Tk only reports the next edit once the flag is cleared
+        self._cancel_live_diff()
+        self._live_after = self.master.after(LIVE_DIFF_DELAY_MS, self._live_diff)
+
+    def _cancel_live_diff(self):
+        if self._live_after is not None:
+            self.master.after_cancel(self._live_after)
+            self._live_after = None
+
+    def _live_diff(self):
+        """Re-diffs only the lines edited since the last update and re-tags just their opcodes.
+
+        The edited ranges come from the panes' EditTrackers; rediff_edits
+        bounds the window by unchanged lines around them, so the cost does
+        not grow with the document.
+        """
+        self._live_after = None
+        edits = [tracker.take() for tracker in self._edit_trackers]
+        if self.virtual_mode or self._panes_locked or self._worker is not None or not any(edits): return
+        result = self.diff_result
+        # An edit spans its current lines, or its old ones if it removed lines
+        if (result is None or not result.opcodes
+                or any(edit and (edit[3] is None or edit[1] - edit[0] - min(edit[2], 0) >= LIVE_DIFF_MAX_LINES)
+                       for edit in edits)):
+            self.compare_text()
+            return
+        stats = CompareStats("live", self.algorithm_var.get())
+        for counter in self._tcl_counters: counter.stats = stats
+        ranges = [edit[3] if edit else None for edit in edits] # Old document lines, as the result counts them
+        with stats.phase("diff"):
+            options = self.key_options
+            keys1, keys2 = self.key_cache.view(self.lines1, options), self.key_cache.view(self.lines2, options)
+            self.diff_result, lo, hi = rediff_edits(result, keys1, keys2, *ranges, self.algorithm_var.get())
+        with stats.phase("render"):
+            if hi > lo:
+                self._expand_folds_in(lo, hi)
+                self._retag_ops(lo, hi)
+            for widget, edit in zip((self.text1, self.text2), edits):
+                if edit: self._rehighlight_lines(widget, edit[0], edit[1])
+        for counter in self._tcl_counters: counter.stats = None
+        stats.count("opcodes", hi - lo)
+        self.diffs = self.diff_result.hunks
+        self._intraline_rows.clear() # Rows below the edit may have moved
+        self._select_and_scroll_to_diff(-1)
+        self._finish_live_diff(self.diff_result.stats.equal > 0)
+        self._schedule_intraline()
+        self._record_stats(stats)
+
+    def _finish_live_diff(self, has_identical):
+        """_finish_compare for a Live Diff update: the ruler, which walks every hunk, redraws once per idle pass."""
+        self._update_navigation_buttons()
+        self.ruler.schedule_redraw()
+        self._update_identical_buttons(has_identical)
+        self.diff_status_label.config(text=f"{len(self.diffs)} differences found." if self.diffs else "No differences found.")
+
+    def _rehighlight_lines(self, widget, first, last):
+        """Syntax-highlights pane lines first..last (0-based) again after they were edited."""
+        if not PYGMENTS_AVAILABLE: return
+        start, end = f"{first + 1}.0", f"{last + 1}.end"
+        for tag_name in self.syntax_tags.values():
+            widget.tag_remove(tag_name, start, end)
+        self._highlight_widget(widget, self._get_lexer(), widget.get(start, end), start=start)
+
+    def _show_virtual_result(self, worker, on_done):
+        """Virtual view: only the visible window needs rendering, so no time slicing."""
+        result = worker.result
+        self.diff_result = result
+        self.diffs = result.hunks
+        for widget in (self.text1, self.text2):
+            widget.tag_config(self.tag_identical, elide=(not self.identical_visible))
+        with self.compare_stats.phase("render"):
+            self.viewport.render()
+        self._end_compare()
+        self._finish_compare(result.stats.equal > 0)
+        self._complete_stats(worker)
+        if on_done: on_done()
+
+    def _apply_compare_result(self, generation, worker, view1_start, view2_start, on_done):
+        """Applies a finished result to the panes a slice at a time."""
+        result = worker.result
+        self.diff_result = result
+        self.diffs = result.hunks
+
+        def finish():
+            with self.compare_stats.phase("finalize"):
+                # --- 8. Configure Eliding based on state ---
+                self.text1.tag_config(self.tag_identical, elide=(not self.identical_visible))
+                self.text2.tag_config(self.tag_identical, elide=(not self.identical_visible))
+                # --- 9. Finalize ---
+                self._end_compare()
+                if self.fold_var.get(): self._fold_identical()
+                # Merges patch the result in place as long as nobody edits the text
+                self.text1.edit_modified(False)
+                self.text2.edit_modified(False)
+                try:
+                    self.text1.yview_moveto(view1_start)
+                    self.text2.yview_moveto(view2_start)
+                    self.scroll_sync.lead(0) # Realign the right pane with the new fillers
+                    self._update_scrollbars()
+                except tk.TclError: pass
+                # Update button states and status label
+                self._finish_compare(result.stats.equal > 0)
+                self._schedule_intraline()
+            self._complete_stats(worker)
+            if on_done: on_done()
+
+        self._run_render_slices(generation, self._render_steps(result), len(result.opcodes), finish)
+
+    def _render_steps(self, result):
+        """Tags the result PLAN_OPCODES opcodes at a time; yields the opcode count so far."""
+        panes = (self.text1, self.text2)
+        for lo in range(0, len(result.opcodes), PLAN_OPCODES):
+            hi = min(lo + PLAN_OPCODES, len(result.opcodes))
+            # --- 5./6./7. Plan Diff and Identical Highlighting and Fillers, then apply them in bulk ---
+            plan = RenderPlan()
+            for k in range(lo, hi):
+                self._tag_op(k, plan)
+                self._add_fillers(k, plan)
+            self.compare_stats.count("tag_calls", plan.apply(panes))
+            yield hi
+
+    # --- Opcode Tagging and Fillers ---
+    # Outside the virtual view the panes hold exactly the real lines, so model
+    # line n is widget line n + 1. Rows missing on one side of a block are
+    # "filler": extra space below (spacing3) the block's last line on that side,
+    # or below the line before it when the block has no lines there.
+    def _tag_op(self, k, plan):
+        """Plans the diff or identical tag of opcode k in both panes."""
+        opcodes = self.diff_result.opcodes
+        tag, i1, i2, j1, j2 = opcodes[k]
+        if tag == 'equal':
+            # The lines carrying a one-sided block's filler stay visible when identical lines are hidden
+            head = 1 if k == 1 and self._is_one_sided(opcodes[0]) else 0
+            tail = 1 if k + 1 < len(opcodes) and self._is_one_sided(opcodes[k + 1]) else 0
+            plan.add_lines(0, self.tag_identical, i1 + head + 1, i2 - tail + 1)
+            plan.add_lines(1, self.tag_identical, j1 + head + 1, j2 - tail + 1)
+        elif tag == 'delete': plan.add_lines(0, self.tag_del, i1 + 1, i2 + 1)
+        elif tag == 'insert': plan.add_lines(1, self.tag_add, j1 + 1, j2 + 1)
+        else:
+            plan.add_lines(0, self.tag_change, i1 + 1, i2 + 1)
+            plan.add_lines(1, self.tag_change, j1 + 1, j2 + 1)
+
+    @staticmethod
+    def _is_one_sided(opcode):
+        return opcode[0] in ('insert', 'delete')
+
+    def _add_fillers(self, k, plan):
+        """Plans the filler spacing that aligns opcode k's shorter side."""
+        tag, i1, i2, j1, j2 = self.diff_result.opcodes[k]
+        rows = max(i2 - i1, j2 - j1)
+        for side, lo, hi in ((0, i1, i2), (1, j1, j2)):
+            missing = rows - (hi - lo)
+            if not missing: continue
+            if hi > 0: plan.add_lines(side, self._filler_tag(missing, below=True), hi, hi + 1)
+            else: plan.add_lines(side, self._filler_tag(missing, below=False), 1, 2) # Before the first line
+
+    def _filler_tag(self, rows, below):
+        """Tag adding `rows` line heights of space below (or above) a line."""
+        name = f"filler_{'below' if below else 'above'}_{rows}"
+        if name not in self._filler_tags:
+            if self._linespace is None:
+                self._linespace = tkfont.Font(font=self.text1.cget("font")).metrics("linespace")
+            option = "spacing3" if below else "spacing1"
+            for widget in (self.text1, self.text2):
+                widget.tag_config(name, **{option: rows * self._linespace})
+            self._filler_tags.add(name)
+        return name
+
+    def _retag_ops(self, lo, hi):
+        """Re-applies diff tags and fillers for opcodes[lo:hi] after a local re-diff."""
+        opcodes = self.diff_result.opcodes
+        clear_tags = [self.tag_add, self.tag_del, self.tag_change, self.tag_selected, self.tag_identical,
+                      self.tag_word_change, self.tag_char_change]
+        for widget, start, end in ((self.text1, opcodes[lo][1], opcodes[hi - 1][2]),
+                                   (self.text2, opcodes[lo][3], opcodes[hi - 1][4])):
+            for tag in clear_tags:
+                widget.tag_remove(tag, f"{start + 1}.0", f"{end + 1}.0")
+            # Fillers sit on the window's lines or below the line just before it
+            for tag in self._filler_tags:
+                if tag.startswith("filler_below"): widget.tag_remove(tag, f"{max(1, start)}.0", f"{end + 1}.0")
+                elif start == 0: widget.tag_remove(tag, "1.0", f"{end + 1}.0")
+        plan = RenderPlan()
+        for k in range(lo, hi): self._tag_op(k, plan)
+        # The opcodes on either side may anchor their filler on the cleared lines
+        for k in range(max(0, lo - 1), min(hi + 1, len(opcodes))): self._add_fillers(k, plan)
+        plan.apply((self.text1, self.text2))
+
+    def _run_render_slices(self, generation, steps, total, on_finish):
+        """Runs `steps` for up to RENDER_SLICE_SECONDS, then reschedules itself via after_idle().
+
+        Tk handles pending input and redraws before idle callbacks queued
+        after them, so the panes stay responsive between slices.
+        """
+        if generation != self._compare_generation: return
+        slice_start = time.perf_counter()
+        deadline = slice_start + RENDER_SLICE_SECONDS
+        done = None
+        self.text1.config(state=tk.NORMAL)
+        self.text2.config(state=tk.NORMAL)
+        try:
+            for done in steps:
+                if time.perf_counter() > deadline: break
+            else:
+                done = None # Exhausted
+        finally:
+            self.text1.config(state=tk.DISABLED)
+            self.text2.config(state=tk.DISABLED)
+        self.compare_stats.add_time("render", time.perf_counter() - slice_start)
+        self.compare_stats.count("render_slices")
+        if done is None:
+            on_finish()
+            return
+        self.diff_status_label.config(text=f"Applying differences... {done / total:.0%}")
+        self.master.after_idle(self._run_render_slices, generation, steps, total, on_finish)
+
+    # --- Intra-line Differences ---
+    def _schedule_intraline(self):
+        """Paints the word/char differences of visible rows once the view settles."""
+        if self._intraline_pending: return
+        self._intraline_pending = True
+        self.master.after_idle(self._refresh_intraline)
+
+    def _refresh_intraline(self):
+        self._intraline_pending = False
+        if self.diff_result is None: return
+        if self.virtual_mode:
+            top = self.viewport.top_row
+            self._paint_intraline_rows(top, top + self.viewport.visible_rows())
+            return
+        alignment = self.diff_result.alignment
+        top = int(self.text1.index("@0,0").split('.')[0])
+        bottom = int(self.text1.index(f"@0,{self.text1.winfo_height()}").split('.')[0])
+        self._paint_intraline_rows(alignment.row_for_left(top - 1), alignment.row_for_left(bottom))
+
+    def _paint_selected_intraline(self, diff):
+        if diff['tag'] != 'replace': return
+        row = diff['line1'] - 1
+        self._paint_intraline_rows(row, row + min(diff['i2'] - diff['i1'], diff['j2'] - diff['j1'], INTRALINE_SELECT_MAX_ROWS))
+
+    def _paint_intraline_rows(self, row_lo, row_hi):
+        """Tags changed words and characters on the 'replace' rows in [row_lo, row_hi).
+
+        Rows are diffed on first sight only (line_pair_spans caches the
+        pairs), so large changed blocks cost nothing until they are shown.
+        """
+        result = self.diff_result
+        # Skip while a result is still being applied or after the text was edited
+        if result is None or self._panes_locked: return
+        if not self.virtual_mode and (self.text1.edit_modified() or self.text2.edit_modified()): return
+        if self._live_after is not None: return # Rows are about to move
+        alignment = result.alignment
+        ranges1, ranges2 = {}, {}
+        for k, seg_lo, seg_hi in alignment.segments(max(0, row_lo), min(row_hi, alignment.total_rows)):
+            tag, i1, i2, j1, j2 = alignment.opcodes[k]
+            if tag != 'replace': continue
+            op_row = alignment.row_starts[k]
+            for row in range(seg_lo, min(seg_hi, op_row + min(i2 - i1, j2 - j1))): # Paired rows only
+                offset = row - op_row
+                if self.virtual_mode:
+                    line1 = line2 = self.viewport.row_to_line(row)
+                else:
+                    line1, line2 = i1 + offset + 1, j1 + offset + 1
+                if line1 is None or row in self._intraline_rows: continue
+                self._intraline_rows.add(row)
+                spans1, spans2 = line_pair_spans(self.lines1[i1 + offset], self.lines2[j1 + offset])
+                for ranges, line, (words, chars) in ((ranges1, line1, spans1), (ranges2, line2, spans2)):
+                    for tag_name, spans in ((self.tag_word_change, words), (self.tag_char_change, chars)):
+                        indices = ranges.setdefault(tag_name, [])
+                        for start, end in spans: indices.extend((f"{line}.{start}", f"{line}.{end}"))
+        for widget, ranges in ((self.text1, ranges1), (self.text2, ranges2)):
+            for tag_name, indices in ranges.items():
+                if indices: widget.tag_add(tag_name, *indices)
+
+    def _update_identical_buttons(self, has_identical):
+        """Enables the hide or show button matching the current visibility."""
+        if not has_identical: return
+        if self.identical_visible:
+            self.hide_identical_button.config(state=tk.NORMAL)
+            self.show_identical_button.config(state=tk.DISABLED)
+        else:
+            self.hide_identical_button.config(state=tk.DISABLED)
+            self.show_identical_button.config(state=tk.NORMAL)
 
-    # --- Hide/Show Identical Line Methods ---
     def hide_identical_lines(self):
         """Hides lines tagged as identical."""
         if not self.identical_visible: return # Already hidden
@@ -559,49 +1408,135 @@ class DiffCheckerApp:
              self.hide_identical_button.config(state=tk.NORMAL)
 
 
+    # --- Folding ---
+    # A fold hides the middle of a long identical region behind one clickable
+    # row. The lines stay in the panes (model line n is still widget line
+    # n + 1): the row is a Label embedded at the start of the first hidden
+    # line, and the rest of the hidden lines carry the elided tag_folded.
+    # Embedded windows are not text, so the documents never see them.
+    # Folding only changes what is displayed, like Hide Identical with
+    # context: the hidden lines are still inserted, tagged and kept in
+    # memory, so folds save neither load time nor memory on large files.
+    # Expanding a fold removes the elide tag; it does not insert anything.
+    def toggle_folding(self):
+        """Fold Identical checkbox: folds or expands every long identical region."""
+        if self.virtual_mode or self._panes_locked or self.diff_result is None: return
+        if self.fold_var.get(): self._fold_identical()
+        else: self._clear_folds()
+
+    def _fold_identical(self):
+        """Folds the middle of each 'equal' opcode, keeping FOLD_CONTEXT_LINES lines around it visible.
+
+        Only regions that would hide at least FOLD_MIN_LINES lines are folded.
+        """
+        if self.virtual_mode: return
+        opcodes = self.diff_result.opcodes
+        context = FOLD_CONTEXT_LINES
+        for k, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+            if tag != 'equal': continue
+            top = context if k > 0 else 0 # Nothing above the first region or below the last needs context
+            bottom = context if k + 1 < len(opcodes) else 0
+            count = i2 - i1 - top - bottom
+            if count >= FOLD_MIN_LINES: self._add_fold(i1 + top, j1 + top, count)
+
+    def _add_fold(self, i1, j1, count):
+        """Hides `count` lines from model line i1 (left) and j1 (right) behind a fold row."""
+        labels = []
+        for widget, lo in ((self.text1, i1), (self.text2, j1)):
+            label = tk.Label(widget, text=f"\u2026 {count:,} identical line{'s' if count != 1 else ''} \u2026",
+                             bg=TEXT_BG_COLOR, fg=FOLD_FG_COLOR, font=widget.cget("font"), bd=0, padx=0, pady=0,
+                             cursor="hand2")
+            modified = widget.edit_modified()
+            widget.window_create(f"{lo + 1}.0", window=label)
+            widget.tag_add(self.tag_folded, f"{lo + 1}.0 + 1c", f"{lo + count + 1}.0")
+            widget.edit_modified(modified)
+            labels.append(label)
+        key = str(labels[0])
+        for label in labels: label.bind("<Button-1>", lambda event, key=key: self._panes_locked or self.expand_fold(key))
+        self._folds[key] = tuple(labels)
+
+    def expand_fold(self, key):
+        """Shows the lines of one fold again and removes its row."""
+        labels = self._folds.pop(key, None)
+        if labels is None: return
+        for widget, label, tracker in zip((self.text1, self.text2), labels, self._edit_trackers):
+            try:
+                index = widget.index(label) # An embedded window's path names its position
+            except tk.TclError: # An edit deleted the row
+                label.destroy()
+                continue
+            hidden = widget.tag_nextrange(self.tag_folded, index)
+            if hidden: widget.tag_remove(self.tag_folded, *hidden)
+            modified = widget.edit_modified()
+            undo = widget.cget('undo')
+            widget.config(undo=False)
+            tracker.call_untracked("delete", index)
+            widget.config(undo=undo)
+            widget.edit_modified(modified)
+            label.destroy()
+            line = int(index.split(".")[0]) - 1
+            self._rehighlight_lines(widget, line, line) # Highlighting done while folded was a column off
+
+    def _clear_folds(self):
+        """Expands every fold."""
+        for key in list(self._folds): self.expand_fold(key)
+
+    def _expand_folds_in(self, lo, hi):
+        """Expands folds overlapping opcodes[lo:hi] after a local re-diff; their alignment may have changed."""
+        if not self._folds: return
+        opcodes = self.diff_result.opcodes
+        start, end = f"{opcodes[lo][1] + 1}.0", f"{opcodes[hi - 1][2] + 1}.0"
+        windows = [value for key, value, index in self.text1.dump(start, end, window=True)]
+        covering = self.text1.tag_prevrange(self.tag_folded, start) # A fold whose row is above the window
+        if covering and self.text1.compare(covering[1], ">", start):
+            windows.append(self.text1.window_cget(f"{covering[0]} - 1c", "window"))
+        for window in windows: self.expand_fold(str(window))
+
     # --- Find Next / Select Diff ---
-    def find_next_diff_from_cursor(self, reset=False):
-        """Finds the next difference starting AFTER the cursor position,
-           wrapping around if necessary, and selects it."""
-        if not self.diffs: return
+    def _update_navigation_buttons(self):
+        state = tk.NORMAL if self.diffs else tk.DISABLED
+        for button in (self.next_diff_button, self.prev_diff_button, self.goto_diff_button):
+            button.config(state=state)
+
+    def _cursor_row(self):
+        """Aligned row of the line holding the left pane's cursor."""
         try:
-            cursor_pos = self.text1.index(tk.INSERT)
-            cursor_line = int(cursor_pos.split('.')[0])
-        except Exception: cursor_line = 0
-
-        next_diff_idx = -1
-        start_search_idx = 0
-        if not reset and self.current_diff_index != -1:
-             start_search_idx = (self.current_diff_index + 1) % len(self.diffs)
-        search_order = list(range(start_search_idx, len(self.diffs))) + list(range(0, start_search_idx))
-
-        found_after_cursor = False
-        for idx in search_order:
-            diff = self.diffs[idx]
-            if reset: # Find first diff >= cursor line
-                 if diff['line1'] >= cursor_line:
-                      next_diff_idx = idx; found_after_cursor = True; break
-            else: # Find first diff > cursor line (in search order)
-                 if diff['line1'] > cursor_line:
-                      next_diff_idx = idx; found_after_cursor = True; break
-
-        # Wrap around if not found after cursor
-        if not found_after_cursor and self.diffs:
-             next_diff_idx = search_order[0] # First element in the search order
-
-        # Handle reset case wrap-around
-        if reset and next_diff_idx == -1 and self.diffs:
-             next_diff_idx = 0
-
-        if not self.diffs or next_diff_idx == -1:
-            self._select_and_scroll_to_diff(-1) # Clear selection
-            return
+            cursor_line = int(self.text1.index(tk.INSERT).split('.')[0])
+        except tk.TclError: return 0
+        if self.virtual_mode: return self.viewport.line_to_row(cursor_line)
+        return self.diff_result.alignment.row_for_left(cursor_line - 1)
+
+    def _stepping_from(self):
+        """The selected diff to step from, or -1 to search from the cursor.
 
-        # Prevent getting stuck if only one diff or if next found is current
-        if not reset and len(self.diffs) > 1 and next_diff_idx == self.current_diff_index:
-             next_diff_idx = (self.current_diff_index + 1) % len(self.diffs)
+        Diff navigation never moves the cursor, so the cursor only counts
+        once the user has moved it since the last selection.
+        """
+        if self.current_diff_index == -1 or self.text1.index(tk.INSERT) != self._selection_cursor: return -1
+        return self.current_diff_index
 
-        self._select_and_scroll_to_diff(next_diff_idx)
+    def find_next_diff_from_cursor(self, reset=False):
+        """Finds the next difference starting AFTER the cursor position,
+           wrapping around if necessary, and selects it.
+
+        With a selection (and an unmoved cursor) this is the diff after it;
+        otherwise the hunk index makes it a bisect on the cursor row. With
+        reset, a hunk starting on the cursor row counts too.
+        """
+        if not self.diffs or self.diff_result is None: return
+        self._select_and_scroll_to_diff(self.diff_result.next_hunk(self._cursor_row(), self._stepping_from(), reset))
+
+    def find_prev_diff_from_cursor(self):
+        """Mirror of find_next_diff_from_cursor: the previous difference, wrapping to the last."""
+        if not self.diffs or self.diff_result is None: return
+        self._select_and_scroll_to_diff(self.diff_result.prev_hunk(self._cursor_row(), self._stepping_from()))
+
+    def jump_to_diff(self):
+        """Asks for a difference number and selects it."""
+        if not self.diffs: return
+        number = simpledialog.askinteger("Go to Difference", f"Difference number (1-{len(self.diffs)}):",
+                                         parent=self.master, minvalue=1, maxvalue=len(self.diffs))
+        if number: self._select_and_scroll_to_diff(number - 1)
 
 
     def _select_and_scroll_to_diff(self, index):
@@ -613,22 +1548,30 @@ class DiffCheckerApp:
             self.text2.tag_remove(self.tag_selected, "1.0", tk.END)
             self.merge_to_left_button.config(state=tk.DISABLED)
             self.merge_to_right_button.config(state=tk.DISABLED)
+            self.ruler.mark_selection()
             return
 
         self.current_diff_index = index
         diff = self.diffs[self.current_diff_index]
         self.selected_diff_details = diff
+        self.ruler.mark_selection()
+        if self.virtual_mode:
+            self.viewport.show_row(diff['line1'] - 1)
+            self.viewport.apply_selection()
+            self._paint_selected_intraline(diff) # After show_row, which may re-render
+            self.diff_status_label.config(text=f"Difference {self.current_diff_index + 1} of {len(self.diffs)}")
+            self.merge_to_left_button.config(state=tk.NORMAL)
+            self.merge_to_right_button.config(state=tk.NORMAL)
+            self._selection_cursor = self.text1.index(tk.INSERT) # After any re-render
+            return
         self.text1.tag_remove(self.tag_selected, "1.0", tk.END)
         self.text2.tag_remove(self.tag_selected, "1.0", tk.END)
-        widget_line1, widget_line2 = diff['line1'], diff['line2']
+        widget_line1, widget_line2 = diff['i1'] + 1, diff['j1'] + 1
         tag = diff['tag']
         len1, len2 = diff['i2'] - diff['i1'], diff['j2'] - diff['j1']
         start1, start2 = f"{widget_line1}.0", f"{widget_line2}.0"
-        max_len = max(len1, len2)
-        # Ensure at least one line height for selection highlight
-        end1_line = widget_line1 + max(max_len, 1)
-        end2_line = widget_line2 + max(max_len, 1)
-        end1, end2 = f"{end1_line}.0", f"{end2_line}.0"
+        # Ensure at least one line height for selection highlight (the line below a filler)
+        end1, end2 = f"{widget_line1 + max(len1, 1)}.0", f"{widget_line2 + max(len2, 1)}.0"
 
         scroll_target_line = widget_line1
         primary_widget = self.text1
@@ -645,171 +1588,225 @@ class DiffCheckerApp:
             self.text2.tag_add(self.tag_selected, start2, end2)
             scroll_target_line = widget_line1; primary_widget = self.text1
 
+        self._paint_selected_intraline(diff)
         self.diff_status_label.config(text=f"Difference {self.current_diff_index + 1} of {len(self.diffs)}")
         self.merge_to_left_button.config(state=tk.NORMAL)
         self.merge_to_right_button.config(state=tk.NORMAL)
         primary_widget.see(f"{scroll_target_line}.0")
-        self.master.after(10, self._sync_scroll_after_find)
-
-
-    def _sync_scroll_after_find(self):
-        """Sync scroll positions after find_next_diff has scrolled one widget."""
-        if not self.selected_diff_details: return
-        try:
-            if self.current_diff_index < 0 or self.current_diff_index >= len(self.diffs): return
-            diff_tag = self.diffs[self.current_diff_index]['tag']
-            if diff_tag == 'insert':
-                 fraction = self.text2.yview()[0]
-                 if self.text1.yview()[0] != fraction: self.text1.yview_moveto(fraction)
-            else:
-                 fraction = self.text1.yview()[0]
-                 if self.text2.yview()[0] != fraction: self.text2.yview_moveto(fraction)
-            self._update_scrollbars()
-        except (tk.TclError, IndexError): pass
+        self.scroll_sync.lead(0 if primary_widget is self.text1 else 1) # Even if see() did not scroll
+        self._selection_cursor = self.text1.index(tk.INSERT)
 
 
-        # --- Merge Logic (Auto-find next) ---
+    # --- Merge Logic (Auto-find next) ---
     def merge_to_right(self):
         """Merges the selected difference from the left text box to the right."""
-        if not self.selected_diff_details: return
-        diff = self.selected_diff_details
-        tag, i1, i2, j1, j2 = diff['tag'], diff['i1'], diff['i2'], diff['j1'], diff['j2']
-
-        # --- Temporarily ensure all lines are visible for accurate indexing ---
-        originally_hidden = not self.identical_visible
-        if originally_hidden:
-            self.text1.tag_config(self.tag_identical, elide=False)
-            self.text2.tag_config(self.tag_identical, elide=False)
-            # Allow Tkinter to process the un-hiding before getting text
-            self.master.update_idletasks()
-        # --------------------------------------------------------------------
-
-        try: # Use try...finally to ensure compare_text runs
-            text1_current = self.text1.get("1.0", "end-1c")
-            text2_current = self.text2.get("1.0", "end-1c")
-            # Clean placeholders (now operating on fully visible text)
-            text1_lines_cleaned = [line for line in text1_current.splitlines() if ">>> Missing Line(s) <<<" not in line]
-            text2_lines_cleaned = [line for line in text2_current.splitlines() if ">>> Missing Line(s) <<<" not in line]
-
-            # Extract source content using original indices (should now be correct)
-            content_lines_to_merge = text1_lines_cleaned[i1:i2]
-
-            # Modify target lines
-            new_text2_lines = []
-            if tag == 'delete' or tag == 'replace':
-                new_text2_lines = text2_lines_cleaned[:j1] + content_lines_to_merge + text2_lines_cleaned[j2:]
-            elif tag == 'insert':
-                new_text2_lines = text2_lines_cleaned[:j1] + text2_lines_cleaned[j2:]
-
-            # Store view, disable undo, modify, restore undo, restore view
-            view1, view2 = self.text1.yview(), self.text2.yview()
-            undo1, undo2 = self.text1.cget('undo'), self.text2.cget('undo')
-            self.text1.config(undo=False); self.text2.config(undo=False)
-            # Set the *modified cleaned* text back
-            self.text1.delete("1.0", tk.END); self.text1.insert("1.0", "\n".join(text1_lines_cleaned))
-            # Set the *unmodified cleaned* text back to the other side for consistency before compare
-            self.text2.delete("1.0", tk.END); self.text2.insert("1.0", "\n".join(new_text2_lines))
-            self.text1.config(undo=undo1); self.text2.config(undo=undo2)
-            # Attempt to restore view, might be slightly off after text change
-            try:
-                self.text1.yview_moveto(view1[0]); self.text2.yview_moveto(view2[0])
-            except tk.TclError: pass # Ignore if view is invalid
-
-        finally:
-            # --- No need to manually re-hide here ---
-            # compare_text will handle re-applying elide based on self.identical_visible
-            pass
-
-        # Re-compare (will re-apply hiding if originally_hidden was True)
-        self.compare_text()
-
-        # Auto-find next diff
-        if self.diffs:
-            next_idx_to_select = -1
-            for idx, d in enumerate(self.diffs):
-                 if d['j1'] >= j1: # Compare original indices
-                      next_idx_to_select = idx
-                      break
-            if next_idx_to_select == -1: next_idx_to_select = 0 # Wrap
-            if len(self.diffs) > 1 and next_idx_to_select == self.current_diff_index:
-                 next_idx_to_select = (next_idx_to_select + 1) % len(self.diffs)
-            self._select_and_scroll_to_diff(next_idx_to_select)
-        else:
-            self._select_and_scroll_to_diff(-1)
-
+        self._merge_selected(to_right=True)
 
     def merge_to_left(self):
         """Merges the selected difference from the right text box to the left."""
-        if not self.selected_diff_details: return
+        self._merge_selected(to_right=False)
+
+    def _merge_selected(self, to_right):
+        """Copies the selected block across and patches the comparison locally.
+
+        Only the merged block's lines are rewritten in the target pane; the
+        opcodes around it are re-diffed and re-tagged, and later hunks are
+        shifted.
+        """
+        if self._live_after is not None: # Catch up with the latest edits first
+            self._cancel_live_diff()
+            self._live_diff() # Clears the selection, so the merge waits for a new one
+        if not self.selected_diff_details or self.diff_result is None or self._export_file is not None: return
+        if not self.virtual_mode and (self.text1.edit_modified() or self.text2.edit_modified()):
+            # The hunk no longer describes the text, so start from a fresh comparison
+            self.compare_text(on_done=lambda: self.diff_status_label.config(
+                text="Text was edited, compared again. Select the difference to merge."))
+            return
         diff = self.selected_diff_details
-        tag, i1, i2, j1, j2 = diff['tag'], diff['i1'], diff['i2'], diff['j1'], diff['j2']
-
-        # --- Temporarily ensure all lines are visible for accurate indexing ---
-        originally_hidden = not self.identical_visible
-        if originally_hidden:
-            self.text1.tag_config(self.tag_identical, elide=False)
-            self.text2.tag_config(self.tag_identical, elide=False)
-            # Allow Tkinter to process the un-hiding before getting text
-            self.master.update_idletasks()
-        # --------------------------------------------------------------------
-
-        try: # Use try...finally to ensure compare_text runs
-            text1_current = self.text1.get("1.0", "end-1c")
-            text2_current = self.text2.get("1.0", "end-1c")
-            # Clean placeholders (now operating on fully visible text)
-            text1_lines_cleaned = [line for line in text1_current.splitlines() if ">>> Missing Line(s) <<<" not in line]
-            text2_lines_cleaned = [line for line in text2_current.splitlines() if ">>> Missing Line(s) <<<" not in line]
-
-            # Extract source content using original indices (should now be correct)
-            content_lines_to_merge = text2_lines_cleaned[j1:j2]
-
-            # Modify target lines
-            new_text1_lines = []
-            if tag == 'insert' or tag == 'replace':
-                new_text1_lines = text1_lines_cleaned[:i1] + content_lines_to_merge + text1_lines_cleaned[i2:]
-            elif tag == 'delete':
-                new_text1_lines = text1_lines_cleaned[:i1] + text1_lines_cleaned[i2:]
-
-            # Store view, disable undo, modify, restore undo, restore view
-            view1, view2 = self.text1.yview(), self.text2.yview()
-            undo1, undo2 = self.text1.cget('undo'), self.text2.cget('undo')
-            self.text1.config(undo=False); self.text2.config(undo=False)
-            # Set the *modified cleaned* text back
-            self.text1.delete("1.0", tk.END); self.text1.insert("1.0", "\n".join(new_text1_lines))
-            # Set the *unmodified cleaned* text back to the other side for consistency before compare
-            self.text2.delete("1.0", tk.END); self.text2.insert("1.0", "\n".join(text2_lines_cleaned))
-            self.text1.config(undo=undo1); self.text2.config(undo=undo2)
-            # Attempt to restore view
-            try:
-                self.text1.yview_moveto(view1[0]); self.text2.yview_moveto(view2[0])
-            except tk.TclError: pass
-
-        finally:
-            # --- No need to manually re-hide here ---
-            pass
+        i1, i2, j1, j2 = diff['i1'], diff['i2'], diff['j1'], diff['j2']
+        op_index = self.diff_result.alignment.op_index_for_row(diff['line1'] - 1)
 
-        # Re-compare (will re-apply hiding if originally_hidden was True)
-        self.compare_text()
+        if to_right:
+            merged_lines = self.lines1[i1:i2]
+            self.lines2.replace(j1, j2, merged_lines)
+            target, target_lo, target_count = self.text2, j1, j2 - j1
+        else:
+            merged_lines = self.lines2[j1:j2]
+            self.lines1.replace(i1, i2, merged_lines)
+            target, target_lo, target_count = self.text1, i1, i2 - i1
+
+        # --- Patch only the merged block's lines ---
+        if not self.virtual_mode: self._patch_merged_lines(target, target_lo, target_count, merged_lines)
+
+        # --- Re-diff the surrounding window and shift later hunks ---
+        options = self.key_options
+        self.diff_result, lo, hi = rediff_window(self.diff_result, self.key_cache.view(self.lines1, options),
+                                                 self.key_cache.view(self.lines2, options),
+                                                 op_index, op_index + 1, self.algorithm_var.get())
+        if not self.virtual_mode and hi > lo:
+            self._expand_folds_in(lo, hi)
+            self._retag_ops(lo, hi)
+        self.diffs = self.diff_result.hunks
+        self.current_diff_index = -1
+        self.selected_diff_details = None
+        self._intraline_rows.clear() # Rows below the block have moved
+        if self.virtual_mode: self.viewport.render()
+        self._update_navigation_buttons()
+        self.ruler.redraw()
+        self._update_identical_buttons(self.diff_result.stats.equal > 0)
 
         # Auto-find next diff
         if self.diffs:
-            next_idx_to_select = -1
-            for idx, d in enumerate(self.diffs):
-                 if d['i1'] >= i1: # Compare original indices
-                      next_idx_to_select = idx
-                      break
-            if next_idx_to_select == -1: next_idx_to_select = 0 # Wrap
-            if len(self.diffs) > 1 and next_idx_to_select == self.current_diff_index:
-                 next_idx_to_select = (next_idx_to_select + 1) % len(self.diffs)
-            self._select_and_scroll_to_diff(next_idx_to_select)
+            # First hunk at or after the merged block, by original line index
+            next_idx_to_select = self.diffs.first_at_or_after('j1', j1) if to_right else self.diffs.first_at_or_after('i1', i1)
+            self._select_and_scroll_to_diff(next_idx_to_select if next_idx_to_select < len(self.diffs) else 0) # Wrap
         else:
             self._select_and_scroll_to_diff(-1)
-
-
+            self.diff_status_label.config(text="No differences found.")
+
+    def _patch_merged_lines(self, target, lo, count, merged_lines):
+        """Rewrites the merged block in the target pane without touching undo history."""
+        undo = target.cget('undo')
+        target.config(undo=False)
+        with self._edit_trackers[0 if target is self.text1 else 1].paused(): # The document already has them
+            self._replace_lines(target, lo, count, merged_lines)
+        self._highlight_rows(target, lo + 1, merged_lines)
+        target.config(undo=undo)
+        self.text1.edit_modified(False); self.text2.edit_modified(False)
+        for tracker in self._edit_trackers: tracker.take() # The model already has the merged lines
+
+    def _replace_lines(self, text_widget, lo, count, lines):
+        """Replaces model lines [lo, lo + count) of a pane with `lines`."""
+        if not count and not lines: return
+        last_index = text_widget.index("end-1c")
+        last_line = 0 if last_index == "1.0" else int(last_index.split('.')[0])
+        if lo + count < last_line:
+            text_widget.delete(f"{lo + 1}.0", f"{lo + count + 1}.0")
+            text_widget.insert(f"{lo + 1}.0", "".join(l + "\n" for l in lines))
+        elif lo > 0: # Block runs to the end of the buffer, whose last line has no newline
+            text_widget.delete(f"{lo}.end", "end-1c")
+            text_widget.insert(f"{lo}.end", "".join("\n" + l for l in lines))
+        else:
+            text_widget.delete("1.0", "end-1c")
+            text_widget.insert("1.0", "\n".join(lines))
+
+    def _highlight_rows(self, text_widget, line, lines):
+        """Syntax-highlights lines that were just inserted at widget line `line`."""
+        if not PYGMENTS_AVAILABLE or not lines: return
+        self._highlight_widget(text_widget, self._get_lexer(), "\n".join(lines), start=f"{line}.0")
+
+
+# --- Batch Mode (no Tk window) ---
+def run_batch(paths, algorithm=DEFAULT_ALGORITHM, cache=None, key_options=None):
+    """Compares LEFT RIGHT file pairs and prints one summary line per pair.
+
+    A pair of folders is compared file by file (see folder_compare), always
+    exactly; key_options only applies to file pairs.
+    Returns a diff-style exit status: 0 if all pairs are identical,
+    1 if any pair differs and 2 if any file could not be read.
+    """
+    status = 0
+    for left, right in zip(paths[0::2], paths[1::2]):
+        if os.path.isdir(left) and os.path.isdir(right):
+            status = max(status, _run_folder_batch(left, right, algorithm))
+            continue
+        try:
+            result = diff_files(left, right, algorithm, cache, key_options)
+        except OSError as e:
+            print(f"{left} {right}: error: {e}", file=sys.stderr)
+            status = 2
+            continue
+        print(f"{left} {right}: {result.stats.summary()}")
+        if result.hunks and status == 0: status = 1
+    return status
+
+
+def run_merge(base_path, left_path, right_path, algorithm=DEFAULT_ALGORITHM, out=None):
+    """Three-way merges files and writes the result (with conflict markers) to out.
+
+    Returns 0 for a clean merge, 1 if conflicts remain and 2 if a file could
+    not be read.
+    """
+    out = out or sys.stdout
+    sources = []
+    try:
+        for path in (base_path, left_path, right_path):
+            sources.append(MappedLines(path))
+        base, left, right = sources
+        regions = merge_regions(base, left, right, algorithm)
+        for line in merged_lines(regions, base, left, right, (left_path, base_path, right_path)):
+            out.write(line + "\n")
+    except OSError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        for lines in sources: lines.close()
+    conflicts = conflict_count(regions)
+    if conflicts: print(f"{conflicts} conflicts.", file=sys.stderr)
+    return 1 if conflicts else 0
+
+
+def _run_folder_batch(left, right, algorithm):
+    status = 0
+    for entry in sorted(FolderComparison(left, right, algorithm).run(), key=lambda entry: entry.path):
+        if entry.status == "error":
+            print(f"{entry.path}: error: {entry.error}", file=sys.stderr)
+            status = 2
+            continue
+        summary = entry.stats.summary() if entry.stats else ("No differences found." if entry.status == "identical" else entry.status)
+        print(f"{entry.path}: {summary}")
+        if entry.status != "identical": status = max(status, 1)
+    return status
 
 
 # --- Main Execution ---
-if __name__ == "__main__":
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Side-by-side text difference checker.")
+    parser.add_argument("files", nargs="*", metavar="FILE",
+                        help="optional LEFT and RIGHT files (or folders) to open in the GUI")
+    parser.add_argument("--batch", nargs="+", metavar="PATH",
+                        help="compare LEFT RIGHT file or folder pairs without opening the GUI")
+    parser.add_argument("--merge", nargs=3, metavar=("BASE", "LEFT", "RIGHT"),
+                        help="three-way merge LEFT and RIGHT against BASE and print the result without opening the GUI")
+    parser.add_argument("--base", metavar="FILE",
+                        help="open the three-way merge of the LEFT and RIGHT files against this base file")
+    parser.add_argument("--algorithm", choices=list(ALGORITHMS), default=DEFAULT_ALGORITHM,
+                        help=f"diff algorithm for --batch and --merge (default: {DEFAULT_ALGORITHM})")
+    parser.add_argument("--ignore-trailing-space", action="store_const", dest="whitespace", const="trailing", default="exact",
+                        help="ignore whitespace at line end")
+    parser.add_argument("-b", "--ignore-space-change", action="store_const", dest="whitespace", const="changes",
+                        help="ignore changes in the amount of whitespace")
+    parser.add_argument("-w", "--ignore-all-space", action="store_const", dest="whitespace", const="all",
+                        help="ignore all whitespace")
+    parser.add_argument("-i", "--ignore-case", action="store_true",
+                        help="ignore case differences")
+    parser.add_argument("--mask", action="append", default=[], metavar="REGEX",
+                        help="ignore text matching REGEX (may be repeated)")
+    parser.add_argument("--stats-log", metavar="JSONL",
+                        help="append per-phase timings and counters of every comparison to this file")
+    parser.add_argument("--profile-compare", metavar="PROF",
+                        help="profile the first comparison with cProfile and tracemalloc (writes PROF and PROF.txt)")
+    parser.add_argument("--disk-cache", action="store_true",
+                        help=f"also keep diff results on disk under {user_cache_dir()}")
+    args = parser.parse_args(argv)
+    for pattern in args.mask:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            parser.error(f"--mask {pattern!r}: {e}")
+    key_options = KeyOptions(args.whitespace, args.ignore_case, tuple(args.mask))
+    cache = DiffCache(disk_dir=user_cache_dir() if args.disk_cache else None)
+    if args.batch:
+        if len(args.batch) % 2:
+            parser.error("--batch expects LEFT RIGHT pairs of paths")
+        return run_batch(args.batch, args.algorithm, cache, key_options)
+    if args.merge:
+        return run_merge(*args.merge, args.algorithm)
+    if len(args.files) not in (0, 2):
+        parser.error("expected no files or a LEFT and a RIGHT file")
+    if args.base and len(args.files) != 2:
+        parser.error("--base needs a LEFT and a RIGHT file")
+
     root = tk.Tk()
     style = ttk.Style(root)
     style.theme_use('clam')
@@ -817,6 +1814,9 @@ if __name__ == "__main__":
     style.map('TCombobox', fieldbackground=[('readonly', TEXT_BG_COLOR)])
     style.map('TCombobox', selectbackground=[('readonly', TEXT_BG_COLOR)])
     style.map('TCombobox', selectforeground=[('readonly', FG_COLOR)])
+    style.configure("Treeview", background=TEXT_BG_COLOR, fieldbackground=TEXT_BG_COLOR, foreground=FG_COLOR)
+    style.configure("Treeview.Heading", background=BUTTON_BG_COLOR, foreground=FG_COLOR)
+    style.map("Treeview", background=[('selected', SELECT_BG_COLOR)])
     root.option_add("*Background", BG_COLOR)
     root.option_add("*Foreground", FG_COLOR)
     root.option_add("*Button.Background", BUTTON_BG_COLOR)
@@ -835,5 +1835,21 @@ if __name__ == "__main__":
     root.option_add("*Scrollbar.troughColor", BG_COLOR)
     root.option_add("*Scrollbar.activeBackground", BUTTON_ACTIVE_BG)
 
-    app = DiffCheckerApp(root)
-    root.mainloop()
\ No newline at end of file
+    app = DiffCheckerApp(root, cache)
+    app.stats_log = args.stats_log
+    app.set_key_options(key_options)
+    if args.profile_compare: app.profile_next_compare(args.profile_compare)
+    if args.files and all(os.path.isdir(path) for path in args.files):
+        app.compare_folders(*args.files)
+    elif args.files:
+        app.open_file(1, args.files[0], compare=False)
+        app.open_file(2, args.files[1], compare=False)
+        app.compare_text()
+    if args.base:
+        app.three_way_merge(args.base)
+    root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Tracks which lines of a Tk Text widget were edited since the last look."""
+from contextlib import contextmanager
+
+
+def _line(index):
+    return int(str(index).split(".")[0])
+
+
+class EditTracker:
+    """Routes a Text widget's insert/delete/replace through Python to see every edit.
+
+    The widget's Tcl command is renamed and replaced by a small Tcl proc,
+    so edits made by key bindings, paste and undo are seen as well, while
+    every other subcommand (tags, marks, scrolling) still goes straight to
+    the widget without a Python round trip. If a document (a PieceTable)
+    is attached, each edit also copies the lines it touched into it, so
+    the document always holds the widget's lines. The document counts lines
+    like splitlines(), one fewer than Tk when the text ends with a newline,
+    so its edited range is tracked apart from the widget's.
+    """
+
+    def __init__(self, widget, document=None):
+        self.widget = widget
+        self.document = document # piece_table.PieceTable kept equal to the widget's lines, or None
+        self.dirty = None # (first, last) edited line, 0-based and inclusive, in current line numbers
+        self.delta = 0 # Lines added minus lines removed since take()
+        self.replaced = None # (lo, hi) document lines written since take(), half-open, in current line numbers
+        self.replaced_delta = 0 # Document lines added minus lines removed since take()
+        self._bypassed = False # An edit since take() left the document alone
+        path = str(widget)
+        self._orig = f"{path}_orig"
+        callback = f"{path}_edit"
+        widget.tk.call("rename", path, self._orig)
+        widget.tk.createcommand(callback, self._edit)
+        widget.tk.call("proc", path, "args", f"""
+            switch -exact -- [lindex $args 0] {{
+                insert - delete - replace {{ return [{callback} {{*}}$args] }}
+            }}
+            return [{self._orig} {{*}}$args]""")
+
+    def _edit(self, op, *args):
+        call = self.widget.tk.call
+        if str(call(self._orig, "cget", "-state")) == "disabled": return call(self._orig, op, *args)
+        indices = args[:1] if op == "insert" else args[:2] if op == "replace" else args
+        last_line = _line(call(self._orig, "index", "end-1c"))
+        lines = [min(_line(call(self._orig, "index", index)), last_line) for index in indices]
+        result = call(self._orig, op, *args)
+        delta = _line(call(self._orig, "index", "end-1c")) - last_line
+        first = min(lines) - 1
+        # A deleted newline joins the next line in, even if no index named it
+        last = max(max(lines) - 1, first - delta)
+        self._note(first, last, delta)
+        if self.document is not None: self._note_replaced(*self._sync(first, last, delta))
+        else: self._bypassed = True
+        return result
+
+    def _sync(self, first, last, delta):
+        """Copies the widget's lines first..last + delta into the document, over its old lines first..last.
+
+        Returns (lo, hi, count): old document lines [lo, hi) became `count` lines.
+        """
+        call = self.widget.tk.call
+        new_last = last + delta
+        new_lines = str(call(self._orig, "get", f"{first + 1}.0", f"{new_last + 1}.end")).split("\n")
+        # Like splitlines(), a newline ending the text does not start another line
+        if not new_lines[-1] and self.widget.tk.getboolean(call(self._orig, "compare", f"{new_last + 1}.end", "==", "end-1c")):
+            new_lines.pop()
+        length = len(self.document)
+        lo, hi = min(first, length), min(last + 1, length)
+        self.document.replace(lo, hi, new_lines)
+        return lo, hi, len(new_lines)
+
+    def call_untracked(self, *args):
+        """Runs a widget subcommand past the tracker, for edits that change no line text (embedded windows)."""
+        return self.widget.tk.call(self._orig, *args)
+
+    @contextmanager
+    def paused(self):
+        """Edits made inside the block leave the document alone; the caller updates it itself."""
+        document, self.document = self.document, None
+        try:
+            yield
+        finally:
+            self.document = document
+
+    def _note(self, first, last, delta):
+        """Records that old lines first..last became first..last + delta."""
+        new_last = last + delta
+        if self.dirty is None:
+            self.dirty = (first, new_last)
+        else:
+            lo, hi = self.dirty
+            if hi > last: hi += delta # The dirty range ends below the edit, which moved it
+            elif hi >= first: hi = new_last
+            self.dirty = (min(lo, first), max(hi, new_last))
+        self.delta += delta
+
+    def _note_replaced(self, lo, hi, count):
+        """Records that old document lines [lo, hi) became [lo, lo + count)."""
+        new_hi = lo + count
+        if self.replaced is None:
+            self.replaced = (lo, new_hi)
+        else:
+            start, stop = self.replaced
+            if stop >= hi: stop += count - (hi - lo) # The range ends below the edit, which moved it
+            self.replaced = (min(start, lo), max(stop, new_hi))
+        self.replaced_delta += count - (hi - lo)
+
+    def take(self):
+        """Returns (first, last, delta, old) for the edits since the last call, or None, and forgets them.
+
+        first..last are current widget line numbers; they replaced the old
+        lines first..last - delta. old is the (lo, hi) range of old document
+        lines the edits replaced, or None if some edit bypassed the document.
+        """
+        if self.dirty is None: return None
+        old = None
+        if self.replaced is not None and not self._bypassed:
+            old = (self.replaced[0], self.replaced[1] - self.replaced_delta)
+        edit = (*self.dirty, self.delta, old)
+        self.dirty, self.delta = None, 0
+        self.replaced, self.replaced_delta, self._bypassed = None, 0, False
+        return edit
@@ -0,0 +1,156 @@
+"""Folder-vs-folder comparison: pairs files by relative path and diffs the changed ones in worker processes."""
+import hashlib
+import os
+import stat
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from diff_algorithms import DEFAULT_ALGORITHM
+from diff_cache import pack_opcodes, unpack_opcodes
+from diff_engine import DiffStats, diff_files
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+@dataclass
+class FolderEntry:
+    """One relative path of a folder comparison."""
+    path: str # Relative path with "/" separators
+    status: str # identical, changed, left only, right only or error
+    size1: int = None # File sizes in bytes; None where the side has no such file
+    size2: int = None
+    stats: DiffStats = None # Only for pairs that were diffed
+    packed: bytes = None # Their opcodes, see diff_cache.pack_opcodes
+    error: str = None
+
+    def opcodes(self):
+        """The precomputed opcodes, or None if the pair was never diffed."""
+        if self.packed is None: return None
+        unpacked = unpack_opcodes(self.packed)
+        return list(unpacked[0]) if unpacked else None
+
+
+# --- Scanning ---
+def list_files(root):
+    """{relative path: size} of every regular file below root."""
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            if stat.S_ISREG(info.st_mode):
+                files[os.path.relpath(path, root).replace(os.sep, "/")] = info.st_size
+    return files
+
+
+def file_digest(path):
+    hasher = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            hasher.update(chunk)
+    return hasher.digest()
+
+
+def diff_pair(path1, path2, algorithm=DEFAULT_ALGORITHM):
+    """Process pool task: returns (stats, packed opcodes) of one file pair."""
+    result = diff_files(path1, path2, algorithm)
+    return result.stats, pack_opcodes(result.opcodes, result.stats.lines1, result.stats.lines2).tobytes()
+
+
+# --- Comparison ---
+class FolderComparison:
+    """Compares two folder trees, optionally on a background thread.
+
+    Files are paired by relative path. Pairs of equal size whose contents
+    hash the same are identical without being read as text; every other
+    pair is diffed in a ProcessPoolExecutor with the same engine the panes
+    use. Entries are appended to `entries` as soon as their status is known,
+    so a poller can show them while the rest is still running.
+    """
+
+    def __init__(self, root1, root2, algorithm=DEFAULT_ALGORITHM, max_workers=None):
+        self.root1 = root1
+        self.root2 = root2
+        self.algorithm = algorithm
+        self.max_workers = max_workers # None lets the pool use every CPU
+        self.state = "running" # running, done, cancelled or error
+        self.phase = None # scan, hash or diff
+        self.total = 0 # Paths found so far
+        self.entries = []
+        self.error = None
+        self._cancel = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def paths(self, entry):
+        """Full left and right paths of an entry (None for a missing side)."""
+        path1 = os.path.join(self.root1, entry.path) if entry.size1 is not None else None
+        path2 = os.path.join(self.root2, entry.path) if entry.size2 is not None else None
+        return path1, path2
+
+    def _run(self):
+        try:
+            self.run()
+            self.state = "cancelled" if self._cancel.is_set() else "done"
+        except Exception as e: # Reported on the main loop
+            self.error = e
+            self.state = "error"
+
+    def run(self):
+        """Runs the whole comparison on the calling thread; returns the entries."""
+        self.phase = "scan"
+        files1, files2 = list_files(self.root1), list_files(self.root2)
+        paths = sorted(files1.keys() | files2.keys())
+        self.total = len(paths)
+        self.phase = "hash"
+        to_diff = []
+        for path in paths:
+            if self._cancel.is_set(): return self.entries
+            entry = FolderEntry(path, "identical", files1.get(path), files2.get(path))
+            if entry.size2 is None: entry.status = "left only"
+            elif entry.size1 is None: entry.status = "right only"
+            elif entry.size1 != entry.size2 or not self._same_content(entry):
+                if entry.status != "error": to_diff.append(entry)
+                continue
+            self.entries.append(entry)
+        if to_diff: self._diff_all(to_diff)
+        return self.entries
+
+    def _same_content(self, entry):
+        try:
+            return file_digest(os.path.join(self.root1, entry.path)) == file_digest(os.path.join(self.root2, entry.path))
+        except OSError as e:
+            self._fail(entry, e)
+            return False
+
+    def _fail(self, entry, error):
+        entry.status = "error"
+        entry.error = str(error)
+        self.entries.append(entry)
+
+    def _diff_all(self, entries):
+        self.phase = "diff"
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(diff_pair, *self.paths(entry), self.algorithm): entry for entry in entries}
+            for future in as_completed(futures):
+                if self._cancel.is_set():
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    return
+                entry = futures[future]
+                try:
+                    entry.stats, entry.packed = future.result()
+                except Exception as e: # One unreadable pair does not stop the others
+                    self._fail(entry, e)
+                    continue
+                # Sizes can differ only in line endings, which the diff ignores
+                entry.status = "changed" if entry.stats.hunks else "identical"
+                self.entries.append(entry)
@@ -0,0 +1,109 @@
+"""Summary window of a folder comparison; opening an entry shows that pair in the panes."""
+import tkinter as tk
+from tkinter import ttk
+
+from folder_compare import FolderComparison
+
+POLL_MS = 100
+PHASES = {"scan": "scanning", "hash": "checking identical files", "diff": "diffing"}
+# Column id, heading, width, sort key
+COLUMNS = (
+    ("path", "Path", 420, lambda entry: entry.path),
+    ("status", "Status", 90, lambda entry: entry.status),
+    ("changes", "Changes", 200, lambda entry: entry.stats.hunks if entry.stats else -1),
+    ("size1", "Left Size", 90, lambda entry: -1 if entry.size1 is None else entry.size1),
+    ("size2", "Right Size", 90, lambda entry: -1 if entry.size2 is None else entry.size2),
+)
+
+
+def _changes_text(entry):
+    if entry.error: return entry.error
+    stats = entry.stats
+    if not stats or not stats.hunks: return ""
+    return f"{stats.hunks} (+{stats.inserted} -{stats.deleted} ~{stats.changed1}/{stats.changed2})"
+
+
+class FolderView:
+    """Toplevel with one sortable row per relative path.
+
+    Rows appear while the comparison is still running. Clicking a heading
+    sorts by that column (again to reverse); double-click or Enter opens the
+    pair in the app's panes with the opcodes the worker processes already
+    computed.
+    """
+
+    def __init__(self, app, root1, root2, status_options):
+        self.app = app
+        self.window = tk.Toplevel(app.master)
+        self.window.title(f"Folder Comparison: {root1} <-> {root2}")
+        self.window.geometry("950x500")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.status_label = tk.Label(self.window, text="Scanning...", anchor=tk.W)
+        self.status_label.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=2)
+        scroll = tk.Scrollbar(self.window)
+        scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree = ttk.Treeview(self.window, columns=[column[0] for column in COLUMNS], show="headings",
+                                 selectmode="browse", yscrollcommand=scroll.set)
+        scroll.config(command=self.tree.yview)
+        for column, heading, width, key in COLUMNS:
+            self.tree.heading(column, text=heading, command=lambda column=column: self.sort_by(column))
+            self.tree.column(column, width=width, stretch=(column == "path"),
+                             anchor=tk.W if column in ("path", "status", "changes") else tk.E)
+        for status, options in status_options.items(): # Status -> row tag options
+            self.tree.tag_configure(status, **options)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.tree.bind("<Double-1>", self.open_selected)
+        self.tree.bind("<Return>", self.open_selected)
+
+        self._sort = ("path", False) # Column and reverse flag
+        self._shown = 0 # Entries already inserted as rows
+        self.comparison = FolderComparison(root1, root2, app.algorithm_var.get()).start()
+        self.window.after(POLL_MS, self._poll)
+
+    def _poll(self):
+        """Adds new entries as rows and reports progress until the comparison ends."""
+        if not self.window.winfo_exists(): return # Closed meanwhile
+        comparison = self.comparison
+        entries = comparison.entries
+        new_count = len(entries)
+        for index in range(self._shown, new_count):
+            entry = entries[index]
+            self.tree.insert("", tk.END, iid=str(index), tags=(entry.status,), values=(
+                entry.path, entry.status, _changes_text(entry),
+                "" if entry.size1 is None else entry.size1, "" if entry.size2 is None else entry.size2))
+        self._shown = new_count
+        if comparison.state == "running":
+            self.status_label.config(text=f"Comparing... {PHASES.get(comparison.phase, '')} {new_count}/{comparison.total} files")
+            self.window.after(POLL_MS, self._poll)
+            return
+        if comparison.state == "error":
+            self.status_label.config(text=f"Folder comparison failed: {comparison.error}")
+            return
+        self.sort_by(self._sort[0], toggle=False)
+        counts = {}
+        for entry in entries: counts[entry.status] = counts.get(entry.status, 0) + 1
+        self.status_label.config(text=f"{len(entries)} files: " + ", ".join(
+            f"{count} {status}" for status, count in sorted(counts.items())))
+
+    def sort_by(self, column, toggle=True):
+        """Orders the rows by a column; toggling the current column reverses it."""
+        current, reverse = self._sort
+        if toggle: reverse = not reverse if column == current else False
+        self._sort = (column, reverse)
+        key = next(column_key for column_id, _, _, column_key in COLUMNS if column_id == column)
+        entries = self.comparison.entries[:self._shown]
+        order = sorted(range(len(entries)), key=lambda index: (key(entries[index]), entries[index].path), reverse=reverse)
+        for position, index in enumerate(order):
+            self.tree.move(str(index), "", position)
+
+    def open_selected(self, event=None):
+        selection = self.tree.selection()
+        if not selection: return
+        entry = self.comparison.entries[int(selection[0])]
+        path1, path2 = self.comparison.paths(entry)
+        self.app.open_file_pair(path1, path2, entry.opcodes())
+
+    def close(self):
+        self.comparison.cancel()
+        self.window.destroy()
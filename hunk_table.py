@@ -0,0 +1,88 @@
+"""Column-oriented storage for the hunks of a comparison (the app's self.diffs)."""
+from array import array
+from bisect import bisect_left
+
+TAGS = ('replace', 'delete', 'insert') # Tag codes stored in HunkTable.tags
+_TAG_CODES = {tag: code for code, tag in enumerate(TAGS)}
+
+
+class Hunk:
+    """One hunk, copied out of a HunkTable.
+
+    Reads like the per-hunk dicts it replaces (hunk['i1']) or by attribute.
+    Aligned rows are shared by both panes, so line1 == line2 == row + 1.
+    """
+    __slots__ = ('tag', 'i1', 'i2', 'j1', 'j2', 'line1', 'line2')
+
+    def __init__(self, tag, i1, i2, j1, j2, row):
+        self.tag, self.i1, self.i2, self.j1, self.j2 = tag, i1, i2, j1, j2
+        self.line1 = self.line2 = row + 1
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __repr__(self):
+        return f"Hunk({self.tag!r}, {self.i1}, {self.i2}, {self.j1}, {self.j2}, line={self.line1})"
+
+
+class HunkTable:
+    """Hunks as parallel arrays: a tag code byte and five int64 columns each.
+
+    That is 41 bytes a hunk instead of a dict with seven boxed values, and
+    the columns double as sorted indexes (every column ascends), so lookups
+    are bisects. Indexing returns a Hunk copy; edits go through shift() and
+    splice(), which work on whole column slices.
+    """
+    __slots__ = ('tags', 'i1', 'i2', 'j1', 'j2', 'rows')
+    COORDINATES = ('i1', 'i2', 'j1', 'j2', 'rows')
+
+    def __init__(self):
+        self.tags = array('b')
+        for name in self.COORDINATES: setattr(self, name, array('q'))
+
+    @classmethod
+    def from_opcodes(cls, opcodes, row_starts, first=0):
+        """Table of the non-equal opcodes; row_starts[k] is the row of opcodes[k - first]."""
+        table = cls()
+        picked = [k for k, op in enumerate(opcodes) if op[0] != 'equal']
+        table.tags = array('b', [_TAG_CODES[opcodes[k][0]] for k in picked])
+        for field, name in enumerate(cls.COORDINATES[:4], start=1):
+            setattr(table, name, array('q', [opcodes[k][field] for k in picked]))
+        table.rows = array('q', [row_starts[first + k] for k in picked])
+        return table
+
+    def __len__(self):
+        return len(self.tags)
+
+    def __getitem__(self, k):
+        if k < 0: k += len(self.tags)
+        return Hunk(TAGS[self.tags[k]], self.i1[k], self.i2[k], self.j1[k], self.j2[k], self.rows[k])
+
+    def __iter__(self):
+        return map(self.__getitem__, range(len(self.tags)))
+
+    def tag(self, k):
+        return TAGS[self.tags[k]]
+
+    @property
+    def nbytes(self):
+        return sum(column.itemsize * len(column) for column in (self.tags, self.i1, self.i2, self.j1, self.j2, self.rows))
+
+    # --- Bulk Operations ---
+    def shift(self, start, di, dj, drow):
+        """Moves hunks[start:] by di left lines, dj right lines and drow rows."""
+        for name, delta in (('i1', di), ('i2', di), ('j1', dj), ('j2', dj), ('rows', drow)):
+            if not delta: continue
+            column = getattr(self, name)
+            column[start:] = array('q', map(delta.__add__, column[start:]))
+
+    def splice(self, lo, hi, other):
+        """Replaces hunks[lo:hi] by the hunks of another table."""
+        for name in self.__slots__: getattr(self, name)[lo:hi] = getattr(other, name)
+
+    def first_at_or_after(self, column, value):
+        """Index of the first hunk whose `column` (e.g. 'i1') is >= value, or len(self)."""
+        return bisect_left(getattr(self, column), value)
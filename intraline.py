@@ -0,0 +1,44 @@
+"""Word- and character-level differences inside the paired lines of a 'replace' block."""
+import difflib
+import re
+from functools import lru_cache
+
+INTRALINE_CACHE_SIZE = 8192 # Line pairs whose spans are kept
+MAX_CHAR_RUN = 200 # Longer changed word runs are not refined to characters
+_TOKEN_RE = re.compile(r"\w+|\s+|[^\w\s]")
+
+
+def _token_starts(tokens):
+    starts = [0]
+    for token in tokens: starts.append(starts[-1] + len(token))
+    return starts
+
+
+@lru_cache(maxsize=INTRALINE_CACHE_SIZE)
+def line_pair_spans(line1, line2):
+    """Changed column ranges of two paired lines.
+
+    Returns ((words1, chars1), (words2, chars2)). Each entry is a tuple of
+    (start, end) columns: `words` covers the changed word tokens, `chars`
+    the characters that differ inside them. Results are cached per pair,
+    so only the lines someone actually looks at are ever diffed.
+    """
+    tokens1, tokens2 = _TOKEN_RE.findall(line1), _TOKEN_RE.findall(line2)
+    starts1, starts2 = _token_starts(tokens1), _token_starts(tokens2)
+    words1, words2, chars1, chars2 = [], [], [], []
+    matcher = difflib.SequenceMatcher(None, tokens1, tokens2, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal': continue
+        lo1, hi1, lo2, hi2 = starts1[i1], starts1[i2], starts2[j1], starts2[j2]
+        if lo1 < hi1: words1.append((lo1, hi1))
+        if lo2 < hi2: words2.append((lo2, hi2))
+        if tag != 'replace' or max(hi1 - lo1, hi2 - lo2) > MAX_CHAR_RUN:
+            if lo1 < hi1: chars1.append((lo1, hi1))
+            if lo2 < hi2: chars2.append((lo2, hi2))
+            continue
+        char_matcher = difflib.SequenceMatcher(None, line1[lo1:hi1], line2[lo2:hi2], autojunk=False)
+        for ctag, c1, c2, d1, d2 in char_matcher.get_opcodes():
+            if ctag == 'equal': continue
+            if c1 < c2: chars1.append((lo1 + c1, lo1 + c2))
+            if d1 < d2: chars2.append((lo2 + d1, lo2 + d2))
+    return (tuple(words1), tuple(chars1)), (tuple(words2), tuple(chars2))
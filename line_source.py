@@ -0,0 +1,81 @@
+"""Memory-mapped text files exposed as a lazily indexed sequence of lines."""
+import mmap
+import os
+from array import array
+from collections.abc import Sequence
+from itertools import accumulate
+
+INDEX_CHUNK_BYTES = 16 * 1024 * 1024 # Newlines are located one chunk at a time
+
+
+class MappedLines(Sequence):
+    """Read-only lines of a file, decoded on demand from an mmap.
+
+    The line-offset index (an array of byte offsets, 8 bytes per line) is
+    built on first use; no other copy of the file is kept in memory. Lines
+    are split on "\\n" and a trailing "\\r" is dropped, so LF and CRLF files
+    read the same.
+    """
+
+    def __init__(self, path, encoding="utf-8"):
+        self.path = path
+        self.encoding = encoding
+        self._file = open(path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # Zero-length files cannot be mapped
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self._offsets = None
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap): self._map.close()
+        self._file.close()
+
+    @property
+    def raw(self):
+        """The mapped bytes (b"" for an empty file)."""
+        return self._map
+
+    # --- Line Index ---
+    @property
+    def offsets(self):
+        """Byte offset of every line start, plus the end of the data."""
+        if self._offsets is None: self._offsets = self._build_index()
+        return self._offsets
+
+    def _build_index(self):
+        offsets = array('q', [0])
+        for chunk_start in range(0, self.size, INDEX_CHUNK_BYTES):
+            pieces = self._map[chunk_start:chunk_start + INDEX_CHUNK_BYTES].split(b"\n")
+            # Every piece but the last ends with a newline; the next line starts after it.
+            # map/accumulate keep the per-line work in C.
+            starts = accumulate(map((1).__add__, map(len, pieces[:-1])))
+            offsets.extend(map(chunk_start.__add__, starts))
+        if offsets[-1] != self.size: offsets.append(self.size) # Last line has no newline
+        return offsets
+
+    # --- Sequence Protocol ---
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _decode(self, start, end):
+        raw = self._map[start:end]
+        if raw.endswith(b"\n"): raw = raw[:-1]
+        if raw.endswith(b"\r"): raw = raw[:-1]
+        return raw.decode(self.encoding, "replace")
+
+    def __getitem__(self, index):
+        offsets = self.offsets
+        if isinstance(index, slice):
+            return [self._decode(offsets[k], offsets[k + 1]) for k in range(*index.indices(len(self)))]
+        if index < 0: index += len(self)
+        if not 0 <= index < len(self): raise IndexError("line index out of range")
+        return self._decode(offsets[index], offsets[index + 1])
+
+    def __iter__(self):
+        offsets = self.offsets
+        for k in range(len(offsets) - 1):
+            yield self._decode(offsets[k], offsets[k + 1])
+
+    def text(self):
+        """The whole file as one string (only for panes that must hold it)."""
+        return "\n".join(self)
@@ -0,0 +1,99 @@
+"""Tk-free three-way merge: splits base/left/right into stable and conflicting regions."""
+from diff_algorithms import DEFAULT_ALGORITHM
+from diff_engine import diff_opcodes
+
+# Region kinds
+STABLE = "stable" # Unchanged on both sides
+LEFT = "left" # Changed on the left only
+RIGHT = "right" # Changed on the right only
+SAME = "same" # Changed identically on both sides
+CONFLICT = "conflict" # Changed differently on both sides
+
+CONFLICT_START = "<<<<<<< "
+CONFLICT_BASE = "||||||| "
+CONFLICT_SEP = "======="
+CONFLICT_END = ">>>>>>> "
+
+
+def _hunks(opcodes):
+    return [(i1, i2, j1, j2) for tag, i1, i2, j1, j2 in opcodes if tag != 'equal']
+
+
+def merge_regions(base, left, right, algorithm=DEFAULT_ALGORITHM, left_opcodes=None, right_opcodes=None):
+    """Regions of a three-way merge as (kind, b1, b2, l1, l2, r1, r2) tuples.
+
+    base->left and base->right are diffed once (unless their opcodes are
+    given) and their hunks are swept together in a single pass in base
+    order. Hunks of both sides that overlap or touch in the base form one
+    region; it is SAME if both sides ended up with the same lines and a
+    CONFLICT otherwise. Everything between regions is STABLE. The ranges
+    are half-open line ranges of base, left and right, and together the
+    regions cover all three texts in order.
+    """
+    if left_opcodes is None: left_opcodes = diff_opcodes(base, left, algorithm)
+    if right_opcodes is None: right_opcodes = diff_opcodes(base, right, algorithm)
+    hunks_l, hunks_r = _hunks(left_opcodes), _hunks(right_opcodes)
+    regions = []
+    i = j = 0
+    pos = 0 # Base line where the next region starts
+    shift_l = shift_r = 0 # Left/right line minus base line past the hunks consumed so far
+    while i < len(hunks_l) or j < len(hunks_r):
+        lo = min(hunks_l[i][0] if i < len(hunks_l) else len(base), hunks_r[j][0] if j < len(hunks_r) else len(base))
+        if pos < lo: regions.append((STABLE, pos, lo, pos + shift_l, lo + shift_l, pos + shift_r, lo + shift_r))
+        start_l, start_r = lo + shift_l, lo + shift_r
+        hi = lo
+        used_l = used_r = False
+        # Grow the region while a hunk of either side starts inside it or at its end
+        while True:
+            if i < len(hunks_l) and hunks_l[i][0] <= hi:
+                b1, b2, l1, l2 = hunks_l[i]
+                shift_l += (l2 - l1) - (b2 - b1)
+                hi = max(hi, b2)
+                used_l = True
+                i += 1
+            elif j < len(hunks_r) and hunks_r[j][0] <= hi:
+                b1, b2, r1, r2 = hunks_r[j]
+                shift_r += (r2 - r1) - (b2 - b1)
+                hi = max(hi, b2)
+                used_r = True
+                j += 1
+            else:
+                break
+        end_l, end_r = hi + shift_l, hi + shift_r
+        if used_l and used_r:
+            kind = SAME if left[start_l:end_l] == right[start_r:end_r] else CONFLICT
+        else:
+            kind = LEFT if used_l else RIGHT
+        regions.append((kind, lo, hi, start_l, end_l, start_r, end_r))
+        pos = hi
+    if pos < len(base):
+        regions.append((STABLE, pos, len(base), pos + shift_l, len(base) + shift_l, pos + shift_r, len(base) + shift_r))
+    return regions
+
+
+def region_lines(region, base, left, right):
+    """The lines a non-conflicting region contributes to the merge."""
+    kind, b1, b2, l1, l2, r1, r2 = region
+    if kind == STABLE: return base[b1:b2]
+    if kind == RIGHT: return right[r1:r2]
+    return left[l1:l2] # LEFT or SAME (a CONFLICT defaults to the left side)
+
+
+def merged_lines(regions, base, left, right, names=("left", "base", "right")):
+    """Yields the merged text line by line, with diff3-style markers around conflicts."""
+    for region in regions:
+        kind, b1, b2, l1, l2, r1, r2 = region
+        if kind != CONFLICT:
+            yield from region_lines(region, base, left, right)
+            continue
+        yield CONFLICT_START + names[0]
+        yield from left[l1:l2]
+        yield CONFLICT_BASE + names[1]
+        yield from base[b1:b2]
+        yield CONFLICT_SEP
+        yield from right[r1:r2]
+        yield CONFLICT_END + names[2]
+
+
+def conflict_count(regions):
+    return sum(1 for region in regions if region[0] == CONFLICT)
@@ -0,0 +1,227 @@
+"""Three-way merge window: left, merged result and right, with only the conflicts left to resolve."""
+import tkinter as tk
+from tkinter import filedialog, messagebox
+
+from diff_worker import DiffWorker
+from merge_engine import CONFLICT, LEFT, RIGHT, SAME, STABLE, merge_regions, merged_lines, region_lines
+
+POLL_MS = 50
+PANE_FONT = ("Courier New", 10)
+
+
+def _text_of(lines):
+    """Pane text for lines; every line keeps its newline so regions are whole lines."""
+    return "".join(line + "\n" for line in lines)
+
+
+class MergeView:
+    """Toplevel that merges left and right against a common base.
+
+    base->left and base->right are diffed once, on DiffWorker threads, and
+    merge_engine.merge_regions sweeps them into regions. Every region that
+    does not conflict goes into the merged pane straight away; conflicts are
+    shown with diff3-style markers between two Tk marks, so resolving one
+    (Take Left/Right/Both/Base, or editing it and Mark Resolved) only
+    rewrites that span and never re-diffs anything. The view owns `base`:
+    a MappedLines is closed once the window is closed and no worker reads
+    it any more.
+    """
+
+    def __init__(self, app, base, left, right, tag_options, names=("left", "base", "right")):
+        self.app = app
+        self.base, self.left, self.right = base, left, right
+        self.names = names
+        self.regions = []
+        self.conflicts = [] # Region indices of the conflicts, in order
+        self.resolved = set() # Entries of self.conflicts that were resolved
+        self.current = -1 # Index into self.conflicts
+
+        self.window = tk.Toplevel(app.master)
+        self.window.title(f"Three-Way Merge: {names[0]} <- {names[1]} -> {names[2]}")
+        self.window.geometry("1400x750")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        controls = tk.Frame(self.window)
+        controls.pack(fill=tk.X, padx=5, pady=5)
+        self.buttons = []
+        for text, command in (("Prev Conflict", self.prev_conflict), ("Next Conflict", self.next_conflict),
+                              ("Take Left", lambda: self.take("left")), ("Take Right", lambda: self.take("right")),
+                              ("Take Both", lambda: self.take("both")), ("Take Base", lambda: self.take("base")),
+                              ("Mark Resolved", self.mark_resolved), ("Save Merged...", self.save_merged)):
+            button = tk.Button(controls, text=text, command=command, state=tk.DISABLED, relief=tk.FLAT, bd=1)
+            button.pack(side=tk.LEFT, padx=5)
+            self.buttons.append(button)
+        self.status_label = tk.Label(controls, text="Comparing with base...")
+        self.status_label.pack(side=tk.LEFT, padx=10)
+
+        panes = tk.PanedWindow(self.window, orient=tk.HORIZONTAL, sashrelief=tk.RAISED, bd=2)
+        panes.pack(fill=tk.BOTH, expand=True)
+        self.text_left = self._add_pane(panes, names[0])
+        self.text_merged = self._add_pane(panes, "merged")
+        self.text_right = self._add_pane(panes, names[2])
+        for widget in (self.text_left, self.text_merged, self.text_right):
+            for tag, options in tag_options.items(): # Region kind (and "selected") -> tag options
+                widget.tag_config(tag, **options)
+            widget.tag_raise("selected")
+
+        algorithm = app.algorithm_var.get()
+        self._workers = (DiffWorker(base, left, algorithm, app.diff_cache).start(),
+                         DiffWorker(base, right, algorithm, app.diff_cache).start())
+        self.window.after(POLL_MS, self._poll)
+
+    def _add_pane(self, panes, title):
+        frame = tk.Frame(panes)
+        tk.Label(frame, text=title, anchor=tk.W).pack(side=tk.TOP, fill=tk.X)
+        scroll = tk.Scrollbar(frame)
+        scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        widget = tk.Text(frame, wrap=tk.NONE, undo=True, font=PANE_FONT, yscrollcommand=scroll.set, bd=0, highlightthickness=0)
+        scroll.config(command=widget.yview)
+        widget.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        panes.add(frame, stretch="always")
+        return widget
+
+    # --- Building the Merge ---
+    def _poll(self):
+        if not self.window.winfo_exists(): return # Closed meanwhile
+        if any(worker.state == "running" for worker in self._workers):
+            self.window.after(POLL_MS, self._poll)
+            return
+        failed = [worker for worker in self._workers if worker.state != "done"]
+        if failed:
+            self.status_label.config(text=f"Merge failed: {failed[0].error}")
+            return
+        self.regions = merge_regions(self.base, self.left, self.right,
+                                     left_opcodes=self._workers[0].result.opcodes,
+                                     right_opcodes=self._workers[1].result.opcodes)
+        self._fill_panes()
+        for button in self.buttons: button.config(state=tk.NORMAL)
+        self._update_status()
+        if self.conflicts: self._select(0)
+
+    def _fill_panes(self):
+        """Inserts all three texts at once, then tags each region in one pass."""
+        for widget, lines in ((self.text_left, self.left), (self.text_right, self.right)):
+            widget.insert("1.0", _text_of(lines))
+            widget.config(state=tk.DISABLED) # Only the merged pane is edited
+        pieces = []
+        spans = [] # (first merged line, line count) per region
+        line = 1
+        for region in self.regions:
+            if region[0] == CONFLICT:
+                lines = list(merged_lines([region], self.base, self.left, self.right, self.names))
+            else:
+                lines = region_lines(region, self.base, self.left, self.right)
+            pieces.append(_text_of(lines))
+            spans.append((line, len(lines)))
+            line += len(lines)
+        self.text_merged.insert("1.0", "".join(pieces))
+        self.text_merged.edit_reset()
+
+        for k, (region, (line, count)) in enumerate(zip(self.regions, spans)):
+            kind, b1, b2, l1, l2, r1, r2 = region
+            if kind == STABLE: continue
+            if kind != RIGHT: self.text_left.tag_add(kind, f"{l1 + 1}.0", f"{l2 + 1}.0")
+            if kind != LEFT: self.text_right.tag_add(kind, f"{r1 + 1}.0", f"{r2 + 1}.0")
+            self.text_merged.tag_add(kind, f"{line}.0", f"{line + count}.0")
+            if kind == CONFLICT:
+                start, end = self._marks(len(self.conflicts))
+                # Text typed at either edge stays inside the conflict
+                self.text_merged.mark_set(start, f"{line}.0")
+                self.text_merged.mark_gravity(start, tk.LEFT)
+                self.text_merged.mark_set(end, f"{line + count}.0")
+                self.text_merged.mark_gravity(end, tk.RIGHT)
+                self.conflicts.append(k)
+
+    @staticmethod
+    def _marks(index):
+        return f"conflict{index}_start", f"conflict{index}_end"
+
+    def _update_status(self):
+        auto = len(self.regions) - sum(1 for region in self.regions if region[0] == STABLE) - len(self.conflicts)
+        left = len(self.conflicts) - len(self.resolved)
+        self.status_label.config(text=f"{auto} changes merged automatically, {left} of {len(self.conflicts)} conflicts left.")
+
+    # --- Conflict Navigation ---
+    def _select(self, index):
+        """Highlights conflict `index` in all three panes and scrolls to it."""
+        self.current = index
+        kind, b1, b2, l1, l2, r1, r2 = self.regions[self.conflicts[index]]
+        start, end = self._marks(index)
+        for widget, lo, hi in ((self.text_left, f"{l1 + 1}.0", f"{l2 + 1}.0"),
+                               (self.text_right, f"{r1 + 1}.0", f"{r2 + 1}.0"),
+                               (self.text_merged, start, end)):
+            widget.tag_remove("selected", "1.0", tk.END)
+            widget.tag_add("selected", lo, hi)
+            widget.see(lo)
+        self.text_merged.mark_set(tk.INSERT, start)
+
+    def _step(self, direction):
+        """Selects the next (or previous) unresolved conflict, or just the next one if all are resolved."""
+        count = len(self.conflicts)
+        if not count: return
+        order = [(self.current + direction * step) % count for step in range(1, count + 1)]
+        self._select(next((index for index in order if index not in self.resolved), order[0]))
+
+    def next_conflict(self):
+        self._step(1)
+
+    def prev_conflict(self):
+        self._step(-1)
+
+    # --- Resolving ---
+    def take(self, source):
+        """Replaces the current conflict by the "left", "right", "both" or "base" lines."""
+        if self.current < 0: return
+        kind, b1, b2, l1, l2, r1, r2 = self.regions[self.conflicts[self.current]]
+        if source == "left": lines = self.left[l1:l2]
+        elif source == "right": lines = self.right[r1:r2]
+        elif source == "both": lines = list(self.left[l1:l2]) + list(self.right[r1:r2])
+        else: lines = self.base[b1:b2]
+        start, end = self._marks(self.current)
+        self.text_merged.delete(start, end)
+        self.text_merged.insert(start, _text_of(lines))
+        self._resolve({"left": LEFT, "right": RIGHT, "both": SAME}.get(source))
+
+    def mark_resolved(self):
+        """Keeps the current conflict's text as edited by hand."""
+        if self.current >= 0: self._resolve(None)
+
+    def _resolve(self, tag):
+        """Marks the current conflict resolved; tag colours its new text (None for none)."""
+        start, end = self._marks(self.current)
+        self.text_merged.tag_remove(CONFLICT, start, end)
+        self.text_merged.tag_remove(LEFT, start, end)
+        self.text_merged.tag_remove(RIGHT, start, end)
+        self.text_merged.tag_remove(SAME, start, end)
+        if tag: self.text_merged.tag_add(tag, start, end)
+        self.resolved.add(self.current)
+        self._update_status()
+        if len(self.resolved) < len(self.conflicts): self.next_conflict()
+        else: self._select(self.current)
+
+    # --- Saving ---
+    def save_merged(self):
+        unresolved = len(self.conflicts) - len(self.resolved)
+        if unresolved and not messagebox.askyesno(
+                "Save Merged", f"{unresolved} conflicts are unresolved and will be saved with conflict markers.\n"
+                "Save anyway?", parent=self.window):
+            return
+        path = filedialog.asksaveasfilename(parent=self.window, title="Save Merged File")
+        if not path: return
+        try:
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.write(self.text_merged.get("1.0", "end-1c"))
+        except OSError as e:
+            messagebox.showerror("Save Merged", f"Could not save {path}:\n{e}", parent=self.window)
+
+    def close(self):
+        for worker in self._workers: worker.cancel()
+        self.window.destroy()
+        self._release_base()
+
+    def _release_base(self):
+        """Closes the base file once both workers have stopped; a worker may still be hashing its mapped bytes."""
+        if any(worker.state == "running" for worker in self._workers):
+            self.app.master.after(POLL_MS, self._release_base)
+            return
+        if hasattr(self.base, "close"): self.base.close()
@@ -0,0 +1,87 @@
+"""Narrow canvas beside the panes showing where the differences are."""
+import tkinter as tk
+
+from hunk_table import TAGS
+
+RULER_WIDTH = 14
+VIEW_OUTLINE = "#aaaaaa"
+SELECTED_MARK = "#ffffff"
+
+
+class OverviewRuler:
+    """Diff density of the whole aligned document, drawn from the hunk index.
+
+    Hunks are bucketed into pixel rows in one pass and every run of equally
+    coloured pixels becomes a single rectangle, so the number of canvas
+    items is bounded by the ruler height rather than the hunk count.
+    Clicking selects the hunk nearest to that position.
+    """
+
+    def __init__(self, app, parent, colours, bg):
+        self.app = app
+        self.colours = colours # Opcode tag -> fill colour; blocks sharing a pixel use 'replace'
+        self.canvas = tk.Canvas(parent, width=RULER_WIDTH, bg=bg, highlightthickness=0, bd=0)
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        self.canvas.bind("<Button-1>", self.on_click)
+        self._view = (0.0, 1.0)
+        self._pending = None # after_idle id of a scheduled redraw
+
+    def _geometry(self):
+        result = self.app.diff_result
+        total = result.alignment.total_rows if result else 0
+        return result, total, self.canvas.winfo_height()
+
+    def schedule_redraw(self):
+        """Redraws at the next idle pass; any number of calls before it cost one redraw."""
+        if self._pending is None: self._pending = self.canvas.after_idle(self.redraw)
+
+    def redraw(self):
+        """Repaints density, selection mark and view outline."""
+        if self._pending is not None:
+            self.canvas.after_cancel(self._pending)
+            self._pending = None
+        canvas = self.canvas
+        canvas.delete("all")
+        result, total, height = self._geometry()
+        if result is not None and result.hunks and total and height > 1:
+            pixels = [None] * height
+            mixed = self.colours['replace']
+            hunks = result.hunks
+            colours = [self.colours[tag] for tag in TAGS]
+            for code, row, i1, i2, j1, j2 in zip(hunks.tags, hunks.rows, hunks.i1, hunks.i2, hunks.j1, hunks.j2):
+                rows = max(i2 - i1, j2 - j1)
+                top = row * height // total
+                bottom = min(height, max(top + 1, (row + rows) * height // total))
+                colour = colours[code]
+                for y in range(top, bottom):
+                    pixels[y] = colour if pixels[y] in (None, colour) else mixed
+            run_start = 0
+            for y in range(1, height + 1):
+                if y < height and pixels[y] == pixels[run_start]: continue
+                if pixels[run_start]:
+                    canvas.create_rectangle(0, run_start, RULER_WIDTH, y, fill=pixels[run_start], outline="")
+                run_start = y
+            self.mark_selection()
+        canvas.create_rectangle(0, 0, 0, 0, outline=VIEW_OUTLINE, tags="view")
+        self.update_view(*self._view)
+
+    def update_view(self, first, last):
+        """Moves the outline of the visible part (fractions of the document)."""
+        self._view = (float(first), float(last))
+        height = self.canvas.winfo_height()
+        self.canvas.coords("view", 1, int(self._view[0] * height), RULER_WIDTH - 1,
+                           max(int(self._view[0] * height) + 2, int(self._view[1] * height) - 1))
+
+    def mark_selection(self):
+        """Moves the selection mark without repainting the density."""
+        self.canvas.delete("selected")
+        result, total, height = self._geometry()
+        selected = self.app.selected_diff_details
+        if not selected or not total: return
+        y = (selected['line1'] - 1) * height // total
+        self.canvas.create_line(0, y, RULER_WIDTH, y, fill=SELECTED_MARK, width=2, tags="selected")
+
+    def on_click(self, event):
+        result, total, height = self._geometry()
+        if result is None or not result.hunks or height <= 1: return
+        self.app._select_and_scroll_to_diff(result.hunk_nearest(event.y * total // height))
@@ -0,0 +1,156 @@
+"""Unified/context diffs streamed from opcodes, and a streaming unified-diff patcher.
+
+Everything here is a generator over line sequences (lists or MappedLines)
+and the opcode list, so a diff of two huge files can be written to disk,
+or a patch applied, without building either text in memory.
+"""
+import re
+
+DEFAULT_CONTEXT = 3
+_HUNK_HEADER = re.compile(r"@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """Raised when a patch is malformed or does not match the text it is applied to."""
+
+
+def _lines_between(lines, lo, hi):
+    """Yields lines[lo:hi] one by one, without slicing a lazy sequence into a list."""
+    return map(lines.__getitem__, range(lo, hi))
+
+
+def grouped_opcodes(opcodes, context=DEFAULT_CONTEXT):
+    """Yields the opcodes of each diff hunk with up to `context` equal lines around the changes.
+
+    Same grouping as difflib.SequenceMatcher.get_grouped_opcodes, for any
+    opcode list. Identical texts yield nothing.
+    """
+    last = len(opcodes) - 1
+    group = []
+    for k, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+        if tag == 'equal':
+            if k == 0: i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+            if k == last: i2, j2 = min(i2, i1 + context), min(j2, j1 + context)
+            if i2 - i1 > 2 * context:
+                group.append((tag, i1, i1 + context, j1, j1 + context))
+                yield group
+                group = []
+                i1, j1 = i2 - context, j2 - context
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        yield group
+
+
+def _unified_range(start, stop):
+    length = stop - start
+    if length == 1: return f"{start + 1}"
+    return f"{start + 1 if length else start},{length}"
+
+
+def _context_range(start, stop):
+    length = stop - start
+    beginning = start + 1 if length else start
+    if length <= 1: return f"{beginning}"
+    return f"{beginning},{beginning + length - 1}"
+
+
+def unified_diff(lines1, lines2, opcodes, name1="left", name2="right", context=DEFAULT_CONTEXT):
+    """Yields a unified diff of lines1 -> lines2 as newline-terminated lines."""
+    for n, group in enumerate(grouped_opcodes(opcodes, context)):
+        if not n:
+            yield f"--- {name1}\n"
+            yield f"+++ {name2}\n"
+        yield f"@@ -{_unified_range(group[0][1], group[-1][2])} +{_unified_range(group[0][3], group[-1][4])} @@\n"
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                for line in _lines_between(lines1, i1, i2): yield f" {line}\n"
+                continue
+            for line in _lines_between(lines1, i1, i2): yield f"-{line}\n"
+            for line in _lines_between(lines2, j1, j2): yield f"+{line}\n"
+
+
+def context_diff(lines1, lines2, opcodes, name1="left", name2="right", context=DEFAULT_CONTEXT):
+    """Yields a context diff of lines1 -> lines2 as newline-terminated lines."""
+    prefix = {'insert': "+ ", 'delete': "- ", 'replace': "! ", 'equal': "  "}
+    for n, group in enumerate(grouped_opcodes(opcodes, context)):
+        if not n:
+            yield f"*** {name1}\n"
+            yield f"--- {name2}\n"
+        yield "***************\n"
+        yield f"*** {_context_range(group[0][1], group[-1][2])} ****\n"
+        if any(tag in ('replace', 'delete') for tag, *_ in group):
+            for tag, i1, i2, j1, j2 in group:
+                if tag == 'insert': continue
+                for line in _lines_between(lines1, i1, i2): yield f"{prefix[tag]}{line}\n"
+        yield f"--- {_context_range(group[0][3], group[-1][4])} ----\n"
+        if any(tag in ('replace', 'insert') for tag, *_ in group):
+            for tag, i1, i2, j1, j2 in group:
+                if tag == 'delete': continue
+                for line in _lines_between(lines2, j1, j2): yield f"{prefix[tag]}{line}\n"
+
+
+def apply_patch(lines, patch_lines):
+    """Yields `lines` with a unified diff applied, one line at a time.
+
+    Both are consumed front to back and only the current line of each is
+    held. Hunks must match exactly at the line their header names (no
+    fuzz); PatchError says where they do not. Only a single-file unified
+    diff can be applied.
+    """
+    source = iter(lines)
+    position = 0 # Lines of `lines` consumed so far
+    old_left = new_left = 0 # Lines the current hunk still has on each side
+    hunks = 0
+    files = 0
+
+    def take(number, expected):
+        nonlocal position
+        line = next(source, None)
+        if line != expected:
+            found = "the end of the text" if line is None else repr(line)
+            raise PatchError(f"patch line {number}: expected {expected!r} at line {position + 1}, found {found}")
+        position += 1
+
+    for number, line in enumerate(patch_lines, start=1):
+        line = line.rstrip("\n")
+        if line.endswith("\r"): line = line[:-1]
+        if old_left or new_left:
+            op, text = line[:1], line[1:]
+            if op == "\\": continue # "\ No newline at end of file"
+            if op == " " or not line: # Some tools strip the space of empty context lines
+                take(number, text)
+                old_left -= 1; new_left -= 1
+                yield text
+            elif op == "-":
+                take(number, text)
+                old_left -= 1
+            elif op == "+":
+                new_left -= 1
+                yield text
+            else:
+                raise PatchError(f"patch line {number}: {line!r} is not part of a hunk that is still open")
+            if old_left < 0 or new_left < 0:
+                raise PatchError(f"patch line {number}: the hunk is longer than its header says")
+            continue
+        if line.startswith("--- "):
+            files += 1
+            if files > 1: raise PatchError(f"patch line {number}: the patch changes more than one file")
+            continue
+        match = _HUNK_HEADER.match(line)
+        if not match: continue # File headers, "diff --git" lines and other commentary
+        old_start, old_count, new_start, new_count = match.groups()
+        old_left = 1 if old_count is None else int(old_count)
+        new_left = 1 if new_count is None else int(new_count)
+        # With no old lines, the header names the line the hunk goes after
+        target = int(old_start) - (1 if old_left else 0)
+        if target < position:
+            raise PatchError(f"patch line {number}: hunk starts at line {target + 1}, before the end of the previous one")
+        for _ in range(target - position):
+            line = next(source, None)
+            if line is None: raise PatchError(f"patch line {number}: hunk starts past the end of the text")
+            position += 1
+            yield line
+        hunks += 1
+    if old_left or new_left: raise PatchError("the patch ends inside a hunk")
+    if not hunks: raise PatchError("no unified diff hunks found")
+    yield from source
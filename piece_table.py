@@ -0,0 +1,137 @@
+"""Line-based piece table: a pane's document as spans of an original and an append-only buffer."""
+from bisect import bisect_right
+from collections.abc import Sequence
+
+MAX_PIECES = 4096 # More pieces than this are copied into one flat list
+COMPACT_ADDED_LINES = 65536 # The added buffer is compacted once it outgrows both this and the document
+ITER_CHUNK_LINES = 65536 # Lines sliced out of a piece at a time while iterating
+
+
+class PieceTable(Sequence):
+    """A list of lines stored as pieces (buffer, start, stop) of two buffers.
+
+    The original buffer is the sequence the table was reset to (a list or a
+    MappedLines), which is never modified; replaced lines are appended to
+    the added buffer. replace() only splits and swaps pieces, so an edit
+    costs the number of pieces rather than the number of lines. Lookups
+    bisect the pieces' start lines.
+    """
+
+    def __init__(self, lines=None):
+        self.source = None
+        self.reset([] if lines is None else lines)
+
+    def reset(self, lines):
+        """Makes `lines` the whole document and returns the source it held before, or None.
+
+        The table takes `lines` over: the caller must not modify it after.
+        The old source (e.g. a MappedLines) is not closed here, as a
+        background diff may still be reading it; the caller closes it.
+        """
+        old = self.source if self.source is not lines else None
+        self.source = lines # What close() closes
+        self._flat(lines)
+        return old
+
+    def close(self):
+        source = self.reset([])
+        if hasattr(source, "close"): source.close()
+
+    def _flat(self, lines):
+        self.original = lines
+        self._added = []
+        self._pieces = [(lines, 0, len(lines))] if len(lines) else []
+        self._starts = [0] * len(self._pieces) # Document line each piece starts at
+        self._length = len(lines)
+
+    # --- Sequence Protocol ---
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            lo, hi, step = index.indices(self._length)
+            if step != 1: return [self[k] for k in range(lo, hi, step)]
+            return self._slice(lo, hi)
+        if index < 0: index += self._length
+        if not 0 <= index < self._length: raise IndexError("line index out of range")
+        k = bisect_right(self._starts, index) - 1
+        buffer, start, _ = self._pieces[k]
+        return buffer[start + index - self._starts[k]]
+
+    def _slice(self, lo, hi):
+        lines = []
+        k = bisect_right(self._starts, lo) - 1
+        while lo < hi:
+            buffer, start, stop = self._pieces[k]
+            first = start + lo - self._starts[k]
+            last = min(stop, first + hi - lo)
+            lines.extend(buffer[first:last])
+            lo += last - first
+            k += 1
+        return lines
+
+    def __iter__(self):
+        for buffer, start, stop in self._pieces:
+            for lo in range(start, stop, ITER_CHUNK_LINES):
+                yield from buffer[lo:min(stop, lo + ITER_CHUNK_LINES)]
+
+    def text(self):
+        """The document as one string, lines joined by newlines."""
+        return "\n".join(self)
+
+    # --- Editing ---
+    def replace(self, lo, hi, lines):
+        """Replaces document lines [lo, hi) by `lines`, like table[lo:hi] = lines on a list."""
+        lo = max(0, min(lo, self._length))
+        hi = max(lo, min(hi, self._length))
+        k = self._split(lo)
+        m = self._split(hi)
+        new = []
+        if lines:
+            start = len(self._added)
+            self._added.extend(lines)
+            new.append((self._added, start, len(self._added)))
+            if k and self._pieces[k - 1][0] is self._added and self._pieces[k - 1][2] == start:
+                k -= 1 # Lines added right after the previous piece's extend it
+                new[0] = (self._added, self._pieces[k][1], len(self._added))
+        self._pieces[k:m] = new
+        self._length += len(lines) - (hi - lo)
+        self._reindex(k)
+        if len(self._pieces) > MAX_PIECES or len(self._added) > max(COMPACT_ADDED_LINES, self._length):
+            self._flat(self[:]) # Drops replaced lines and merges the pieces again
+
+    def snapshot(self):
+        """The current lines as a sequence later edits leave alone.
+
+        That is the original itself while it is unedited, otherwise the
+        table is flattened into a new list, which becomes its original.
+        """
+        if len(self._pieces) == 1:
+            buffer, start, stop = self._pieces[0]
+            if buffer is self.original and start == 0 and stop == len(buffer): return self.original
+        self._flat(self[:])
+        return self.original
+
+    def _split(self, index):
+        """Splits the piece holding line `index` there; returns the number of the piece starting at it."""
+        if index >= self._length: return len(self._pieces)
+        k = bisect_right(self._starts, index) - 1
+        offset = index - self._starts[k]
+        if offset:
+            buffer, start, stop = self._pieces[k]
+            self._pieces[k:k + 1] = [(buffer, start, start + offset), (buffer, start + offset, stop)]
+            self._starts.insert(k + 1, index)
+            k += 1
+        return k
+
+    def _reindex(self, k):
+        """Recomputes the start lines of pieces k and after."""
+        del self._starts[k:]
+        position = 0
+        if k:
+            _, start, stop = self._pieces[k - 1]
+            position = self._starts[k - 1] + stop - start
+        for _, start, stop in self._pieces[k:]:
+            self._starts.append(position)
+            position += stop - start
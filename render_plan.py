@@ -0,0 +1,40 @@
+"""Render plans: tag ranges gathered in Python, then sent to Tk with one tag_add per tag."""
+
+PLAN_OPCODES = 1024 # Opcodes planned and applied between checks of the render time slice
+
+
+class RenderPlan:
+    """Flat [start, end, start, end, ...] index lists per tag, one dict per pane.
+
+    Each tag_add call is a Python->Tcl round trip, so tagging hunk by hunk
+    costs a call per range; a plan costs one multi-range call per tag and
+    pane, however many ranges it holds.
+    """
+    __slots__ = ('ranges',)
+
+    def __init__(self):
+        self.ranges = ({}, {}) # Left pane, right pane
+
+    def add(self, side, tag_name, start, end):
+        """Plans tag_name over widget indices start..end of pane side (0 left, 1 right)."""
+        indices = self.ranges[side].get(tag_name)
+        if indices is None: indices = self.ranges[side][tag_name] = []
+        indices.append(start)
+        indices.append(end)
+
+    def add_lines(self, side, tag_name, first, stop):
+        """Plans tag_name over whole widget lines first..stop - 1 (1-based)."""
+        if first < stop: self.add(side, tag_name, f"{first}.0", f"{stop}.0")
+
+    def __len__(self):
+        """Number of planned ranges."""
+        return sum(len(indices) for ranges in self.ranges for indices in ranges.values()) // 2
+
+    def apply(self, widgets):
+        """Adds the planned tags to the (left, right) widgets; returns the number of tag_add calls."""
+        calls = 0
+        for widget, ranges in zip(widgets, self.ranges):
+            for tag_name, indices in ranges.items():
+                widget.tag_add(tag_name, *indices)
+                calls += 1
+        return calls
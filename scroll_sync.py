@@ -0,0 +1,76 @@
+"""Keeps the two full-text panes scrolled to matching lines through the diff's row alignment."""
+
+
+def counterpart(alignment, side, line):
+    """Line of the other pane that matches model line `line` of pane `side` (0 left, 1 right).
+
+    Returns (line, exact): exact is True when both lines are the same text
+    (an 'equal' row). A row the other pane fills with spacing maps to the
+    line that spacing hangs below. Without an alignment, lines map to
+    themselves.
+    """
+    if alignment is None or not alignment.opcodes: return line, False
+    row = alignment.row_for_left(line) if side == 0 else alignment.row_for_right(line)
+    k = alignment.op_index_for_row(row)
+    tag, i1, i2, j1, j2 = alignment.opcodes[k]
+    lo, hi = (j1, j2) if side == 0 else (i1, i2)
+    offset = row - alignment.row_starts[k]
+    if offset < hi - lo: return lo + offset, tag == 'equal'
+    return max(hi - 1, 0), False
+
+
+class ScrollSync:
+    """Scrolls the other pane to the line matching the top line of the pane that moved.
+
+    Both panes' yscrollcommands land in on_yscroll, which only records the
+    pane that moved; the other pane follows once per idle pass, however
+    many scroll events came in. Mapping lines instead of copying yview
+    fractions keeps the panes aligned when fillers, folds or wrapped lines
+    make their heights differ. The follower's own yscrollcommand for a
+    synced move is recognized by its top index and ignored, so the panes
+    never bounce updates back and forth.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._leader = None # Pane (0 left, 1 right) the next sync copies
+        self._pending = None # after_idle id of the next sync
+        self._echo = [None, None] # Top index a sync last scrolled each pane to
+
+    @property
+    def panes(self):
+        return self.app.text1, self.app.text2
+
+    def on_yscroll(self, side, first, last):
+        """yscrollcommand of pane `side`."""
+        app = self.app
+        (app.text1_scroll, app.text2_scroll)[side].set(first, last)
+        app.ruler.update_view(first, last)
+        app._schedule_intraline()
+        top = self.panes[side].index("@0,0")
+        if top == self._echo[side]: return # The view the last sync set
+        self._echo[side] = None
+        self.lead(side)
+
+    def lead(self, side):
+        """Makes the other pane follow pane `side` at the next idle pass."""
+        self._leader = side
+        if self._pending is None: self._pending = self.app.master.after_idle(self._sync)
+
+    def _sync(self):
+        self._pending = None
+        side, app = self._leader, self.app
+        if side is None or app.virtual_mode: return
+        leader, follower = self.panes[side], self.panes[1 - side]
+        top = leader.index("@0,0")
+        line, column = map(int, top.split("."))
+        alignment = app.diff_result.alignment if app.diff_result is not None else None
+        target_line, exact = counterpart(alignment, side, line - 1)
+        # Identical lines wrap the same way, so the column keeps the position inside a wrapped line
+        target = follower.index(f"{target_line + 1}.{column if exact else 0}")
+        if follower.index("@0,0") != target: follower.yview(target)
+        if exact: # Match a partly scrolled-out top line to the pixel
+            leader_info, follower_info = leader.dlineinfo(top), follower.dlineinfo(target)
+            if leader_info and follower_info and leader_info[1] != follower_info[1]:
+                follower.yview_scroll(follower_info[1] - leader_info[1], "pixels")
+        self._echo[1 - side] = follower.index("@0,0")
@@ -0,0 +1,40 @@
+"""Next/Prev difference navigation on a DiffResult's hunk index."""
+import unittest
+
+from diff_engine import compute_diff
+
+LEFT = ["a", "b", "c", "d", "e", "f", "g", "h", "i", "j"]
+RIGHT = ["a", "B", "c", "d", "E", "f", "g", "H", "i", "j"] # Hunks on rows 1, 4 and 7
+
+
+class NavigationTest(unittest.TestCase):
+    def setUp(self):
+        self.result = compute_diff(LEFT, RIGHT)
+        self.assertEqual(list(self.result.hunk_rows), [1, 4, 7])
+
+    def test_next_next_prev_with_cursor_at_start(self):
+        cursor_row = 0 # Navigation never moves the cursor off 1.0
+        current = self.result.next_hunk(cursor_row)
+        self.assertEqual(current, 0)
+        current = self.result.next_hunk(cursor_row, current)
+        self.assertEqual(current, 1)
+        current = self.result.prev_hunk(cursor_row, current)
+        self.assertEqual(current, 0)
+
+    def test_next_steps_from_selection_with_cursor_below_last_hunk(self):
+        self.assertEqual(self.result.next_hunk(9, 0), 1)
+
+    def test_wraps_around(self):
+        self.assertEqual(self.result.next_hunk(0, 2), 0)
+        self.assertEqual(self.result.prev_hunk(0, 0), 2)
+        self.assertEqual(self.result.next_hunk(8), 0)
+        self.assertEqual(self.result.prev_hunk(0), 2)
+
+    def test_cursor_search_without_selection(self):
+        self.assertEqual(self.result.next_hunk(4), 2)
+        self.assertEqual(self.result.next_hunk(4, reset=True), 1)
+        self.assertEqual(self.result.prev_hunk(4), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+"""Render plans and the Tcl call counters that measure them."""
+import unittest
+
+from compare_stats import CompareStats, TclCallCounter
+from render_plan import RenderPlan
+
+
+class FakeTkapp:
+    def __init__(self):
+        self.calls = []
+
+    def call(self, *args):
+        self.calls.append(args)
+
+
+class FakeText:
+    """Issues tag_add the way tkinter.Text does: one tuple argument."""
+
+    def __init__(self, path, tk):
+        self._w, self.tk = path, tk
+
+    def tag_add(self, tagName, index1, *args):
+        self.tk.call((self._w, 'tag', 'add', tagName, index1) + args)
+
+
+class RenderPlanTest(unittest.TestCase):
+    def test_tag_ranges_counts_each_planned_range_once(self):
+        stats = CompareStats("full", "Myers")
+        counters = (TclCallCounter(FakeTkapp()), TclCallCounter(FakeTkapp()))
+        for counter in counters: counter.stats = stats
+        panes = (FakeText(".left", counters[0]), FakeText(".right", counters[1]))
+        plan = RenderPlan()
+        for line in range(1, 8):
+            plan.add_lines(0, "diff", line, line + 1)
+        for line in range(1, 4):
+            plan.add_lines(1, "identical", line, line + 1)
+        self.assertEqual(len(plan), 10)
+        self.assertEqual(plan.apply(panes), 2)
+        self.assertEqual(stats.counters["tag_ranges"], len(plan))
+        self.assertEqual(stats.counters["tcl_calls"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
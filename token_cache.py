@@ -0,0 +1,85 @@
+"""Lexed syntax spans cached per text, so unchanged texts are never re-tokenized."""
+import hashlib
+from array import array
+from collections import OrderedDict
+
+TOKEN_CACHE_BUDGET_BYTES = 32 * 1024 * 1024
+SPAN_BYTES = 14 # One start (8), length (4) and tag id (2)
+
+
+class TokenSpans:
+    """Highlight spans of one text as parallel arrays: start offset, length, tag id.
+
+    Adjacent tokens with the same tag are already merged into one span.
+    """
+    __slots__ = ("starts", "lengths", "tag_ids")
+
+    def __init__(self):
+        self.starts = array('q')
+        self.lengths = array('i')
+        self.tag_ids = array('H')
+
+    def __len__(self):
+        return len(self.starts)
+
+    def append(self, start, length, tag_id):
+        # Extends the previous span when it has the same tag and ends here
+        if self.starts and self.tag_ids[-1] == tag_id and self.starts[-1] + self.lengths[-1] == start:
+            self.lengths[-1] += length
+        else:
+            self.starts.append(start)
+            self.lengths.append(length)
+            self.tag_ids.append(tag_id)
+
+
+class TokenCache:
+    """LRU of TokenSpans keyed by (lexer class, content hash), within a byte budget.
+
+    Tag names are interned into small ids shared by all entries; clear()
+    must be called whenever the token type -> tag mapping changes.
+    """
+
+    def __init__(self, budget=TOKEN_CACHE_BUDGET_BYTES):
+        self.budget = budget
+        self.tag_names = [] # Tag id -> tag name
+        self._tag_ids = {}
+        self._entries = OrderedDict()
+        self._used = 0
+
+    def clear(self):
+        self.tag_names.clear()
+        self._tag_ids.clear()
+        self._entries.clear()
+        self._used = 0
+
+    def spans(self, lexer, content, tag_for):
+        """TokenSpans of content; tag_for(token_type) gives a tag name or None."""
+        digest = hashlib.blake2b(content.encode("utf-8", "surrogatepass"), digest_size=20).digest()
+        key = (type(lexer).__name__, digest)
+        spans = self._entries.get(key)
+        if spans is not None:
+            self._entries.move_to_end(key)
+            return spans
+        spans = self._lex(lexer, content, tag_for)
+        size = len(spans) * SPAN_BYTES
+        if size <= self.budget:
+            self._entries[key] = spans
+            self._used += size
+            while self._used > self.budget:
+                _, evicted = self._entries.popitem(last=False)
+                self._used -= len(evicted) * SPAN_BYTES
+        return spans
+
+    def _lex(self, lexer, content, tag_for):
+        spans = TokenSpans()
+        tag_ids = self._tag_ids
+        for index, token_type, token_text in lexer.get_tokens_unprocessed(content):
+            if not token_text: continue
+            tag_name = tag_for(token_type)
+            if not tag_name: continue
+            tag_id = tag_ids.get(tag_name)
+            if tag_id is None:
+                tag_id = tag_ids[tag_name] = len(self.tag_names)
+                self.tag_names.append(tag_name)
+            spans.append(index, len(token_text), tag_id)
+        return spans
@@ -0,0 +1,196 @@
+"""Virtualized two-pane view: only a window of aligned rows lives in the widgets."""
+import tkinter as tk
+from tkinter import font as tkfont
+
+from diff_engine import PLACEHOLDER_TEXT
+
+WINDOW_MARGIN = 300 # Rows materialized above and below the visible ones
+REWINDOW_SLACK = WINDOW_MARGIN // 3 # Re-render once the view gets this close to a window edge
+
+
+class VirtualViewport:
+    """Renders rows [window_start, window_end) of the aligned document.
+
+    The app keeps the real lines (lines1/lines2) and the DiffResult. Widget
+    line n shows model row window_start + n - 1 in both panes, so scrolling,
+    navigation and merges translate through row_to_line/line_to_row. The
+    widgets are read-only while the viewport owns them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.window_start = 0
+        self.window_end = 0
+        self.top_row = 0
+        self._rendering = False
+        self._rewindow_pending = False
+
+    # --- Geometry ---
+    @property
+    def total_rows(self):
+        result = self.app.diff_result
+        return result.alignment.total_rows if result else 0
+
+    def visible_rows(self):
+        widget = self.app.text1
+        linespace = tkfont.Font(font=widget.cget("font")).metrics("linespace") or 1
+        return max(1, widget.winfo_height() // linespace)
+
+    def row_to_line(self, row):
+        """Widget line showing a model row, or None if it is not materialized."""
+        if self.window_start <= row < self.window_end: return row - self.window_start + 1
+        return None
+
+    def line_to_row(self, line):
+        """Model row shown on a widget line."""
+        return max(0, min(self.window_start + line - 1, self.total_rows - 1))
+
+    # --- Rendering ---
+    def render(self, top_row=None):
+        """Materializes the window around top_row (default: the current top row)."""
+        app = self.app
+        if top_row is None: top_row = self.top_row
+        total = self.total_rows
+        visible = self.visible_rows()
+        top_row = max(0, min(top_row, total - visible))
+        start = max(0, top_row - WINDOW_MARGIN)
+        end = min(total, top_row + visible + WINDOW_MARGIN)
+        self.top_row, self.window_start, self.window_end = top_row, start, end
+        left, right, ranges1, ranges2 = self._build_slice(start, end)
+
+        self._rendering = True
+        try:
+            for widget, lines, tag_ranges in ((app.text1, left, ranges1), (app.text2, right, ranges2)):
+                widget.config(state=tk.NORMAL)
+                widget.delete("1.0", tk.END)
+                widget.insert("1.0", "\n".join(lines))
+                # Placeholder rows are blanked (same length) so they get no syntax colours
+                blanked = [" " * len(line) if line is PLACEHOLDER_TEXT else line for line in lines]
+                app._highlight_rows(widget, 1, blanked)
+                for tag_name, indices in tag_ranges.items():
+                    widget.tag_add(tag_name, *indices)
+                widget.config(state=tk.DISABLED)
+                widget.edit_modified(False)
+                widget.yview(f"{top_row - start + 1}.0")
+            self.apply_selection()
+        finally:
+            self._rendering = False
+        app._intraline_rows.clear() # The widgets hold new lines now
+        self.update_scrollbars()
+        app._schedule_intraline()
+
+    def _build_slice(self, start, end):
+        """Lines and per-tag index lists for rows [start, end) of both panes."""
+        app = self.app
+        alignment = app.diff_result.alignment
+        left, right = [], []
+        ranges1, ranges2 = {}, {}
+        left_tags = {'delete': app.tag_del, 'replace': app.tag_change}
+        right_tags = {'insert': app.tag_add, 'replace': app.tag_change}
+
+        def add_range(ranges, tag_name, line_lo, line_hi):
+            if tag_name and line_lo < line_hi:
+                ranges.setdefault(tag_name, []).extend((f"{line_lo}.0", f"{line_hi}.0"))
+
+        for k, row_lo, row_hi in alignment.segments(start, end):
+            tag, i1, i2, j1, j2 = alignment.opcodes[k]
+            op_row = alignment.row_starts[k]
+            line_lo, line_hi = row_lo - start + 1, row_hi - start + 1
+            for lines, out, lo, hi, ranges, diff_tag in (
+                    (app.lines1, left, i1, i2, ranges1, left_tags.get(tag)),
+                    (app.lines2, right, j1, j2, ranges2, right_tags.get(tag))):
+                content_end = max(row_lo, min(row_hi, op_row + hi - lo)) # Rows past it are placeholders
+                out.extend(lines[lo + row_lo - op_row:lo + content_end - op_row])
+                out.extend([PLACEHOLDER_TEXT] * (row_hi - content_end))
+                if tag == 'equal':
+                    add_range(ranges, app.tag_identical, line_lo, line_hi)
+                else:
+                    add_range(ranges, diff_tag, line_lo, content_end - start + 1)
+                    add_range(ranges, app.tag_missing, content_end - start + 1, line_hi)
+        return left, right, ranges1, ranges2
+
+    def apply_selection(self):
+        """Tags the selected difference where it intersects the window."""
+        app = self.app
+        for widget in (app.text1, app.text2):
+            widget.tag_remove(app.tag_selected, "1.0", tk.END)
+        diff = app.selected_diff_details
+        if not diff: return
+        size = max(diff['i2'] - diff['i1'], diff['j2'] - diff['j1'], 1)
+        row_lo = max(diff['line1'] - 1, self.window_start)
+        row_hi = min(diff['line1'] - 1 + size, self.window_end)
+        if row_lo >= row_hi: return
+        start, end = f"{row_lo - self.window_start + 1}.0", f"{row_hi - self.window_start + 1}.0"
+        for widget in (app.text1, app.text2):
+            widget.tag_add(app.tag_selected, start, end)
+
+    # --- Scrolling ---
+    def show_row(self, row):
+        """Scrolls so that a model row is visible, a third of the way down."""
+        visible = self.visible_rows()
+        if self.top_row <= row < self.top_row + visible and self.row_to_line(row): return
+        self.move_top(row - visible // 3)
+
+    def move_top(self, top_row):
+        """Puts top_row at the top of both panes, re-rendering only if needed."""
+        if self.app.diff_result is None: return # A comparison is still running
+        total = self.total_rows
+        visible = self.visible_rows()
+        top_row = max(0, min(top_row, total - visible))
+        low_ok = top_row >= self.window_start + (REWINDOW_SLACK if self.window_start > 0 else 0)
+        high_ok = top_row + visible <= self.window_end - (REWINDOW_SLACK if self.window_end < total else 0)
+        if not (low_ok and high_ok):
+            self.render(top_row)
+            return
+        self.top_row = top_row
+        self._rendering = True
+        try:
+            for widget in (self.app.text1, self.app.text2):
+                widget.yview(f"{top_row - self.window_start + 1}.0")
+        finally:
+            self._rendering = False
+        self.update_scrollbars()
+        self.app._schedule_intraline()
+
+    def scroll_rows(self, delta):
+        self.move_top(self.top_row + delta)
+
+    def on_scrollbar(self, *args):
+        """Scrollbar command: positions are fractions of the whole model."""
+        if not args: return
+        if args[0] == "moveto":
+            self.move_top(int(float(args[1]) * self.total_rows))
+        elif args[0] == "scroll":
+            step = self.visible_rows() if args[2] == "pages" else 1
+            self.move_top(self.top_row + int(args[1]) * step)
+
+    def on_widget_yscroll(self, widget, *args):
+        """yscrollcommand of both panes: follows keyboard/see() scrolling inside the window."""
+        if self._rendering: return
+        top_line = int(widget.index("@0,0").split('.')[0])
+        row = self.line_to_row(top_line)
+        if row == self.top_row: return
+        self.top_row = row
+        other = self.app.text2 if widget is self.app.text1 else self.app.text1
+        self._rendering = True
+        try:
+            other.yview(f"{top_line}.0")
+        finally:
+            self._rendering = False
+        self.update_scrollbars()
+        self.app._schedule_intraline()
+        if not self._rewindow_pending:
+            self._rewindow_pending = True
+            self.app.master.after_idle(self._rewindow_if_needed)
+
+    def _rewindow_if_needed(self):
+        self._rewindow_pending = False
+        if self.app.virtual_mode: self.move_top(self.top_row)
+
+    def update_scrollbars(self):
+        total = self.total_rows or 1
+        first = self.top_row / total
+        last = min(1.0, (self.top_row + self.visible_rows()) / total)
+        self.app.text1_scroll.set(first, last)
+        self.app.text2_scroll.set(first, last)
+        self.app.ruler.update_view(first, last)